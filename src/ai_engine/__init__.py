@@ -0,0 +1,39 @@
+"""AI engine for market data, signals, risk and content generation
+
+Submodules are imported on first attribute access, so ``import ai_engine``
+stays cheap and a process only pays for the dependencies it uses.
+"""
+import importlib
+
+_EXPORTS = {
+    'TradingEngine': 'trading_engine',
+    'SignalGenerator': 'signal_generator',
+    'MLPredictor': 'ml_models',
+    'RiskManager': 'risk_manager',
+    'PortfolioRiskEngine': 'portfolio_risk',
+    'MarketDataCollector': 'market_data',
+    'AsyncMarketDataCollector': 'async_market_data',
+    'MarketDataStore': 'data_store',
+    'StreamingIndicatorEngine': 'streaming_indicators',
+    'calculate_indicators_batch': 'batch_indicators',
+    'Backtester': 'backtester',
+    'MemeGenerator': 'meme_generator',
+    'VoiceGenerator': 'voice_generator',
+    'metrics': 'metrics',
+    'preload': 'lazy',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,162 @@
+import asyncio
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .lazy import lazy_import
+from .market_data import MarketDataCollector
+from .metrics import metrics
+
+# ccxt和pandas导入较慢, 在第一次使用时才加载
+pd = lazy_import('pandas')
+ccxt_async = lazy_import('ccxt.async_support')
+
+
+class AsyncRateLimiter:
+    """同一采集器内所有请求共享的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = None
+
+    def reset(self):
+        """清除与事件循环绑定的状态, 以便在新的事件循环中复用"""
+        self._lock = None
+
+    async def acquire(self, cost: float = 1.0):
+        """等待并消耗cost个令牌"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                await asyncio.sleep((cost - self._tokens) / self.rate)
+
+
+class AsyncMarketDataCollector(MarketDataCollector):
+    """基于ccxt.async_support的多交易对并发行情采集器"""
+
+    def __init__(self, exchange_id='binance', api_key=None, api_secret=None,
+                 max_concurrency=20, rate_limit=None, exchange=None, store=None):
+        if exchange is None:
+            exchange = getattr(ccxt_async, exchange_id)({
+                'apiKey': api_key,
+                'secret': api_secret,
+                # 请求节流由共享的AsyncRateLimiter负责
+                'enableRateLimit': False,
+                'options': {'defaultType': 'future'}
+            })
+        self.exchange = exchange
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+
+        # 默认沿用交易所声明的限速 (rateLimit为两次请求之间的毫秒数)
+        if rate_limit is None:
+            interval_ms = getattr(exchange, 'rateLimit', None) or 50
+            rate_limit = 1000.0 / interval_ms
+        self.rate_limiter = AsyncRateLimiter(rate_limit)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    async def _call(self, method, *args, **kwargs):
+        """在并发上限和限速预算内调用交易所接口"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await self.rate_limiter.acquire()
+            # 只计交易所往返时间, 不含排队和限速等待
+            with metrics.timer(f"exchange.{method.__name__}", args[0] if args else None):
+                return await method(*args, **kwargs)
+
+    async def fetch_historical_data(self, symbol, timeframe='1h', limit=1000):
+        """获取历史K线数据"""
+        try:
+            ohlcv = await self._call(self.exchange.fetch_ohlcv, symbol, timeframe, limit=limit)
+            df = self._convert_to_dataframe(ohlcv)
+            if self.store is not None:
+                self.store.append_candles(symbol, df)
+            return df
+        except Exception as e:
+            self.logger.error(f"Error fetching historical data for {symbol}: {str(e)}")
+            return None
+
+    async def fetch_orderbook(self, symbol, limit=20):
+        """获取市场深度数据"""
+        try:
+            orderbook = await self._call(self.exchange.fetch_order_book, symbol, limit=limit)
+            result = {
+                'bids': np.array(orderbook['bids']),
+                'asks': np.array(orderbook['asks']),
+                'timestamp': orderbook['timestamp']
+            }
+            if self.store is not None:
+                self.store.append_orderbook(symbol, result)
+            return result
+        except Exception as e:
+            self.logger.error(f"Error fetching orderbook for {symbol}: {str(e)}")
+            return None
+
+    async def fetch_recent_trades(self, symbol, limit=100):
+        """获取最近成交数据"""
+        try:
+            trades = pd.DataFrame(await self._call(self.exchange.fetch_trades, symbol, limit=limit))
+            if self.store is not None:
+                self.store.append_trades(symbol, trades)
+            return trades
+        except Exception as e:
+            self.logger.error(f"Error fetching recent trades for {symbol}: {str(e)}")
+            return None
+
+    async def fetch_market_data(self, symbol, timeframe='1m', limit=100):
+        """并发获取单个交易对的K线、深度和成交, 返回与TradingEngine.fetch_market_data相同的结构"""
+        ohlcv_data, orderbook, trades = await asyncio.gather(
+            self.fetch_historical_data(symbol, timeframe, limit),
+            self.fetch_orderbook(symbol),
+            self.fetch_recent_trades(symbol)
+        )
+        if ohlcv_data is None:
+            return None
+
+        return {
+            'ohlcv': ohlcv_data,
+            'orderbook': orderbook,
+            'vwap': self.calculate_vwap(trades),
+            'timestamp': datetime.now().timestamp()
+        }
+
+    async def fetch_many(self, symbols: Iterable[str], timeframe='1m', limit=100) -> Dict[str, Optional[Dict]]:
+        """并发获取多个交易对的行情数据"""
+        symbols = list(symbols)
+        results = await asyncio.gather(
+            *(self.fetch_market_data(symbol, timeframe, limit) for symbol in symbols)
+        )
+        return dict(zip(symbols, results))
+
+    def collect(self, symbols: Iterable[str], timeframe='1m', limit=100) -> Dict[str, Optional[Dict]]:
+        """同步入口: 运行一个完整的采集周期并关闭连接"""
+        async def _run():
+            self._semaphore = None
+            self.rate_limiter.reset()
+            try:
+                return await self.fetch_many(symbols, timeframe, limit)
+            finally:
+                await self.close()
+
+        return asyncio.run(_run())
+
+    async def close(self):
+        """关闭底层HTTP会话"""
+        close = getattr(self.exchange, 'close', None)
+        if close is not None:
+            await close()
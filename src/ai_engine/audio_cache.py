@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+# 缓存格式或语音参数变化时递增, 旧条目自然失效
+CACHE_VERSION = 1
+INDEX_FILE = 'index.json'
+# 缓存条目的文件名主体: sha256十六进制摘要
+_KEY_PATTERN = re.compile(r'[0-9a-f]{64}$')
+
+
+def audio_digest(text, language, speaker, emotion, model) -> str:
+    """(文本, 语言, 说话人, 情感, 模型) 的稳定摘要, 跨进程和重启保持一致"""
+    payload = json.dumps([CACHE_VERSION, text, language, speaker, emotion, model],
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """内容寻址的语音文件缓存
+
+    文件按摘要存放在 cache_dir/<前两位>/<摘要>.wav, 索引文件记录每个条目的
+    大小和最近访问时间。总大小超过max_bytes时按LRU淘汰。命中只更新内存中的
+    访问时间, 索引在写入新条目、淘汰或flush()时落盘。
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, suffix='.wav', flush_every=64):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self.suffix = suffix
+        self.flush_every = flush_every
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries: Dict[str, Dict] = self._load_index()
+        self.total_bytes = sum(entry['size'] for entry in self.entries.values())
+
+    def path(self, key) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.suffix)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)['entries']
+            # 丢弃文件已不存在的条目
+            return {key: entry for key, entry in entries.items() if os.path.exists(self.path(key))}
+        except FileNotFoundError:
+            return self._scan()
+        except Exception as e:
+            self.logger.error(f"Error loading audio cache index, rebuilding: {str(e)}")
+            return self._scan()
+
+    def _scan(self) -> Dict[str, Dict]:
+        """索引缺失或损坏时, 从缓存目录中的文件重建
+
+        只收录 <前两位>/<摘要><suffix> 形式的文件; 生成中的临时文件和不属于缓存的
+        其他文件都被忽略, 否则它们的path(key)并不存在, 淘汰时无法真正删除。
+        """
+        entries = {}
+        for prefix in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                key = name[:-len(self.suffix)]
+                if not name.endswith(self.suffix) or not _KEY_PATTERN.match(key) or key[:2] != prefix:
+                    continue
+                stat = os.stat(os.path.join(directory, name))
+                entries[key] = {'size': stat.st_size, 'last_access': stat.st_mtime}
+        return entries
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = 0
+
+    def get(self, key) -> Optional[str]:
+        """命中时返回缓存文件路径, 否则返回None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = self.path(key)
+            if not os.path.exists(path):
+                # 文件被外部删除
+                self.total_bytes -= entry['size']
+                del self.entries[key]
+                self.misses += 1
+                return None
+            entry['last_access'] = time.time()
+            self.hits += 1
+            self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._save_index()
+            return path
+
+    def temp_path(self, key) -> str:
+        """生成中的临时文件路径, 写完后交给put()"""
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        return f"{self.path(key)}.{os.getpid()}.{threading.get_ident()}.tmp{self.suffix}"
+
+    def put(self, key, source_path) -> str:
+        """把已生成的文件原子地移入缓存, 必要时淘汰最久未使用的条目, 返回缓存路径"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            previous = self.entries.get(key)
+            if previous is not None:
+                self.total_bytes -= previous['size']
+            self.entries[key] = {'size': size, 'last_access': time.time()}
+            self.total_bytes += size
+            self._evict(keep=key)
+            self._save_index()
+        return path
+
+    def _evict(self, keep=None):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['last_access']):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self.entries.pop(key)
+            self.total_bytes -= entry['size']
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """把内存中的访问时间写回索引文件"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.entries):
+                try:
+                    os.remove(self.path(key))
+                except FileNotFoundError:
+                    pass
+            self.entries = {}
+            self.total_bytes = 0
+            self._save_index()
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self.entries), 'bytes': self.total_bytes,
+                'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,280 @@
+import copy
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .batch_indicators import stack_ohlcv, calculate_indicators_batch
+from .risk_manager import RiskManager
+
+
+def ta_signal_batch(indicators: Dict[str, np.ndarray]) -> np.ndarray:
+    """SignalGenerator._calculate_ta_signal applied element-wise to indicator arrays"""
+    with np.errstate(invalid='ignore'):
+        trend = np.sign(indicators['sma_20'] - indicators['sma_50'])
+        rsi = np.where(indicators['rsi'] > 70, -1.0, np.where(indicators['rsi'] < 30, 1.0, 0.0))
+        macd = np.sign(indicators['macd'] - indicators['macd_signal'])
+    return np.sign(np.nan_to_num(trend) + rsi + np.nan_to_num(macd))
+
+
+def combine_signals_batch(ml_signal: np.ndarray, ta_signal: np.ndarray, confidence: np.ndarray) -> np.ndarray:
+    """SignalGenerator._combine_signals applied element-wise"""
+    blended = np.where(ml_signal == ta_signal, ml_signal, np.sign(0.7 * ml_signal + 0.3 * ta_signal))
+    return np.where(confidence > 0.8, ml_signal, np.where(confidence > 0.6, blended, ta_signal))
+
+
+def align_ohlcv(frames: List[pd.DataFrame]) -> Tuple[Dict[str, np.ndarray], Optional[pd.DatetimeIndex]]:
+    """Align OHLCV frames on the union of their timestamps
+
+    Bars before a symbol's first candle stay NaN (calculate_indicators_batch
+    starts each row at its first valid bar); bars missing after that are
+    filled as flat candles at the previous close with zero volume so the
+    indicator recursions are not broken by gaps. Frames without a
+    'timestamp' column are right-aligned on their last bar instead.
+    """
+    if not all('timestamp' in df.columns for df in frames):
+        return stack_ohlcv(frames), None
+
+    index = pd.DatetimeIndex(sorted(set().union(*(df['timestamp'] for df in frames))))
+    matrix = {column: np.full((len(frames), len(index)), np.nan)
+              for column in ('open', 'high', 'low', 'close', 'volume')}
+    for row, df in enumerate(frames):
+        bars = df.drop_duplicates('timestamp', keep='last').set_index('timestamp').reindex(index)
+        close = bars['close'].ffill()
+        matrix['close'][row] = close.values
+        for column in ('open', 'high', 'low'):
+            matrix[column][row] = bars[column].fillna(close).values
+        volume = bars['volume'].fillna(0.0).values
+        matrix['volume'][row] = np.where(np.isnan(close.values), np.nan, volume)
+    return matrix, index
+
+
+def _max_drawdown(equity):
+    peak = np.maximum.accumulate(equity, axis=-1)
+    return np.max((peak - equity) / peak, axis=-1)
+
+
+class Backtester:
+    """Replay stored candles through the signal, ML and risk logic
+
+    ``run_vectorized`` precomputes indicators and model probabilities for the
+    whole history in one pass and evaluates positions and PnL as array
+    operations; stop-losses are not simulated there. ``run_event_driven``
+    reuses the same precomputed signals but walks bar by bar through the
+    RiskManager (position sizing, stop-loss, trade validation) and fills
+    stops exactly, including gaps through the stop price. It works on a
+    copy of the RiskManager, with time decay driven by bar timestamps, so
+    runs are reproducible and the caller's live risk state is untouched.
+    """
+
+    def __init__(self, ml_predictor=None, risk_manager: Optional[RiskManager] = None,
+                 initial_capital=100000.0, fee_rate=0.0004, periods_per_year=525600, chunk_size=50000):
+        self.ml_predictor = ml_predictor
+        self.risk_manager = risk_manager or RiskManager()
+        self.initial_capital = initial_capital
+        self.fee_rate = fee_rate
+        self.periods_per_year = periods_per_year
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+
+    def prepare(self, ohlcv_frames: Dict[str, pd.DataFrame]) -> Dict:
+        """Compute indicators and combined signals for every symbol and bar"""
+        symbols = list(ohlcv_frames)
+        matrix, timestamps = align_ohlcv([ohlcv_frames[symbol] for symbol in symbols])
+        indicators = calculate_indicators_batch(matrix['high'], matrix['low'], matrix['close'],
+                                                matrix['volume'], full=True)
+
+        ml_signal, confidence = self._predict_all(indicators)
+        ta_signal = ta_signal_batch(indicators)
+        signal = combine_signals_batch(ml_signal, ta_signal, confidence)
+
+        # No trading before every indicator has warmed up
+        warm = np.ones(signal.shape, dtype=bool)
+        for key in ('sma_50', 'macd_signal', 'rsi', 'volatility'):
+            warm &= ~np.isnan(indicators[key])
+        signal = np.where(warm, signal, 0.0)
+        for symbol, tradable in zip(symbols, warm.sum(axis=1)):
+            if tradable == 0:
+                self.logger.warning(f"{symbol}: not enough history for indicators to warm up, no tradable bars")
+
+        return {
+            'symbols': symbols,
+            'ohlcv': matrix,
+            'timestamps': timestamps,
+            'indicators': indicators,
+            'signal': signal,
+            'confidence': confidence
+        }
+
+    def _predict_all(self, indicators):
+        shape = indicators['close'].shape
+        if self.ml_predictor is None:
+            return np.zeros(shape), np.zeros(shape)
+
+        flat = {key: values.ravel() for key, values in indicators.items()}
+        n_rows = flat['close'].size
+        ml_signal = np.zeros(n_rows)
+        confidence = np.zeros(n_rows)
+        for start in range(0, n_rows, self.chunk_size):
+            chunk = {key: values[start:start + self.chunk_size] for key, values in flat.items()}
+            features = self.ml_predictor.prepare_features_batch(chunk)
+            labels, scores = self.ml_predictor.predict_batch(features)
+            if labels is None:
+                self.logger.warning("ML predictions unavailable, falling back to technical signals")
+                return np.zeros(shape), np.zeros(shape)
+            ml_signal[start:start + len(labels)] = labels
+            confidence[start:start + len(labels)] = scores
+        return ml_signal.reshape(shape), confidence.reshape(shape)
+
+    def _position_fraction(self, prepared):
+        """Vectorized RiskManager.calculate_position_size as a fraction of equity
+
+        The stateful market and time-decay factors are taken as neutral (1.0).
+        """
+        risk = self.risk_manager
+        volatility = np.nan_to_num(prepared['indicators']['volatility'])
+        vol_factor = 1 / (1 + np.exp(volatility - 0.5))
+        risk_factor = np.exp(-2 * (1 - prepared['confidence']))
+        fraction = np.minimum(risk.max_position_size * vol_factor * risk_factor, risk.max_position_size)
+
+        # validate_trade: loss at the stop must stay within max_drawdown
+        stop_distance = risk.stop_loss * np.clip(volatility / 0.02, 0.5, 2.0)
+        fraction = np.where(fraction * stop_distance > risk.max_drawdown, 0.0, fraction)
+        return prepared['signal'] * fraction
+
+    def run_vectorized(self, ohlcv_frames: Dict[str, pd.DataFrame], prepared=None) -> Dict:
+        """Fast path: whole-history PnL, drawdown and turnover as array operations"""
+        prepared = prepared or self.prepare(ohlcv_frames)
+        close = prepared['ohlcv']['close']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.nan_to_num(close[:, 1:] / close[:, :-1] - 1)
+
+        # Signal formed at the close of bar t earns the return of bar t + 1
+        position = self._position_fraction(prepared)
+        held = position[:, :-1]
+        turnover = np.abs(np.diff(position, axis=1, prepend=0.0))[:, :-1]
+        bar_pnl = held * returns - turnover * self.fee_rate
+
+        # Each symbol trades an equal slice of capital
+        portfolio_returns = bar_pnl.mean(axis=0)
+        equity = self.initial_capital * np.cumprod(1 + portfolio_returns)
+        symbol_equity = np.cumprod(1 + bar_pnl, axis=1)
+        return self._report(prepared['symbols'], equity, portfolio_returns, symbol_equity,
+                            turnover.sum(axis=1), n_trades=int(np.count_nonzero(np.diff(np.sign(position), axis=1))))
+
+    def run_event_driven(self, ohlcv_frames: Dict[str, pd.DataFrame], prepared=None) -> Dict:
+        """Exact path: bar-by-bar position tracking with RiskManager sizing, validation and stop fills"""
+        prepared = prepared or self.prepare(ohlcv_frames)
+        symbols = prepared['symbols']
+        ohlcv = prepared['ohlcv']
+        signal = prepared['signal']
+        confidence = prepared['confidence']
+        volatility = np.nan_to_num(prepared['indicators']['volatility'])
+        n_symbols, length = signal.shape
+
+        risk = copy.deepcopy(self.risk_manager)
+        timestamps = prepared.get('timestamps')
+        if timestamps is None:
+            # Synthetic clock: one bar every periods_per_year-th of a year
+            bar_seconds = 365 * 86400 / self.periods_per_year
+            timestamps = pd.Timestamp(0) + pd.to_timedelta(np.arange(length) * bar_seconds, unit='s')
+        bar_times = timestamps.to_pydatetime()
+        risk.last_update = bar_times[0]
+        cash = self.initial_capital
+        positions = {}
+        equity = np.empty(length)
+        turnover = np.zeros(n_symbols)
+        symbol_pnl = np.zeros((n_symbols, length))
+        peak = cash
+        n_trades = 0
+        stops_hit = 0
+
+        for t in range(length):
+            # Stops are checked against the bar's range before new signals are acted on
+            for s in list(positions):
+                pos = positions[s]
+                low, high, open_ = ohlcv['low'][s, t], ohlcv['high'][s, t], ohlcv['open'][s, t]
+                if pos['side'] == 'long' and low <= pos['stop_loss']:
+                    fill = min(open_, pos['stop_loss'])
+                elif pos['side'] == 'short' and high >= pos['stop_loss']:
+                    fill = max(open_, pos['stop_loss'])
+                else:
+                    continue
+                cash += self._close_position(pos, fill, symbol_pnl[s], t, turnover, s)
+                del positions[s]
+                stops_hit += 1
+
+            marked = cash + sum(self._mark(pos, ohlcv['close'][s, t]) for s, pos in positions.items())
+            peak = max(peak, marked)
+            risk.update_drawdown(marked, peak)
+
+            for s in range(n_symbols):
+                price = ohlcv['close'][s, t]
+                if np.isnan(price):
+                    continue
+                target = signal[s, t]
+                pos = positions.get(s)
+                side = 'long' if target > 0 else 'short' if target < 0 else None
+                if pos is not None and pos['side'] == side:
+                    continue
+                if pos is not None:
+                    cash += self._close_position(pos, price, symbol_pnl[s], t, turnover, s)
+                    del positions[s]
+                if side is None:
+                    continue
+
+                size = risk.calculate_position_size(marked, volatility[s, t], confidence[s, t],
+                                                    timestamp=bar_times[t])
+                stop_price = risk.calculate_stop_loss(price, side, volatility[s, t])
+                valid, _ = risk.validate_trade(marked, size, stop_price, price)
+                if not valid or size <= 0:
+                    continue
+                fee = size * self.fee_rate
+                cash -= fee
+                symbol_pnl[s, t] -= fee
+                turnover[s] += size / self.initial_capital
+                positions[s] = {'side': side, 'size': size, 'entry_price': price,
+                                'stop_loss': stop_price, 'timestamp': t}
+                n_trades += 1
+
+            equity[t] = cash + sum(self._mark(pos, ohlcv['close'][s, t]) for s, pos in positions.items())
+
+        portfolio_returns = np.diff(equity, prepend=self.initial_capital) / np.concatenate(
+            [[self.initial_capital], equity[:-1]])
+        symbol_equity = 1 + np.cumsum(symbol_pnl, axis=1) / (self.initial_capital / n_symbols)
+        report = self._report(symbols, equity, portfolio_returns, symbol_equity, turnover, n_trades)
+        report['stops_hit'] = stops_hit
+        return report
+
+    @staticmethod
+    def _mark(pos, price):
+        """Unrealised PnL of an open position (notional size in quote currency)"""
+        direction = 1 if pos['side'] == 'long' else -1
+        return direction * pos['size'] * (price / pos['entry_price'] - 1)
+
+    def _close_position(self, pos, price, pnl_row, t, turnover, s):
+        pnl = self._mark(pos, price) - pos['size'] * self.fee_rate
+        pnl_row[t] += pnl
+        turnover[s] += pos['size'] / self.initial_capital
+        return pnl
+
+    def _report(self, symbols, equity, portfolio_returns, symbol_equity, turnover, n_trades):
+        std = np.std(portfolio_returns)
+        sharpe = np.mean(portfolio_returns) / std * np.sqrt(self.periods_per_year) if std > 0 else 0.0
+        return {
+            'total_pnl': float(equity[-1] - self.initial_capital),
+            'total_return': float(equity[-1] / self.initial_capital - 1),
+            'max_drawdown': float(_max_drawdown(equity)),
+            'sharpe': float(sharpe),
+            'turnover': float(np.sum(turnover)),
+            'n_trades': n_trades,
+            'equity_curve': equity,
+            'per_symbol': {
+                symbol: {
+                    'total_return': float(symbol_equity[i, -1] - 1),
+                    'max_drawdown': float(_max_drawdown(symbol_equity[i])),
+                    'turnover': float(turnover[i])
+                }
+                for i, symbol in enumerate(symbols)
+            }
+        }
@@ -0,0 +1,190 @@
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Sequence
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .streaming_indicators import (
+    SMA_FAST, SMA_SLOW, EMA_PERIOD, RSI_PERIOD, MACD_FAST, MACD_SLOW,
+    MACD_SIGNAL, ATR_PERIOD, STDDEV_PERIOD
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def stack_ohlcv(ohlcv_frames: Sequence['pd.DataFrame'], length=None) -> Dict[str, np.ndarray]:
+    """把多个交易对的OHLCV DataFrame对齐为 (交易对 × 时间) 矩阵
+
+    每个交易对取最近length根K线 (默认取最长的长度, 不丢弃历史), 不足的部分在左侧填NaN。
+    calculate_indicators_batch会从每行第一个有效值处开始计算, 左侧的NaN不影响结果。
+    """
+    if length is None:
+        length = max(len(df) for df in ohlcv_frames)
+    matrix = {}
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        out = np.full((len(ohlcv_frames), length), np.nan)
+        for row, df in enumerate(ohlcv_frames):
+            values = df[column].values[-length:]
+            out[row, length - len(values):] = values
+        matrix[column] = out
+    return matrix
+
+
+def _sma(x, period):
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= period:
+        out[:, period - 1:] = sliding_window_view(x, period, axis=1).mean(axis=-1)
+    return out
+
+
+def _stddev(x, period):
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= period:
+        out[:, period - 1:] = sliding_window_view(x, period, axis=1).std(axis=-1)
+    return out
+
+
+def _recursive_smooth(x, alpha, seed_idx, seed):
+    """从seed_idx处的种子值开始, 沿时间轴做 y[t] = y[t-1] + alpha * (x[t] - y[t-1])"""
+    out = np.full(x.shape, np.nan)
+    if seed_idx >= x.shape[1]:
+        return out
+    out[:, seed_idx] = seed
+    if seed_idx + 1 < x.shape[1]:
+        # scipy.signal导入较慢, 只在真正计算时加载
+        from scipy.signal import lfilter
+
+        zi = ((1 - alpha) * seed)[:, None]
+        out[:, seed_idx + 1:], _ = lfilter([alpha], [1.0, alpha - 1.0], x[:, seed_idx + 1:], axis=1, zi=zi)
+    return out
+
+
+def _ema(x, period):
+    """talib风格EMA: 以前period个值的SMA为种子"""
+    if x.shape[1] < period:
+        return np.full(x.shape, np.nan)
+    return _recursive_smooth(x, 2.0 / (period + 1), period - 1, x[:, :period].mean(axis=1))
+
+
+def _wilder(x, period, first):
+    """Wilder平滑, first为第一个有效输入的位置"""
+    seed_idx = first + period - 1
+    if x.shape[1] <= seed_idx:
+        return np.full(x.shape, np.nan)
+    return _recursive_smooth(x, 1.0 / period, seed_idx, x[:, first:seed_idx + 1].mean(axis=1))
+
+
+def _macd(close):
+    n_rows, length = close.shape
+    macd = np.full(close.shape, np.nan)
+    signal = np.full(close.shape, np.nan)
+    start = MACD_SLOW - 1
+    if length <= start:
+        return macd, signal
+
+    # 与talib一致: 快慢线都在第MACD_SLOW根处起算
+    fast = _recursive_smooth(close, 2.0 / (MACD_FAST + 1), start,
+                             close[:, start - MACD_FAST + 1:start + 1].mean(axis=1))
+    slow = _recursive_smooth(close, 2.0 / (MACD_SLOW + 1), start,
+                             close[:, :start + 1].mean(axis=1))
+    line = fast - slow
+
+    signal_idx = start + MACD_SIGNAL - 1
+    if length <= signal_idx:
+        return macd, signal
+    signal = _recursive_smooth(line, 2.0 / (MACD_SIGNAL + 1), signal_idx,
+                               line[:, start:signal_idx + 1].mean(axis=1))
+    macd[:, signal_idx:] = line[:, signal_idx:]
+    return macd, signal
+
+
+def _rsi(close):
+    change = np.diff(close, axis=1)
+    gains = np.zeros(close.shape)
+    losses = np.zeros(close.shape)
+    gains[:, 1:] = np.where(change > 0, change, 0.0)
+    losses[:, 1:] = np.where(change < 0, -change, 0.0)
+    avg_gain = _wilder(gains, RSI_PERIOD, 1)
+    avg_loss = _wilder(losses, RSI_PERIOD, 1)
+    total = avg_gain + avg_loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+    rsi[np.isnan(total)] = np.nan
+    return rsi
+
+
+def _atr(high, low, close):
+    prev_close = close[:, :-1]
+    true_range = np.zeros(close.shape)
+    true_range[:, 1:] = np.maximum.reduce([
+        high[:, 1:] - low[:, 1:],
+        np.abs(high[:, 1:] - prev_close),
+        np.abs(low[:, 1:] - prev_close)
+    ])
+    return _wilder(true_range, ATR_PERIOD, 1)
+
+
+def _obv(close, volume):
+    direction = np.zeros(close.shape)
+    direction[:, 1:] = np.sign(np.diff(close, axis=1))
+    direction[:, 0] = 1.0
+    return np.cumsum(direction * volume, axis=1)
+
+
+def _indicators(high, low, close, volume) -> Dict[str, np.ndarray]:
+    """对没有左侧填充的矩阵计算完整的指标序列"""
+    macd, macd_signal = _macd(close)
+    return {
+        'sma_20': _sma(close, SMA_FAST),
+        'sma_50': _sma(close, SMA_SLOW),
+        'ema_12': _ema(close, EMA_PERIOD),
+        'rsi': _rsi(close),
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'atr': _atr(high, low, close),
+        'volatility': _stddev(close, STDDEV_PERIOD),
+        'obv': _obv(close, volume),
+        'close': close
+    }
+
+
+def _first_valid(close) -> np.ndarray:
+    """每行左侧NaN填充的长度 (全为NaN时等于列数)"""
+    valid = ~np.isnan(close)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), close.shape[1])
+
+
+def calculate_indicators_batch(high, low, close, volume, full=False) -> Dict[str, np.ndarray]:
+    """对 (交易对 × 时间) 矩阵批量计算技术指标
+
+    指标与SignalGenerator.calculate_technical_indicators相同, 结果与talib逐行计算一致。
+    历史长度不同的交易对可以在左侧用NaN填充 (见stack_ohlcv): 每行从第一个有效值处
+    开始计算, 相同起点的行一起向量化计算, 结果等同于对该行未填充的数据单独计算。
+    有效值之后出现的NaN按talib的方式向后传播。
+    返回列式结果: 每个指标一个数组; full=False时每个数组形状为 (交易对,) 只保留最新值,
+    full=True时保留完整的 (交易对 × 时间) 序列。
+    """
+    high, low, close, volume = (np.atleast_2d(np.asarray(a, dtype=float))
+                                for a in (high, low, close, volume))
+
+    first = _first_valid(close)
+    if not first.any():
+        result = _indicators(high, low, close, volume)
+    else:
+        result = {key: np.full(close.shape, np.nan) for key in
+                  ('sma_20', 'sma_50', 'ema_12', 'rsi', 'macd', 'macd_signal', 'atr', 'volatility', 'obv', 'close')}
+        for start in np.unique(first):
+            if start >= close.shape[1]:
+                continue
+            rows = np.flatnonzero(first == start)
+            part = _indicators(high[rows, start:], low[rows, start:], close[rows, start:], volume[rows, start:])
+            for key, values in part.items():
+                result[key][rows, start:] = values
+    if not full:
+        result = {key: values[:, -1].copy() for key, values in result.items()}
+    return result
+
+
+def calculate_indicators_for_frames(ohlcv_frames: Sequence['pd.DataFrame'], length=None, full=False) -> Dict[str, np.ndarray]:
+    """对多个OHLCV DataFrame批量计算指标的便捷入口"""
+    matrix = stack_ohlcv(ohlcv_frames, length)
+    return calculate_indicators_batch(matrix['high'], matrix['low'], matrix['close'], matrix['volume'], full=full)
@@ -0,0 +1,147 @@
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+from .metrics import metrics
+
+
+def normalize_text(text) -> str:
+    """Cache key for free text: surrounding and repeated whitespace removed"""
+    return ' '.join(str(text).split())
+
+
+class MicroBatcher:
+    """Turns single inference requests into batched calls of fn(items) -> results
+
+    submit() returns a Future straight away. A background thread takes the
+    first queued request, keeps collecting until max_batch items arrived or
+    max_wait_ms passed, and runs fn once on the whole batch. Identical
+    requests (same key) share one future while in flight and are served
+    from an LRU result cache afterwards. cache_size=0 disables both, e.g.
+    for sampled text generation where every caller needs its own sample.
+    """
+
+    _STOP = object()
+
+    def __init__(self, fn: Callable[[List], Sequence], max_batch=32, max_wait_ms=10.0,
+                 cache_size=4096, key: Optional[Callable[[object], Hashable]] = None,
+                 name='batch'):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache_size = int(cache_size)
+        self.key = key or (lambda item: item)
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = queue.Queue()
+        self._cache = OrderedDict()
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'batches': 0, 'items': 0}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, item) -> Future:
+        key = self.key(item)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f'{self.name} batcher is closed')
+            self.stats['requests'] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+            if self.cache_size > 0:
+                future = self._pending.get(key)
+                if future is not None:
+                    self.stats['coalesced'] += 1
+                    return future
+                future = self._pending[key] = Future()
+            else:
+                future = Future()
+            self._ensure_started()
+        self._queue.put((key, item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def map(self, items, timeout=None) -> List:
+        """Submit all items before waiting so they land in as few batches as possible"""
+        futures = [self.submit(item) for item in items]
+        return [future.result(timeout) for future in futures]
+
+    def _collect(self, first) -> List:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is self._STOP:
+                self._queue.put(entry)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is self._STOP:
+                return
+            batch = self._collect(first)
+            started = time.perf_counter()
+            try:
+                results = list(self.fn([item for _, item, _ in batch]))
+                if len(results) != len(batch):
+                    raise ValueError(f'{self.name}: got {len(results)} results for {len(batch)} inputs')
+            except Exception as e:
+                self.logger.error(f"Error in batched {self.name} inference: {str(e)}")
+                with self._lock:
+                    for key, _, future in batch:
+                        self._pending.pop(key, None)
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            metrics.observe(f'{self.name}_batch', time.perf_counter() - started)
+            metrics.increment(f'{self.name}_batch_items', len(batch))
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['items'] += len(batch)
+                for (key, _, _), result in zip(batch, results):
+                    self._pending.pop(key, None)
+                    if self.cache_size > 0:
+                        self._cache[key] = result
+                        self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def close(self, timeout=None):
+        """Finish queued requests, then stop the worker thread"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join(timeout)
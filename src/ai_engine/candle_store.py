@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import logging
+from typing import Dict, Optional, Tuple
+
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8')
+])
+
+
+class CandleRingBuffer:
+    """固定容量的K线环形缓冲区
+
+    每根K线同时写入位置 i 和 i + capacity, 因此最近 size 根K线在底层数组中
+    始终是连续的一段, window() 可以直接返回零拷贝视图。
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=CANDLE_DTYPE)
+        self._head = 0  # 下一根K线的写入位置
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """最后一根K线的开盘时间戳(毫秒), 缓冲区为空时返回None"""
+        if self.size == 0:
+            return None
+        return int(self._data['timestamp'][self._head - 1 + self.capacity])
+
+    def _write(self, pos, candle):
+        self._data[pos] = candle
+        self._data[pos + self.capacity] = candle
+
+    def append(self, candle):
+        """追加一根新K线"""
+        self._write(self._head, tuple(candle))
+        self._head = (self._head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def replace_last(self, candle):
+        """替换最后一根(仍在形成中的)K线"""
+        if self.size == 0:
+            raise IndexError("replace_last on empty buffer")
+        self._write((self._head - 1) % self.capacity, tuple(candle))
+
+    def extend(self, ohlcv) -> int:
+        """合并交易所返回的OHLCV行, 返回新增K线数量
+
+        时间戳与最后一根相同的K线会替换它, 更早的K线被忽略。
+        """
+        added = 0
+        for candle in ohlcv:
+            last_ts = self.last_timestamp
+            ts = int(candle[0])
+            if last_ts is None or ts > last_ts:
+                self.append(candle)
+                added += 1
+            elif ts == last_ts:
+                self.replace_last(candle)
+        return added
+
+    def window(self, n=None) -> np.ndarray:
+        """返回最近n根K线的零拷贝结构化数组视图(按时间升序)"""
+        n = self.size if n is None else min(n, self.size)
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+    def column(self, name, n=None) -> np.ndarray:
+        """返回单个字段的零拷贝视图, 例如 column('close')"""
+        return self.window(n)[name]
+
+    def to_dataframe(self, n=None) -> pd.DataFrame:
+        """转换为与MarketDataCollector.fetch_historical_data相同格式的DataFrame(会复制数据)"""
+        df = pd.DataFrame(self.window(n))
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+
+class CandleStore:
+    """按交易对/周期维护K线环形缓冲区, 每次只增量拉取最新K线
+
+    page_limit为单次请求的K线数上限, 应不大于交易所的分页上限。
+    """
+
+    def __init__(self, collector, capacity=1000, page_limit=500):
+        self.collector = collector
+        self.capacity = capacity
+        self.page_limit = page_limit
+        self.buffers: Dict[Tuple[str, str], CandleRingBuffer] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def get_buffer(self, symbol, timeframe='1h') -> CandleRingBuffer:
+        key = (symbol, timeframe)
+        if key not in self.buffers:
+            self.buffers[key] = CandleRingBuffer(self.capacity)
+        return self.buffers[key]
+
+    def update(self, symbol, timeframe='1h') -> Optional[CandleRingBuffer]:
+        """拉取上次最后一根K线之后(含该K线)的数据并合并到缓冲区
+
+        缺口超过一页时逐页拉取, 直到返回不满一页或最后时间戳不再前进, 保证缓冲区追到最新。
+        """
+        buffer = self.get_buffer(symbol, timeframe)
+        exchange = self.collector.exchange
+        try:
+            since = buffer.last_timestamp
+            if since is None:
+                buffer.extend(exchange.fetch_ohlcv(symbol, timeframe, limit=self.capacity))
+                return buffer
+            while True:
+                # 从最后一根K线开始拉取, 以便替换仍在形成中的那一根
+                ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=self.page_limit)
+                buffer.extend(ohlcv)
+                last_ts = buffer.last_timestamp
+                if len(ohlcv) < self.page_limit or last_ts <= since:
+                    return buffer
+                since = last_ts
+        except Exception as e:
+            self.logger.error(f"Error updating candles for {symbol} {timeframe}: {str(e)}")
+            return None
+
+    def window(self, symbol, timeframe='1h', n=None) -> Optional[np.ndarray]:
+        """返回指定交易对最近n根K线的零拷贝视图"""
+        key = (symbol, timeframe)
+        if key not in self.buffers:
+            return None
+        return self.buffers[key].window(n)
@@ -0,0 +1,212 @@
+import os
+import glob
+import time
+import itertools
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+
+DAY_MS = 86400000
+
+# 每种数据的存储列及去重键
+SCHEMAS = {
+    'candles': {
+        'columns': ['timestamp', 'open', 'high', 'low', 'close', 'volume'],
+        'dedup': ['timestamp']
+    },
+    'trades': {
+        'columns': ['timestamp', 'id', 'side', 'price', 'amount'],
+        'dedup': ['timestamp', 'id', 'price', 'amount']
+    },
+    'orderbook': {
+        'columns': ['timestamp', 'bid_price', 'bid_amount', 'ask_price', 'ask_amount'],
+        'dedup': ['timestamp']
+    }
+}
+
+
+def _to_millis(values) -> np.ndarray:
+    """把datetime或毫秒时间戳统一转换为int64毫秒, 带时区的时间先转换为UTC"""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ms]').astype('int64').values
+    return values.astype('int64').values
+
+
+def _as_millis(value) -> int:
+    """把单个时间点(毫秒时间戳、datetime或字符串, 无时区按UTC处理)转换为毫秒"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value // 1000000
+
+
+def _day(ms) -> str:
+    return datetime.fromtimestamp(int(ms) // DAY_MS * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+class MarketDataStore:
+    """按交易对和日期分区的本地列式行情存储
+
+    目录结构为 root/<kind>/<symbol>/<YYYY-MM-DD>/*.parquet。写入只追加新的小文件,
+    读取时只打开时间范围覆盖到的日期分区, 并通过Parquet行组统计过滤时间戳,
+    无需加载整个文件; compact() 把同一分区的小文件合并、排序并去重。
+    """
+
+    def __init__(self, root_dir, row_group_size=65536):
+        self.root_dir = root_dir
+        self.row_group_size = row_group_size
+        self.logger = logging.getLogger(__name__)
+        self._counter = itertools.count()
+
+    def _partition_dir(self, kind, symbol, day):
+        return os.path.join(self.root_dir, kind, symbol.replace('/', '_').replace(':', '_'), day)
+
+    def _write(self, kind, symbol, df: pd.DataFrame) -> int:
+        """按日期切分后追加写入, 返回写入行数"""
+        if df is None or df.empty:
+            return 0
+        df = df[SCHEMAS[kind]['columns']]
+        days = df['timestamp'].values // DAY_MS
+        for day_value in np.unique(days):
+            part = df[days == day_value]
+            partition = self._partition_dir(kind, symbol, _day(day_value * DAY_MS))
+            os.makedirs(partition, exist_ok=True)
+            name = f"part-{time.time_ns()}-{os.getpid()}-{next(self._counter)}.parquet"
+            tmp_path = os.path.join(partition, '.' + name)
+            pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp_path,
+                           row_group_size=self.row_group_size)
+            # 写完再重命名, 读取方不会看到半个文件
+            os.replace(tmp_path, os.path.join(partition, name))
+        return len(df)
+
+    def append_candles(self, symbol, ohlcv: pd.DataFrame) -> int:
+        """追加K线 (MarketDataCollector.fetch_historical_data的输出格式)"""
+        try:
+            df = ohlcv.copy()
+            df['timestamp'] = _to_millis(df['timestamp'])
+            return self._write('candles', symbol, df)
+        except Exception as e:
+            self.logger.error(f"Error storing candles for {symbol}: {str(e)}")
+            return 0
+
+    def append_trades(self, symbol, trades: pd.DataFrame) -> int:
+        """追加成交记录 (MarketDataCollector.fetch_recent_trades的输出格式)"""
+        try:
+            if trades is None or trades.empty:
+                return 0
+            df = pd.DataFrame({
+                'timestamp': _to_millis(trades['timestamp']),
+                'id': trades['id'].astype(str) if 'id' in trades else '',
+                'side': trades['side'].astype(str) if 'side' in trades else '',
+                'price': trades['price'].astype(float),
+                'amount': trades['amount'].astype(float)
+            })
+            return self._write('trades', symbol, df)
+        except Exception as e:
+            self.logger.error(f"Error storing trades for {symbol}: {str(e)}")
+            return 0
+
+    def append_orderbook(self, symbol, orderbook: Dict) -> int:
+        """追加一份深度快照 (MarketDataCollector.fetch_orderbook的输出格式)"""
+        try:
+            if orderbook is None:
+                return 0
+            bids = np.asarray(orderbook['bids'], dtype=float).reshape(-1, 2)
+            asks = np.asarray(orderbook['asks'], dtype=float).reshape(-1, 2)
+            timestamp = orderbook['timestamp'] or int(time.time() * 1000)
+            df = pd.DataFrame({
+                'timestamp': [int(timestamp)],
+                'bid_price': [bids[:, 0]],
+                'bid_amount': [bids[:, 1]],
+                'ask_price': [asks[:, 0]],
+                'ask_amount': [asks[:, 1]]
+            })
+            return self._write('orderbook', symbol, df)
+        except Exception as e:
+            self.logger.error(f"Error storing orderbook for {symbol}: {str(e)}")
+            return 0
+
+    def _partitions(self, kind, symbol, start_ms, end_ms) -> List[str]:
+        base = os.path.dirname(self._partition_dir(kind, symbol, 'x'))
+        if not os.path.isdir(base):
+            return []
+        first, last = _day(start_ms), _day(end_ms)
+        return [os.path.join(base, day) for day in sorted(os.listdir(base)) if first <= day <= last]
+
+    def read(self, kind, symbol, start=None, end=None, columns=None, as_numpy=False):
+        """读取[start, end)时间范围内的数据
+
+        start/end可以是毫秒时间戳、datetime或字符串; 默认返回按时间排序的DataFrame,
+        as_numpy=True时返回 {列名: ndarray}。时间过滤下推到Parquet行组, 只解码命中的行组。
+        """
+        start_ms = 0 if start is None else _as_millis(start)
+        end_ms = int(time.time() * 1000) + DAY_MS if end is None else _as_millis(end)
+        columns = list(columns or SCHEMAS[kind]['columns'])
+        dedup = SCHEMAS[kind]['dedup']
+        read_columns = columns + [key for key in dedup if key not in columns]
+
+        paths = []
+        for partition in self._partitions(kind, symbol, start_ms, end_ms):
+            paths.extend(sorted(glob.glob(os.path.join(partition, '*.parquet'))))
+        tables = [
+            pq.read_table(path, columns=read_columns, memory_map=True,
+                          filters=[('timestamp', '>=', start_ms), ('timestamp', '<', end_ms)])
+            for path in paths
+        ]
+
+        if tables:
+            df = pa.concat_tables(tables).to_pandas()
+            if len(paths) > 1:
+                # 未合并的分区可能含有重复数据, 文件按写入顺序排列, 保留最新一条
+                df = df.drop_duplicates(subset=dedup, keep='last')
+            df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)[columns]
+        else:
+            df = pd.DataFrame({column: [] for column in columns})
+
+        if as_numpy:
+            return {column: df[column].values for column in columns}
+        if kind == 'candles' and 'timestamp' in columns:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def read_candles(self, symbol, start=None, end=None, **kwargs):
+        return self.read('candles', symbol, start, end, **kwargs)
+
+    def read_trades(self, symbol, start=None, end=None, **kwargs):
+        return self.read('trades', symbol, start, end, **kwargs)
+
+    def read_orderbooks(self, symbol, start=None, end=None, **kwargs):
+        return self.read('orderbook', symbol, start, end, **kwargs)
+
+    def compact(self, kind=None, min_parts=2) -> int:
+        """合并分区内的小文件: 排序、按去重键保留最新一条, 返回被合并的分区数量"""
+        kinds = [kind] if kind else list(SCHEMAS)
+        compacted = 0
+        for kind in kinds:
+            for partition in glob.glob(os.path.join(self.root_dir, kind, '*', '*')):
+                parts = sorted(glob.glob(os.path.join(partition, '*.parquet')))
+                if len(parts) < min_parts:
+                    continue
+                try:
+                    df = pd.concat([pq.read_table(path).to_pandas() for path in parts], ignore_index=True)
+                    dedup = SCHEMAS[kind]['dedup']
+                    df = df.drop_duplicates(subset=dedup, keep='last').sort_values('timestamp', kind='stable')
+
+                    name = f"compacted-{time.time_ns()}.parquet"
+                    tmp_path = os.path.join(partition, '.' + name)
+                    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                                   row_group_size=self.row_group_size)
+                    os.replace(tmp_path, os.path.join(partition, name))
+                    # 只删除开始时看到的文件, 期间新追加的文件留到下次合并
+                    for path in parts:
+                        os.remove(path)
+                    compacted += 1
+                except Exception as e:
+                    self.logger.error(f"Error compacting {partition}: {str(e)}")
+        return compacted
@@ -0,0 +1,207 @@
+import json
+import numpy as np
+
+_MAGIC = b'FFOREST1'
+_ALIGN = 64
+
+
+class FlatForest:
+    """Array-based representation of a trained tree ensemble for fast inference
+
+    All trees are concatenated into contiguous node arrays (feature,
+    threshold, left/right child, leaf value), so prediction walks every tree
+    for every sample with a handful of vectorized NumPy operations instead
+    of sklearn's per-estimator predict machinery. Exposes ``classes_`` and
+    ``predict_proba`` so it can be used in place of the sklearn model in
+    ``MLPredictor.models``.
+    """
+
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+    def __init__(self, kind, classes, n_features, feature, threshold, left, right, value, roots,
+                 max_depth, learning_rate=1.0, init_raw=None):
+        self.kind = kind
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.learning_rate = learning_rate
+        self.init_raw = np.zeros(value.shape[1]) if init_raw is None else np.asarray(init_raw, dtype=float)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export a fitted RandomForestClassifier or GradientBoostingClassifier"""
+        # sklearn is only needed for exporting, not for loading or predicting
+        from sklearn.dummy import DummyClassifier
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+        
+        if isinstance(model, RandomForestClassifier):
+            kind = 'rf'
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            learning_rate, init_raw = 1.0, None
+        elif isinstance(model, GradientBoostingClassifier):
+            if not (model.init_ == 'zero' or isinstance(model.init_, DummyClassifier)):
+                raise ValueError("Only the default prior or 'zero' init is supported")
+            kind = 'gb'
+            # estimators_ is (n_stages, K); flattening keeps class k at position k of every stage
+            trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+            learning_rate = model.learning_rate
+            # The init score is constant, so recover it from the public API:
+            # the raw score at any point minus the scaled sum of the tree outputs
+            probe = np.zeros((1, model.n_features_in_), dtype=np.float32)
+            stage_sum = np.array([[tree.predict(probe)[0] for tree in stage] for stage in model.estimators_]).sum(axis=0)
+            init_raw = np.ravel(model.decision_function(probe)) - learning_rate * stage_sum
+        else:
+            raise TypeError(f"Unsupported model type: {type(model).__name__}")
+
+        sizes = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+
+        feature, threshold, left, right, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            is_leaf = tree.children_left < 0
+            feature.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+            threshold.append(tree.threshold.astype(np.float64))
+            # Leaves point at themselves so extra traversal steps are no-ops
+            own = np.arange(tree.node_count) + offset
+            left.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int64))
+            right.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int64))
+            node_value = tree.value[:, 0, :].astype(np.float64)
+            if kind == 'rf':
+                totals = node_value.sum(axis=1, keepdims=True)
+                node_value = np.divide(node_value, totals, out=np.zeros_like(node_value), where=totals > 0)
+            value.append(node_value)
+
+        return cls(
+            kind=kind,
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            value=np.concatenate(value),
+            roots=offsets,
+            max_depth=max(tree.max_depth for tree in trees),
+            learning_rate=learning_rate,
+            init_raw=init_raw
+        )
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            go_left = X[rows, np.maximum(feature, 0)] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def decision_function(self, X):
+        """Raw ensemble output (summed leaf values) before the probability link"""
+        leaves = self.value[self.apply(X)]
+        if self.kind == 'rf':
+            return leaves.mean(axis=1)
+        n_classes = self.init_raw.shape[0]
+        per_stage = leaves[:, :, 0].reshape(leaves.shape[0], -1, n_classes)
+        return self.init_raw + self.learning_rate * per_stage.sum(axis=1)
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        if self.kind == 'rf':
+            return raw
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        """Write the forest to a single file whose arrays can be memory-mapped"""
+        header = {
+            'kind': self.kind,
+            'classes': self.classes_.tolist(),
+            'n_features': int(self.n_features_in_),
+            'max_depth': int(self.max_depth),
+            'learning_rate': float(self.learning_rate),
+            'init_raw': self.init_raw.tolist(),
+            'arrays': {}
+        }
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self.ARRAYS}
+
+        # Reserve room for the header, then lay the arrays out at aligned offsets
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': 0}
+        header_size = len(json.dumps(header)) + 32 * len(arrays) + _ALIGN
+        offset = _aligned(len(_MAGIC) + 8 + header_size)
+        for name, array in arrays.items():
+            header['arrays'][name]['offset'] = offset
+            offset = _aligned(offset + array.nbytes)
+
+        encoded = json.dumps(header).encode('utf-8').ljust(header_size)
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(header_size).tobytes())
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(header['arrays'][name]['offset'])
+                f.write(array.tobytes())
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a forest written by save(); with mmap=True arrays are read-only views of the file"""
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a FlatForest file")
+            header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_size).decode('utf-8'))
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            if mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=spec['offset'], shape=shape)
+            else:
+                with open(path, 'rb') as f:
+                    f.seek(spec['offset'])
+                    count = int(np.prod(shape))
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+
+        return cls(
+            kind=header['kind'],
+            classes=header['classes'],
+            n_features=header['n_features'],
+            max_depth=header['max_depth'],
+            learning_rate=header['learning_rate'],
+            init_raw=header['init_raw'],
+            **arrays
+        )
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def verify_parity(model, X, atol=1e-9):
+    """Check that the exported forest reproduces sklearn's predict_proba on X
+
+    Returns the maximum absolute difference; raises AssertionError when it
+    exceeds ``atol``.
+    """
+    forest = FlatForest.from_sklearn(model)
+    expected = model.predict_proba(X)
+    actual = forest.predict_proba(X)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=atol)
+    return float(np.max(np.abs(actual - expected)))
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import json
+import logging
+import importlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cold-import budgets (seconds, median of fresh interpreters) checked by check_import_times
+IMPORT_BUDGETS = {
+    'ai_engine': 0.3,
+    'ai_engine.risk_manager': 0.6,
+    'ai_engine.streaming_indicators': 0.6,
+    'ai_engine.batch_indicators': 0.6,
+    'ai_engine.market_data': 0.6,
+    'ai_engine.async_market_data': 0.6,
+    'ai_engine.ml_models': 0.6,
+    'ai_engine.model_registry': 0.6,
+    'ai_engine.signal_generator': 0.6,
+    'ai_engine.trading_engine': 0.6,
+    'ai_engine.meme_generator': 0.6,
+    'ai_engine.voice_generator': 0.6,
+}
+
+
+class LazyModule:
+    """Module proxy that performs the real import on first attribute access
+
+    Module-level ``pd = lazy_import('pandas')`` keeps call sites unchanged
+    while moving the import cost to the first call that actually needs it.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name) -> LazyModule:
+    return LazyModule(name)
+
+
+class SharedModel:
+    """Process-wide handle to an expensive model, created on first get()
+
+    Every instance that asks for the same key shares one object, so
+    constructing several generators does not load the same weights twice.
+    """
+
+    def __init__(self, key, factory: Callable[[], object]):
+        self.key = key
+        self.factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        model = self._model
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    self._model = self.factory()
+                    self.load_seconds = time.perf_counter() - started
+                    logger.info(f"Loaded shared model {self.key} in {self.load_seconds:.2f}s")
+                model = self._model
+        return model
+
+    def release(self):
+        """Drop the process-wide reference; the next get() loads it again"""
+        with self._lock:
+            self._model = None
+
+
+_MODELS: Dict[str, SharedModel] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def shared_model(key, factory: Callable[[], object]) -> SharedModel:
+    """Register (once) and return the handle for key; nothing is loaded yet"""
+    with _MODELS_LOCK:
+        handle = _MODELS.get(key)
+        if handle is None:
+            handle = _MODELS[key] = SharedModel(key, factory)
+        return handle
+
+
+def pipeline_handle(task, model=None) -> SharedModel:
+    """Shared HuggingFace transformers pipeline for (task, model)"""
+    def factory():
+        from transformers import pipeline
+        return pipeline(task, model=model) if model else pipeline(task)
+    return shared_model(f"transformers.pipeline:{task}:{model or 'default'}", factory)
+
+
+def registered_models() -> Dict[str, bool]:
+    """Registered handle keys and whether each one is loaded"""
+    return {key: handle.loaded for key, handle in _MODELS.items()}
+
+
+def preload(keys: Optional[Iterable[str]] = None, parallel=True) -> Dict[str, float]:
+    """Load registered models up front (e.g. at server start) and return load times
+
+    Handles are registered when the generator modules are imported or
+    instantiated, so import those first. Loading runs in threads because
+    model construction is mostly I/O and native code.
+    """
+    handles = [_MODELS[key] for key in keys] if keys is not None else list(_MODELS.values())
+
+    def load(handle):
+        handle.get()
+        return handle.key, handle.load_seconds or 0.0
+
+    if parallel and len(handles) > 1:
+        with ThreadPoolExecutor(max_workers=len(handles)) as pool:
+            return dict(pool.map(load, handles))
+    return dict(load(handle) for handle in handles)
+
+
+def measure_import(module, runs=5, python=None) -> float:
+    """Median cold-import time of module in fresh interpreters"""
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import time; t = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - t)")
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_parent, env.get('PYTHONPATH')]))
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([python or sys.executable, '-c', code], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def check_import_times(budgets: Optional[Dict[str, float]] = None, runs=5, baseline_path=None,
+                       tolerance=1.5) -> Dict[str, float]:
+    """Fail (AssertionError) when a cold import exceeds its budget
+
+    With baseline_path, a module also fails if it is slower than tolerance
+    times the recorded baseline; missing baselines are written on first run.
+    """
+    budgets = dict(budgets or IMPORT_BUDGETS)
+    baseline = {}
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    timings = {module: measure_import(module, runs) for module in budgets}
+    failures = []
+    for module, seconds in timings.items():
+        if seconds > budgets[module]:
+            failures.append(f"{module}: {seconds:.3f}s > budget {budgets[module]:.3f}s")
+        if module in baseline and seconds > baseline[module] * tolerance:
+            failures.append(f"{module}: {seconds:.3f}s > {tolerance}x baseline {baseline[module]:.3f}s")
+
+    if baseline_path:
+        missing = {module: seconds for module, seconds in timings.items() if module not in baseline}
+        if missing:
+            baseline.update(missing)
+            with open(baseline_path, 'w') as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+    if failures:
+        raise AssertionError("Import time regression:\n" + '\n'.join(failures))
+    return timings
@@ -0,0 +1,226 @@
+import json
+import time
+import asyncio
+import numpy as np
+import logging
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+
+class PriceLevels:
+    """按价格升序保存的数组型价位表"""
+
+    def __init__(self):
+        self.prices = np.empty(0)
+        self.amounts = np.empty(0)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def reset(self, levels):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 2)
+        levels = levels[levels[:, 1] > 0]
+        order = np.argsort(levels[:, 0], kind='stable')
+        self.prices = levels[order, 0].copy()
+        self.amounts = levels[order, 1].copy()
+
+    def apply(self, levels):
+        """批量应用增量: 数量为0表示删除该价位, 否则覆盖或插入"""
+        levels = np.asarray(levels, dtype=float).reshape(-1, 2)
+        if len(levels) == 0:
+            return
+        # 同一价位在一条消息里出现多次时以最后一次为准
+        prices, last = np.unique(levels[::-1, 0], return_index=True)
+        amounts = levels[::-1, 1][last]
+
+        idx = np.searchsorted(self.prices, prices)
+        in_range = idx < len(self.prices)
+        match = np.zeros(len(prices), dtype=bool)
+        match[in_range] = self.prices[idx[in_range]] == prices[in_range]
+        self.amounts[idx[match]] = amounts[match]
+
+        new = ~match & (amounts > 0)
+        if new.any():
+            self.prices = np.insert(self.prices, idx[new], prices[new])
+            self.amounts = np.insert(self.amounts, idx[new], amounts[new])
+
+        if (amounts[match] == 0).any():
+            keep = self.amounts > 0
+            self.prices = self.prices[keep]
+            self.amounts = self.amounts[keep]
+
+
+class LocalOrderBook:
+    """由一次快照加增量深度推送维护的本地L2订单簿
+
+    增量消息使用Binance diff-depth格式 (U/u首末更新ID, 合约流另带pu),
+    检测到序号缺口时自动丢弃本地状态并重新拉取快照同步。
+    snapshot_provider(symbol) 需返回 {'bids', 'asks', 'lastUpdateId'}。
+    """
+
+    def __init__(self, symbol, snapshot_provider: Callable[[str], Dict], max_pending=10000):
+        self.symbol = symbol
+        self.snapshot_provider = snapshot_provider
+        self.bids = PriceLevels()
+        self.asks = PriceLevels()
+        self.last_update_id = None
+        self.timestamp = None
+        self.synced = False
+        self.resync_count = 0
+        self._pending = deque(maxlen=max_pending)
+        self.logger = logging.getLogger(__name__)
+
+    def load_snapshot(self):
+        snapshot = self.snapshot_provider(self.symbol)
+        self.bids.reset(snapshot['bids'])
+        self.asks.reset(snapshot['asks'])
+        self.last_update_id = int(snapshot['lastUpdateId'])
+        self.timestamp = snapshot.get('timestamp')
+
+    def resync(self):
+        """丢弃本地状态, 下一条消息到达时重新从快照同步"""
+        self.synced = False
+        self.last_update_id = None
+        self.resync_count += 1
+
+    def _is_next(self, event):
+        if 'pu' in event:
+            return int(event['pu']) == self.last_update_id
+        return int(event['U']) == self.last_update_id + 1
+
+    def _apply(self, event):
+        self.bids.apply(event.get('b', []))
+        self.asks.apply(event.get('a', []))
+        self.last_update_id = int(event['u'])
+        self.timestamp = event.get('E', self.timestamp)
+
+    def _try_sync(self):
+        if self.last_update_id is None:
+            self.load_snapshot()
+
+        while self._pending and int(self._pending[0]['u']) <= self.last_update_id:
+            self._pending.popleft()
+        if not self._pending:
+            return False
+
+        first = self._pending[0]
+        if int(first['U']) > self.last_update_id + 1:
+            # 快照早于缓冲的第一条消息, 中间缺失的更新无法补齐, 重新取快照
+            self.load_snapshot()
+            return False
+
+        self._apply(self._pending.popleft())
+        while self._pending:
+            event = self._pending.popleft()
+            if not self._is_next(event):
+                self.resync()
+                return False
+            self._apply(event)
+        self.synced = True
+        return True
+
+    def process(self, event: Dict) -> bool:
+        """处理一条增量消息, 返回订单簿当前是否处于同步状态"""
+        try:
+            if self.synced and not self._is_next(event):
+                self.logger.warning(f"Sequence gap on {self.symbol}: expected {self.last_update_id + 1}, "
+                                    f"got U={event['U']}; resyncing")
+                self.resync()
+            if not self.synced:
+                self._pending.append(event)
+                return self._try_sync()
+            self._apply(event)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error processing depth update for {self.symbol}: {str(e)}")
+            self.resync()
+            return False
+
+    def best_bid(self):
+        return (self.bids.prices[-1], self.bids.amounts[-1]) if len(self.bids) else None
+
+    def best_ask(self):
+        return (self.asks.prices[0], self.asks.amounts[0]) if len(self.asks) else None
+
+    def depth(self, limit=20):
+        """返回前limit档, bids按价格降序, asks按价格升序"""
+        bids = np.column_stack([self.bids.prices[::-1][:limit], self.bids.amounts[::-1][:limit]])
+        asks = np.column_stack([self.asks.prices[:limit], self.asks.amounts[:limit]])
+        return bids, asks
+
+    def to_orderbook(self, limit=20) -> Optional[Dict]:
+        """与MarketDataCollector.fetch_orderbook相同格式的快照"""
+        if not self.synced:
+            return None
+        bids, asks = self.depth(limit)
+        return {'bids': bids, 'asks': asks, 'timestamp': self.timestamp}
+
+    def run(self, feed: Iterable[Dict]):
+        """从同步数据源(如回放)逐条处理消息"""
+        for event in feed:
+            self.process(event)
+        return self
+
+    async def run_async(self, feed):
+        """从异步数据源(如WebSocket)逐条处理消息"""
+        async for event in feed:
+            self.process(event)
+
+
+class ReplayFeed:
+    """回放录制的增量消息, 支持列表或每行一条JSON的文件"""
+
+    def __init__(self, source, speed=None):
+        self.source = source
+        self.speed = speed
+
+    def _events(self):
+        if isinstance(self.source, str):
+            with open(self.source) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from self.source
+
+    def __iter__(self):
+        previous = None
+        for event in self._events():
+            # speed为回放倍速, 按消息事件时间E还原间隔
+            if self.speed and previous is not None and 'E' in event:
+                time.sleep(max(0.0, (event['E'] - previous) / 1000 / self.speed))
+            previous = event.get('E', previous)
+            yield event
+
+    async def __aiter__(self):
+        for event in self:
+            yield event
+            await asyncio.sleep(0)
+
+
+class BinanceDepthFeed:
+    """Binance diff-depth WebSocket数据源"""
+
+    def __init__(self, symbol, url='wss://fstream.binance.com/ws', interval_ms=100):
+        self.stream = f"{symbol.replace('/', '').split(':')[0].lower()}@depth@{interval_ms}ms"
+        self.url = f"{url}/{self.stream}"
+
+    async def __aiter__(self):
+        import websockets
+
+        async with websockets.connect(self.url) as ws:
+            async for message in ws:
+                yield json.loads(message)
+
+
+def ccxt_snapshot_provider(exchange, limit=1000):
+    """用ccxt的fetch_order_book作为快照来源, nonce即交易所的lastUpdateId"""
+    def provider(symbol):
+        orderbook = exchange.fetch_order_book(symbol, limit=limit)
+        return {
+            'bids': orderbook['bids'],
+            'asks': orderbook['asks'],
+            'lastUpdateId': orderbook['nonce'],
+            'timestamp': orderbook['timestamp']
+        }
+    return provider
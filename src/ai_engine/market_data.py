@@ -1,11 +1,16 @@
-import ccxt
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 import logging
+from .orderbook_analytics import OrderBookAnalytics
+from .metrics import metrics
+from .lazy import lazy_import
+
+# ccxt和pandas导入耗时较长, 第一次真正使用时才加载
+ccxt = lazy_import('ccxt')
+pd = lazy_import('pandas')
 
 class MarketDataCollector:
-    def __init__(self, exchange_id='binance', api_key=None, api_secret=None):
+    def __init__(self, exchange_id='binance', api_key=None, api_secret=None, store=None):
         self.exchange = getattr(ccxt, exchange_id)({
             'apiKey': api_key,
             'secret': api_secret,
@@ -13,12 +18,19 @@ class MarketDataCollector:
             'options': {'defaultType': 'future'}
         })
         self.logger = logging.getLogger(__name__)
+        # 可选的MarketDataStore, 设置后采集到的数据会追加写入本地存储
+        self.store = store
         
     def fetch_historical_data(self, symbol, timeframe='1h', limit=1000):
         """获取历史K线数据"""
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            return self._convert_to_dataframe(ohlcv)
+            # 只统计交易所请求耗时, 转换和落盘不计入
+            with metrics.timer('exchange.fetch_ohlcv', symbol):
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            df = self._convert_to_dataframe(ohlcv)
+            if self.store is not None:
+                self.store.append_candles(symbol, df)
+            return df
         except Exception as e:
             self.logger.error(f"Error fetching historical data: {str(e)}")
             return None
@@ -26,12 +38,16 @@ class MarketDataCollector:
     def fetch_orderbook(self, symbol, limit=20):
         """获取市场深度数据"""
         try:
-            orderbook = self.exchange.fetch_order_book(symbol, limit=limit)
-            return {
+            with metrics.timer('exchange.fetch_order_book', symbol):
+                orderbook = self.exchange.fetch_order_book(symbol, limit=limit)
+            result = {
                 'bids': np.array(orderbook['bids']),
                 'asks': np.array(orderbook['asks']),
                 'timestamp': orderbook['timestamp']
             }
+            if self.store is not None:
+                self.store.append_orderbook(symbol, result)
+            return result
         except Exception as e:
             self.logger.error(f"Error fetching orderbook: {str(e)}")
             return None
@@ -39,8 +55,12 @@ class MarketDataCollector:
     def fetch_recent_trades(self, symbol, limit=100):
         """获取最近成交数据"""
         try:
-            trades = self.exchange.fetch_trades(symbol, limit=limit)
-            return pd.DataFrame(trades)
+            with metrics.timer('exchange.fetch_trades', symbol):
+                trades = self.exchange.fetch_trades(symbol, limit=limit)
+            trades = pd.DataFrame(trades)
+            if self.store is not None:
+                self.store.append_trades(symbol, trades)
+            return trades
         except Exception as e:
             self.logger.error(f"Error fetching recent trades: {str(e)}")
             return None
@@ -56,31 +76,17 @@ class MarketDataCollector:
         if trades_df is None or trades_df.empty:
             return None
         
-        trades_df['vwap'] = (trades_df['price'] * trades_df['amount']).cumsum() / trades_df['amount'].cumsum()
-        return trades_df['vwap'].iloc[-1]
+        # 只需要最终的累计值, 不修改调用方的DataFrame
+        price = trades_df['price'].values
+        amount = trades_df['amount'].values
+        return np.dot(price, amount) / amount.sum()
     
     def calculate_market_impact(self, orderbook, trade_size):
-        """计算市场冲击成本"""
+        """计算市场冲击成本
+
+        trade_size可以是单个数量或一组数量, 返回对应的买入/卖出成交均价 (深度不足时为None/NaN)
+        """
         if orderbook is None:
             return None
             
-        bids, asks = orderbook['bids'], orderbook['asks']
-        
-        def calculate_impact(orders, size, side='buy'):
-            remaining_size = size
-            total_cost = 0
-            for price, volume in orders:
-                if remaining_size <= 0:
-                    break
-                executed = min(remaining_size, volume)
-                total_cost += executed * price
-                remaining_size -= executed
-            return total_cost / size if remaining_size <= 0 else None
-        
-        buy_impact = calculate_impact(asks, trade_size, 'buy')
-        sell_impact = calculate_impact(bids, trade_size, 'sell')
-        
-        return {
-            'buy_impact': buy_impact,
-            'sell_impact': sell_impact
-        }
\ No newline at end of file
+        return OrderBookAnalytics(orderbook).market_impact(trade_size)
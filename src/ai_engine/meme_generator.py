@@ -1,21 +1,87 @@
 import os
 import random
-from PIL import Image, ImageDraw, ImageFont
-from transformers import pipeline
+import logging
+from .lazy import pipeline_handle
+from .meme_renderer import MemeBatchRenderer, MemeRenderer, encode_image
+from .batch_inference import MicroBatcher, normalize_text
 
 class MemeGenerator:
-    def __init__(self):
-        self.sentiment_analyzer = pipeline('sentiment-analysis')
-        self.text_generator = pipeline('text-generation')
+    def __init__(self, batch_size=32, batch_wait_ms=10, sentiment_cache_size=4096, max_new_tokens=30):
+        # 模型句柄在进程内共享, 第一次使用时才加载
+        self._sentiment_model = pipeline_handle('sentiment-analysis')
+        self._text_model = pipeline_handle('text-generation')
         self.templates_dir = os.path.join(os.path.dirname(__file__), 'meme_templates')
         self.fonts_dir = os.path.join(os.path.dirname(__file__), 'fonts')
+        self.logger = logging.getLogger(__name__)
+        # 模板、字体和文字图层的渲染缓存
+        self.renderer = MemeRenderer(self.templates_dir, self.fonts_dir)
+        self._batch_renderer = None
+        self.max_new_tokens = max_new_tokens
+        
+        # 微批处理队列: 单条请求在batch_wait_ms内凑成一批, 一次前向计算
+        self.sentiment_queue = MicroBatcher(
+            self._score_batch, max_batch=batch_size, max_wait_ms=batch_wait_ms,
+            cache_size=sentiment_cache_size, key=normalize_text, name='meme_sentiment'
+        )
+        # 文本生成是采样结果, 不做缓存
+        self.text_queue = MicroBatcher(
+            self._generate_batch, max_batch=batch_size, max_wait_ms=batch_wait_ms,
+            cache_size=0, name='meme_text_generation'
+        )
+        
+    @property
+    def sentiment_analyzer(self):
+        return self._sentiment_model.get()
+    
+    @property
+    def text_generator(self):
+        return self._text_model.get()
+    
+    def warmup(self):
+        """预先加载模型并执行一次推理, 供服务启动时调用"""
+        self.sentiment_analyzer("warmup")
+        self._text_model.get()
+        return self
+    
+    def close(self):
+        """处理完队列中的请求后停止批处理线程, 并关闭渲染进程池"""
+        self.sentiment_queue.close()
+        self.text_queue.close()
+        if self._batch_renderer is not None:
+            self._batch_renderer.close()
+            self._batch_renderer = None
+    
+    def _score_batch(self, texts):
+        """一次批量调用情绪模型"""
+        return self.sentiment_analyzer(texts, batch_size=len(texts), truncation=True)
+    
+    def _generate_batch(self, prompts):
+        """一次批量调用文本生成模型, 每个prompt返回一段文本"""
+        outputs = self.text_generator(prompts, batch_size=len(prompts), max_new_tokens=self.max_new_tokens)
+        return [output[0]['generated_text'] for output in outputs]
+    
+    @staticmethod
+    def _trade_text(trade_data):
+        return f"Trade {trade_data['symbol']} at {trade_data['price']} with {trade_data['profit_loss']}"
         
     def analyze_trade_sentiment(self, trade_data):
         """分析交易数据情绪"""
-        trade_text = f"Trade {trade_data['symbol']} at {trade_data['price']} with {trade_data['profit_loss']}"
-        sentiment = self.sentiment_analyzer(trade_text)[0]
+        sentiment = self.analyze_trade_sentiment_async(trade_data).result()
         return sentiment['label'], sentiment['score']
     
+    def analyze_trade_sentiment_async(self, trade_data):
+        """提交情绪分析请求, 返回Future, 结果为 {'label', 'score'}"""
+        return self.sentiment_queue.submit(self._trade_text(trade_data))
+    
+    def analyze_trades_sentiment(self, trades):
+        """批量分析多笔交易情绪, 返回 [(label, score), ...]"""
+        results = self.sentiment_queue.map([self._trade_text(trade_data) for trade_data in trades])
+        return [(sentiment['label'], sentiment['score']) for sentiment in results]
+    
+    def generate_text(self, prompt):
+        """经批处理队列调用文本生成模型"""
+        return self.text_queue(prompt)
+    
     def generate_meme_text(self, sentiment, trade_data):
         """根据交易情绪生成嘲讽文本"""
         prompt_templates = {
@@ -46,71 +112,13 @@ class MemeGenerator:
             template_name: 模板图片名称
             style: 文字样式 ('classic', 'modern', 'minimal', 'bold')
         Returns:
-            生成的meme图片路径
+            生成的meme图片 (PIL.Image), 失败时返回None
         """
         try:
-            # 加载模板图片
-            template_path = os.path.join(self.templates_dir, template_name)
-            image = Image.open(template_path)
-            draw = ImageDraw.Draw(image)
-            
-            # 样式配置
-            style_configs = {
-                'classic': {
-                    'font': 'impact.ttf',
-                    'size_ratio': 0.1,
-                    'stroke_width': 2,
-                    'text_color': 'white',
-                    'stroke_color': 'black'
-                },
-                'modern': {
-                    'font': 'helvetica.ttf',
-                    'size_ratio': 0.08,
-                    'stroke_width': 0,
-                    'text_color': 'white',
-                    'shadow_offset': 3
-                },
-                'minimal': {
-                    'font': 'arial.ttf',
-                    'size_ratio': 0.07,
-                    'stroke_width': 1,
-                    'text_color': 'black',
-                    'background': True
-                },
-                'bold': {
-                    'font': 'futura.ttf',
-                    'size_ratio': 0.12,
-                    'stroke_width': 3,
-                    'text_color': 'yellow',
-                    'stroke_color': 'red'
-                }
-            }
-            
-            style_config = style_configs.get(style, style_configs['classic'])
-            
-            # 设置字体
-            font_path = os.path.join(self.fonts_dir, style_config['font'])
-            font_size = int(image.width * style_config['size_ratio'])
-        font = ImageFont.truetype(font_path, font_size)
-        
-        # 创建绘图对象
-        draw = ImageDraw.Draw(image)
-        
-        # 计算文本位置
-        text_width = draw.textlength(text, font=font)
-        x = (image.width - text_width) / 2
-        y = image.height * 0.1  # 文本位置在顶部10%处
-        
-        # 绘制文本边框
-        outline_size = int(font_size * 0.05)
-        for adj in range(-outline_size, outline_size + 1):
-            for opp in range(-outline_size, outline_size + 1):
-                draw.text((x + adj, y + opp), text, font=font, fill='black')
-        
-        # 绘制主文本
-        draw.text((x, y), text, font=font, fill='white')
-        
-        return image
+            return self.renderer.render(text, template_name, style)
+        except Exception as e:
+            self.logger.error(f"Error creating meme: {str(e)}")
+            return None
     
     def generate_trade_meme(self, trade_data):
         """生成交易相关的Meme"""
@@ -128,6 +136,31 @@ class MemeGenerator:
         
         return meme
     
+    def generate_trade_memes(self, trades, format='JPEG', buffers=None, n_workers=None):
+        """批量生成交易Meme, 在进程池中渲染并编码
+        Args:
+            trades: 交易数据列表
+            format: 'JPEG' 或 'WEBP'
+            buffers: 可选, 与trades等长的可写buffer列表, 编码结果直接写入
+            n_workers: 渲染进程数, 默认CPU核数 (只在第一次调用时生效)
+        Returns:
+            与trades等长的列表, 每项为图片bytes (或写入后的buffer), 失败的项为None
+        """
+        # 情绪分析走批处理队列, 多笔交易合并为少量前向计算
+        sentiments = self.analyze_trades_sentiment(trades)
+        jobs = []
+        for trade_data, (sentiment, _) in zip(trades, sentiments):
+            template_name = 'bullish.jpg' if sentiment == 'POSITIVE' else 'bearish.jpg'
+            jobs.append((self.generate_meme_text(sentiment, trade_data), template_name, 'classic'))
+        
+        if self._batch_renderer is None:
+            self._batch_renderer = MemeBatchRenderer(self.templates_dir, self.fonts_dir, n_workers=n_workers)
+        return self._batch_renderer.render_many(jobs, format=format, buffers=buffers)
+    
+    def encode_meme(self, meme, format='JPEG', buffer=None):
+        """把Meme编码为内存中的JPEG/WebP bytes, 或写入buffer"""
+        return encode_image(meme, format, buffer)
+    
     def save_meme(self, meme, output_path):
         """保存Meme图片"""
         meme.save(output_path, quality=95)
@@ -0,0 +1,315 @@
+import io
+import os
+import time
+import logging
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# 文字样式配置
+STYLE_CONFIGS = {
+    'classic': {
+        'font': 'impact.ttf',
+        'size_ratio': 0.1,
+        'stroke_width': 2,
+        'text_color': 'white',
+        'stroke_color': 'black'
+    },
+    'modern': {
+        'font': 'helvetica.ttf',
+        'size_ratio': 0.08,
+        'stroke_width': 0,
+        'text_color': 'white',
+        'shadow_offset': 3
+    },
+    'minimal': {
+        'font': 'arial.ttf',
+        'size_ratio': 0.07,
+        'stroke_width': 1,
+        'text_color': 'black',
+        'background': True
+    },
+    'bold': {
+        'font': 'futura.ttf',
+        'size_ratio': 0.12,
+        'stroke_width': 3,
+        'text_color': 'yellow',
+        'stroke_color': 'red'
+    }
+}
+
+# 描边宽度至少为字号的5%, 与原来的逐像素描边效果一致
+OUTLINE_RATIO = 0.05
+# 文本顶部位于图片高度的10%处
+TEXT_TOP_RATIO = 0.1
+
+# 编码参数: 在文件大小和编码速度之间取舍 (800x600图片实测)
+# JPEG quality 85 + optimize 比 quality 95 小约2/3, 耗时相近; 渐进式编码慢3倍, 不使用
+# WebP method 2 比默认的4快约3倍, 文件只大不到10%
+ENCODER_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'subsampling': '4:2:0'},
+    'WEBP': {'quality': 80, 'method': 2},
+}
+
+
+class _LRUCache:
+    """线程安全的LRU缓存"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemeRenderer:
+    """带缓存的Meme渲染器
+
+    解码后的模板图片、ImageFont对象和渲染好的文字图层分别放在LRU缓存中,
+    重复的模板/字体不再读盘, 重复的文案只需要一次合成。描边使用Pillow原生的
+    stroke_width一次绘制完成。
+    """
+
+    def __init__(self, templates_dir, fonts_dir, template_cache_size=32, font_cache_size=64,
+                 layer_cache_size=512):
+        self.templates_dir = templates_dir
+        self.fonts_dir = fonts_dir
+        self.templates = _LRUCache(template_cache_size)
+        self.fonts = _LRUCache(font_cache_size)
+        self.layers = _LRUCache(layer_cache_size)
+
+    def template(self, template_name) -> Image.Image:
+        """解码后的模板图片 (缓存中的对象只读, 渲染时复制)"""
+        def load():
+            with Image.open(os.path.join(self.templates_dir, template_name)) as image:
+                return image.convert('RGB')
+        return self.templates.get_or_create(template_name, load)
+
+    def font(self, font_name, size) -> ImageFont.FreeTypeFont:
+        return self.fonts.get_or_create(
+            (font_name, size), lambda: ImageFont.truetype(os.path.join(self.fonts_dir, font_name), size)
+        )
+
+    def text_layer(self, text, style, font_size):
+        """渲染好的RGBA文字图层及其相对文本原点的偏移, 按 (文本, 样式, 字号) 缓存"""
+        def render():
+            style_config = STYLE_CONFIGS.get(style, STYLE_CONFIGS['classic'])
+            font = self.font(style_config['font'], font_size)
+            stroke = 0
+            if style_config.get('stroke_width', 0) > 0:
+                stroke = max(style_config['stroke_width'], int(font_size * OUTLINE_RATIO))
+            shadow = style_config.get('shadow_offset', 0)
+            padding = 4 if style_config.get('background') else 0
+
+            left, top, right, bottom = font.getbbox(text, stroke_width=stroke)
+            width = right - left + shadow + 2 * padding
+            height = bottom - top + shadow + 2 * padding
+            layer = Image.new('RGBA', (max(width, 1), max(height, 1)), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(layer)
+            origin = (padding - left, padding - top)
+
+            if padding:
+                draw.rectangle((0, 0, width - 1, height - 1), fill='white')
+            if shadow:
+                draw.text((origin[0] + shadow, origin[1] + shadow), text, font=font, fill='black')
+            draw.text(origin, text, font=font, fill=style_config['text_color'],
+                      stroke_width=stroke, stroke_fill=style_config.get('stroke_color', 'black'))
+            return layer, (left - padding, top - padding)
+        return self.layers.get_or_create((text, style, font_size), render)
+
+    def render(self, text, template_name='default.jpg', style='classic') -> Image.Image:
+        """在模板上合成文字, 返回新的RGB图片"""
+        template = self.template(template_name)
+        style_config = STYLE_CONFIGS.get(style, STYLE_CONFIGS['classic'])
+        font_size = int(template.width * style_config['size_ratio'])
+        layer, (offset_x, offset_y) = self.text_layer(text, style, font_size)
+
+        # 水平居中, 文本顶部在TEXT_TOP_RATIO处
+        x = int((template.width - layer.width) / 2)
+        y = int(template.height * TEXT_TOP_RATIO) + offset_y
+        image = template.copy()
+        image.paste(layer, (x, y), layer)
+        return image
+
+    def clear(self):
+        self.templates.clear()
+        self.fonts.clear()
+        self.layers.clear()
+
+    def cache_info(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {'size': len(cache), 'hits': cache.hits, 'misses': cache.misses}
+            for name, cache in (('templates', self.templates), ('fonts', self.fonts), ('layers', self.layers))
+        }
+
+
+def encode_image(image, format='JPEG', buffer=None, **options):
+    """把图片编码为JPEG/WebP; 指定buffer时直接写入buffer并返回它, 否则返回bytes"""
+    format = format.upper()
+    params = dict(ENCODER_OPTIONS.get(format, {}))
+    params.update(options)
+    target = buffer if buffer is not None else io.BytesIO()
+    image.save(target, format, **params)
+    return buffer if buffer is not None else target.getvalue()
+
+
+def default_start_method() -> str:
+    """工作进程的默认启动方式: forkserver (不支持时用spawn)
+
+    MemeGenerator在创建进程池前已加载模型并启动了微批线程, fork会把这些线程持有的锁
+    和模型状态原样复制进子进程, 可能导致死锁; forkserver/spawn从干净的进程启动。
+    """
+    return 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+
+
+# 每个工作进程自己的渲染器, 模板和字体缓存在进程存活期间保持预热
+_WORKER_RENDERER: Optional[MemeRenderer] = None
+
+
+def _init_worker(templates_dir, fonts_dir):
+    global _WORKER_RENDERER
+    _WORKER_RENDERER = MemeRenderer(templates_dir, fonts_dir)
+
+
+def _render_encoded(job) -> Tuple[Optional[bytes], Optional[str]]:
+    """工作进程内渲染并编码一张Meme, 返回 (bytes, 错误信息)"""
+    text, template_name, style, format, options = job
+    try:
+        image = _WORKER_RENDERER.render(text, template_name, style)
+        return encode_image(image, format, **options), None
+    except Exception as e:
+        return None, str(e)
+
+
+class MemeBatchRenderer:
+    """用进程池批量渲染并编码Meme
+
+    每个工作进程持有自己的MemeRenderer, 模板、字体和文字图层缓存在多次批量调用之间保留。
+    结果以内存中的bytes返回 (或写入调用方提供的buffer), 不经过磁盘。
+    start_method默认由default_start_method()决定, 不使用fork。
+    """
+
+    def __init__(self, templates_dir, fonts_dir, n_workers=None, format='JPEG', encoder_options=None,
+                 start_method=None):
+        self.templates_dir = templates_dir
+        self.fonts_dir = fonts_dir
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.format = format
+        self.encoder_options = dict(encoder_options or {})
+        self.start_method = start_method or default_start_method()
+        self._pool = None
+        self.logger = logging.getLogger(__name__)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_workers, mp_context=mp.get_context(self.start_method),
+                initializer=_init_worker, initargs=(self.templates_dir, self.fonts_dir)
+            )
+        return self._pool
+
+    def render_many(self, jobs: Sequence[Tuple[str, str, str]], format=None, buffers=None) -> List:
+        """批量渲染 [(文本, 模板名, 样式), ...]
+
+        返回与jobs等长的列表: 每项为编码后的bytes, 指定buffers时为写入后的buffer;
+        渲染失败的项为None。
+        """
+        format = format or self.format
+        tasks = [(text, template_name, style, format, self.encoder_options)
+                 for text, template_name, style in jobs]
+        if not tasks:
+            return []
+        chunksize = max(1, len(tasks) // (self.n_workers * 4))
+        results = []
+        for index, (data, error) in enumerate(self._executor().map(_render_encoded, tasks, chunksize=chunksize)):
+            if error is not None:
+                self.logger.error(f"Error rendering meme {jobs[index][:2]}: {error}")
+                results.append(None)
+            elif buffers is not None:
+                buffers[index].write(data)
+                results.append(buffers[index])
+            else:
+                results.append(data)
+        return results
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _render_uncached(templates_dir, fonts_dir, text, template_name, style):
+    """原来的create_meme渲染方式: 每次读盘、加载字体、逐偏移绘制描边, 作为基准"""
+    style_config = STYLE_CONFIGS.get(style, STYLE_CONFIGS['classic'])
+    image = Image.open(os.path.join(templates_dir, template_name))
+    font_size = int(image.width * style_config['size_ratio'])
+    font = ImageFont.truetype(os.path.join(fonts_dir, style_config['font']), font_size)
+    draw = ImageDraw.Draw(image)
+    x = (image.width - draw.textlength(text, font=font)) / 2
+    y = image.height * TEXT_TOP_RATIO
+    outline_size = int(font_size * OUTLINE_RATIO)
+    for adj in range(-outline_size, outline_size + 1):
+        for opp in range(-outline_size, outline_size + 1):
+            draw.text((x + adj, y + opp), text, font=font, fill='black')
+    draw.text((x, y), text, font=font, fill='white')
+    return image
+
+
+def benchmark_renderer(templates_dir, fonts_dir, texts: Sequence[str], template_names: Sequence[str] = ('default.jpg',),
+                       style='classic', n_renders=200, renderer: Optional[MemeRenderer] = None) -> Dict[str, float]:
+    """对比原渲染方式与MemeRenderer的每秒渲染数
+
+    文案和模板按顺序循环使用, 因此重复文案的比例由texts的长度决定。
+    """
+    renderer = renderer or MemeRenderer(templates_dir, fonts_dir)
+    jobs = [(texts[i % len(texts)], template_names[i % len(template_names)]) for i in range(n_renders)]
+
+    started = time.perf_counter()
+    for text, template_name in jobs:
+        _render_uncached(templates_dir, fonts_dir, text, template_name, style)
+    uncached_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for text, template_name in jobs:
+        renderer.render(text, template_name, style)
+    cached_seconds = time.perf_counter() - started
+
+    return {
+        'uncached_per_second': n_renders / uncached_seconds,
+        'cached_per_second': n_renders / cached_seconds,
+        'speedup': uncached_seconds / cached_seconds,
+        'layer_hit_rate': renderer.layers.hits / max(1, renderer.layers.hits + renderer.layers.misses)
+    }
@@ -0,0 +1,305 @@
+import os
+import time
+import logging
+import threading
+import inspect
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Set AI_ENGINE_METRICS=0 to turn instrumentation off before import: the
+# timed decorator then returns functions unwrapped, so it costs nothing at all.
+# Setting it to 1 opts in explicitly, which also counts logged errors.
+_ENV_SETTING = os.environ.get('AI_ENGINE_METRICS', '').lower()
+ENABLED_AT_IMPORT = _ENV_SETTING not in ('0', 'false', 'off')
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies recorded in microseconds
+
+    Values below 2^precision are counted exactly; above that each power of
+    two is split into 2^(precision-1) linear sub-buckets, so any recorded
+    value is within a relative error of 2^-(precision-1) of the true one.
+    Recording is a few integer operations and one list increment.
+    """
+
+    def __init__(self, precision=7, max_magnitude=40):
+        self.precision = precision
+        self._sub = 1 << (precision - 1)
+        self._linear = 1 << precision
+        self._max_value = (1 << (precision + max_magnitude)) - 1
+        self.counts = [0] * (self._linear + max_magnitude * self._sub)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._linear:
+            return value
+        magnitude = value.bit_length() - self.precision
+        return self._linear + (magnitude - 1) * self._sub + ((value >> magnitude) - self._sub)
+
+    def _lower_bound(self, index):
+        if index < self._linear:
+            return index
+        magnitude = (index - self._linear) // self._sub + 1
+        return (self._sub + (index - self._linear) % self._sub) << magnitude
+
+    def record(self, micros):
+        value = min(max(int(micros), 0), self._max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q) -> Optional[float]:
+        """Value (microseconds) at quantile q in [0, 1]"""
+        if self.count == 0:
+            return None
+        rank = max(1, int(round(q * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(min(max(self._lower_bound(index), self.min), self.max))
+        return float(self.max)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        for attr, pick in (('min', min), ('max', max)):
+            values = [v for v in (getattr(self, attr), getattr(other, attr)) if v is not None]
+            setattr(self, attr, pick(values) if values else None)
+        return self
+
+
+class _NullTimer:
+    """Shared no-op context manager handed out while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'symbol', 'started')
+
+    def __init__(self, metrics, stage, symbol):
+        self.metrics = metrics
+        self.stage = stage
+        self.symbol = symbol
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started, self.symbol)
+        if exc_type is not None:
+            self.metrics.increment('errors', stage=self.stage, error=exc_type.__name__)
+        return False
+
+
+class _ErrorCountingHandler(logging.Handler):
+    """Counts ERROR log records per logger
+
+    Most failures in this package are caught and only logged, so counting
+    the log records is what makes swallowed exceptions visible.
+    """
+
+    def __init__(self, metrics):
+        super().__init__(level=logging.ERROR)
+        self.metrics = metrics
+
+    def emit(self, record):
+        self.metrics.increment('logged_errors', logger=record.name)
+
+
+class Metrics:
+    """Per-stage, per-symbol latency histograms and counters
+
+    ``timer(stage, symbol)`` is a context manager using the monotonic
+    perf_counter clock; ``timed(stage)`` decorates functions. ``render()``
+    produces the Prometheus text exposition format and ``serve()`` exposes
+    it on a local HTTP endpoint. ``disable()`` turns every call into a flag
+    check returning a shared no-op object.
+
+    Importing the module changes no logging configuration: the handler
+    counting logged errors is attached by ``enable()``, ``serve()`` or
+    ``count_logged_errors()``, or at import when AI_ENGINE_METRICS is set
+    to an enabling value, and detached again by ``disable()``.
+    """
+
+    def __init__(self, namespace='ai_engine', enabled=True, precision=7):
+        self.namespace = namespace
+        self.enabled = enabled
+        self.precision = precision
+        self.histograms: Dict[Tuple[str, Optional[str]], LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, Tuple], int] = {}
+        self._lock = threading.Lock()
+        self._handler = None
+        self._handler_logger = None
+        self._server = None
+
+    def enable(self):
+        self.enabled = True
+        self.count_logged_errors()
+
+    def disable(self):
+        self.enabled = False
+        if self._handler is not None:
+            self._handler_logger.removeHandler(self._handler)
+            self._handler = None
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def timer(self, stage, symbol=None):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, symbol)
+
+    def observe(self, stage, seconds, symbol=None):
+        """Record a latency measured elsewhere (e.g. StagedPipeline timings)"""
+        if not self.enabled:
+            return
+        key = (stage, symbol)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(self.precision)
+            histogram.record(seconds * 1e6)
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def timed(self, stage, symbol_arg=None):
+        """Decorator timing every call; symbol_arg names the parameter holding the symbol label"""
+        def decorator(func):
+            if not ENABLED_AT_IMPORT:
+                return func
+            position = list(inspect.signature(func).parameters).index(symbol_arg) if symbol_arg else None
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                symbol = None
+                if position is not None:
+                    symbol = args[position] if len(args) > position else kwargs.get(symbol_arg)
+                with self.timer(stage, symbol):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count_logged_errors(self, logger_name=None):
+        """Count ERROR records logged under logger_name, by default this package (idempotent)"""
+        if self._handler is None:
+            self._handler = _ErrorCountingHandler(self)
+            self._handler_logger = logging.getLogger(logger_name or __name__.rpartition('.')[0])
+            self._handler_logger.addHandler(self._handler)
+        return self
+
+    def stage_summary(self, stage, symbol=None) -> Optional[Dict]:
+        """Latency summary in seconds; symbol=None aggregates every symbol of the stage"""
+        with self._lock:
+            parts = [h for (s, sym), h in self.histograms.items() if s == stage and (symbol is None or sym == symbol)]
+            if not parts:
+                return None
+            histogram = LatencyHistogram(self.precision)
+            for part in parts:
+                histogram.merge(part)
+        summary = {'count': histogram.count, 'mean': histogram.total / histogram.count / 1e6,
+                   'max': histogram.max / 1e6}
+        for q in DEFAULT_QUANTILES:
+            summary[f"p{q * 100:g}"] = histogram.percentile(q) / 1e6
+        return summary
+
+    @staticmethod
+    def _labels(pairs) -> str:
+        pairs = [(k, v) for k, v in pairs if v is not None]
+        if not pairs:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        name = f"{self.namespace}_stage_latency_seconds"
+        lines = [f"# HELP {name} Wall time per pipeline stage", f"# TYPE {name} summary"]
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = sorted(self.counters.items())
+            for (stage, symbol), histogram in histograms:
+                base = [('stage', stage), ('symbol', symbol)]
+                for q in DEFAULT_QUANTILES:
+                    value = histogram.percentile(q) / 1e6
+                    lines.append(f"{name}{self._labels(base + [('quantile', q)])} {value:.9g}")
+                lines.append(f"{name}_sum{self._labels(base)} {histogram.total / 1e6:.9g}")
+                lines.append(f"{name}_count{self._labels(base)} {histogram.count}")
+
+        typed = set()
+        for (counter, labels), value in counters:
+            full = f"{self.namespace}_{counter}_total"
+            if full not in typed:
+                lines.append(f"# TYPE {full} counter")
+                typed.add(full)
+            lines.append(f"{full}{self._labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9108, host='127.0.0.1'):
+        """Serve render() at http://host:port/metrics from a daemon thread"""
+        if self._server is not None:
+            return self._server
+        self.count_logged_errors()
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Process-wide registry used by the instrumented modules
+metrics = Metrics(enabled=ENABLED_AT_IMPORT)
+timed = metrics.timed
+if _ENV_SETTING in ('1', 'true', 'on'):
+    metrics.count_logged_errors()
@@ -1,83 +1,155 @@
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import cross_val_score, TimeSeriesSplit
-from sklearn.metrics import precision_score, recall_score, f1_score
-import joblib
 import logging
+from .fast_forest import FlatForest
+from .batch_indicators import calculate_indicators_batch
+from .metrics import timed
+from .lazy import lazy_import
+
+# sklearn and joblib take ~2s to import; processes that only serve an
+# exported FlatForest never load them
+joblib = lazy_import('joblib')
+
+
+def _default_rf():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+
+
+def _default_gb():
+    from sklearn.ensemble import GradientBoostingClassifier
+    return GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, random_state=42)
+
+
+class _ModelSlots(dict):
+    """Model dict whose default estimators are only built on first lookup"""
+
+    DEFAULTS = {'rf': _default_rf, 'gb': _default_gb}
+
+    def __missing__(self, key):
+        if key not in self.DEFAULTS:
+            raise KeyError(key)
+        model = self[key] = self.DEFAULTS[key]()
+        return model
+
 
 class MLPredictor:
     def __init__(self):
-        self.models = {
-            'rf': RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42),
-            'gb': GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, random_state=42)
-        }
-        self.scaler = StandardScaler()
+        self.models = _ModelSlots()
+        self._scaler = None
         self.logger = logging.getLogger(__name__)
         self.selected_model = 'rf'
+        self.online_learner = None
+        # Last unlabelled observation per symbol, labelled on the next update
+        self._pending_samples = {}
+        self._select_online = False
+    
+    @property
+    def scaler(self):
+        if self._scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            self._scaler = StandardScaler()
+        return self._scaler
+    
+    @scaler.setter
+    def scaler(self, value):
+        self._scaler = value
         
-    def prepare_features(self, technical_indicators):
-        """Prepare features for ML model"""
-        try:
-            # Extract basic features
-            basic_features = [
-                technical_indicators['sma_20'],
-                technical_indicators['sma_50'],
-                technical_indicators['rsi'],
-                technical_indicators['volatility']
-            ]
-            
+    FEATURE_NAMES = [
+        'sma_20', 'sma_50', 'rsi', 'volatility',
+        'sma_ratio', 'rsi_momentum', 'volatility_factor',
+        'macd_signal', 'macd_trend', 'volume_trend', 'price_momentum'
+    ]
+    
+    def _build_feature_matrix(self, technical_indicators):
+        """Build the raw (n_samples, n_features) matrix from columnar indicators"""
+        if not isinstance(technical_indicators, dict):
+            # A sequence of per-symbol indicator dicts
+            technical_indicators = {
+                key: [row[key] for row in technical_indicators]
+                for key in ('sma_20', 'sma_50', 'rsi', 'volatility', 'macd', 'macd_signal', 'obv', 'close')
+            }
+        
+        def column(key):
+            return np.atleast_1d(np.asarray(technical_indicators[key], dtype=float))
+        
+        sma_20, sma_50 = column('sma_20'), column('sma_50')
+        rsi, volatility = column('rsi'), column('volatility')
+        macd, macd_signal = column('macd'), column('macd_signal')
+        obv, close = column('obv'), column('close')
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
             # Calculate advanced features
-            sma_ratio = technical_indicators['sma_20'] / technical_indicators['sma_50'] if technical_indicators['sma_50'] else 1.0
-            rsi_momentum = 1 if technical_indicators['rsi'] > 50 else -1 if technical_indicators['rsi'] < 50 else 0
-            volatility_factor = np.log1p(technical_indicators['volatility']) if technical_indicators['volatility'] else 0
+            sma_ratio = np.where(sma_50 != 0, sma_20 / sma_50, 1.0)
+            rsi_momentum = np.sign(rsi - 50)
+            volatility_factor = np.where(volatility != 0, np.log1p(volatility), 0.0)
             
             # Add MACD features
-            macd_signal = 1 if technical_indicators['macd'] > technical_indicators['macd_signal'] else -1
-            macd_trend = np.sign(technical_indicators['macd'])
+            macd_cross = np.where(macd > macd_signal, 1.0, -1.0)
+            macd_trend = np.sign(macd)
             
             # Add volume and price features
-            volume_trend = np.sign(technical_indicators['obv'])
-            price_momentum = technical_indicators['close'] / technical_indicators['sma_20'] - 1
-            
-            # Combine all features
-            features = basic_features + [
-                sma_ratio,
-                rsi_momentum,
-                volatility_factor,
-                macd_signal,
-                macd_trend,
-                volume_trend,
-                price_momentum
-            ]
-            features = np.array(features).reshape(1, -1)
-            
-            # Handle missing values
-            features = np.nan_to_num(features, nan=0.0)
-            
-            return self.scaler.transform(features)
+            volume_trend = np.sign(obv)
+            price_momentum = close / sma_20 - 1
+        
+        features = np.column_stack([
+            sma_20, sma_50, rsi, volatility,
+            sma_ratio, rsi_momentum, volatility_factor,
+            macd_cross, macd_trend, volume_trend, price_momentum
+        ])
+        
+        # Handle missing values
+        return np.nan_to_num(features, nan=0.0)
+    
+    @timed('ml.prepare_features')
+    def prepare_features_batch(self, technical_indicators):
+        """Prepare scaled features for many symbols at once
+        
+        Accepts columnar indicators (a dict of arrays, e.g. from
+        calculate_indicators_batch) or a list of per-symbol indicator dicts.
+        """
+        try:
+            return self.scaler.transform(self._build_feature_matrix(technical_indicators))
         except Exception as e:
-            self.logger.error(f"Error preparing features: {str(e)}")
+            self.logger.error(f"Error preparing batch features: {str(e)}")
             return None
     
-    def predict(self, features):
-        """Make price movement prediction with confidence score"""
+    def prepare_features(self, technical_indicators):
+        """Prepare features for ML model"""
+        return self.prepare_features_batch(technical_indicators)
+    
+    @timed('ml.predict')
+    def predict_batch(self, features):
+        """Predict labels and confidence scores for a feature matrix
+        
+        Runs a single predict_proba call and derives both the label and the
+        confidence from it.
+        """
         try:
             if features is None:
-                return None, 0.0
+                return None, None
                 
             model = self.models[self.selected_model]
-            prediction = model.predict(features)[0]
-            confidence = np.max(model.predict_proba(features)[0])
+            proba = model.predict_proba(features)
+            best = np.argmax(proba, axis=1)
             
-            return prediction, confidence
+            return model.classes_[best], proba[np.arange(len(best)), best]
         except Exception as e:
-            self.logger.error(f"Error making prediction: {str(e)}")
+            self.logger.error(f"Error making batch prediction: {str(e)}")
+            return None, None
+    
+    def predict(self, features):
+        """Make price movement prediction with confidence score"""
+        predictions, confidences = self.predict_batch(features)
+        if predictions is None:
             return None, 0.0
+        return predictions[0], confidences[0]
     
     def evaluate_model(self, X, y):
         """Evaluate model performance using time series cross-validation"""
         try:
+            from sklearn.metrics import precision_score, recall_score, f1_score
+            from sklearn.model_selection import cross_val_score, TimeSeriesSplit
+            
             tscv = TimeSeriesSplit(n_splits=5)
             scores = cross_val_score(self.models[self.selected_model], X, y, cv=tscv)
             
@@ -101,17 +173,21 @@ class MLPredictor:
     def train(self, X, y):
         """Train the ML model with cross-validation"""
         try:
+            from sklearn.metrics import precision_score, recall_score, f1_score
+            from sklearn.model_selection import cross_val_score, TimeSeriesSplit
+            
+            model = self.models[self.selected_model]
             X_scaled = self.scaler.fit_transform(X)
             
             # Perform cross-validation
-            cv_scores = cross_val_score(self.model, X_scaled, y, cv=5)
+            cv_scores = cross_val_score(model, X_scaled, y, cv=TimeSeriesSplit(n_splits=5))
             self.logger.info(f"Cross-validation scores: {cv_scores.mean():.3f} (+/- {cv_scores.std() * 2:.3f})")
             
             # Train final model
-            self.model.fit(X_scaled, y)
+            model.fit(X_scaled, y)
             
             # Calculate performance metrics
-            y_pred = self.model.predict(X_scaled)
+            y_pred = model.predict(X_scaled)
             precision = precision_score(y, y_pred, average='weighted')
             recall = recall_score(y, y_pred, average='weighted')
             f1 = f1_score(y, y_pred, average='weighted')
@@ -121,13 +197,22 @@ class MLPredictor:
         except Exception as e:
             self.logger.error(f"Error training model: {str(e)}")
     
+    def train_walk_forward(self, X, y, registry=None, output_path=None, **kwargs):
+        """Run the parallel walk-forward search and switch to the winning model"""
+        from .training_pipeline import WalkForwardTrainer
+        
+        report = WalkForwardTrainer(**kwargs).run(X, y, self.FEATURE_NAMES, registry=registry, output_path=output_path)
+        if report is not None:
+            self.swap_model(report['model'], report['scaler'], report['best']['name'])
+        return report
+    
     def save_model(self, path):
         """Save model and scaler to file"""
         try:
             model_path = f"{path}_model.joblib"
             scaler_path = f"{path}_scaler.joblib"
             
-            joblib.dump(self.model, model_path)
+            joblib.dump(self.models[self.selected_model], model_path)
             joblib.dump(self.scaler, scaler_path)
             self.logger.info(f"Model saved to {model_path}")
         except Exception as e:
@@ -139,34 +224,104 @@ class MLPredictor:
             model_path = f"{path}_model.joblib"
             scaler_path = f"{path}_scaler.joblib"
             
-            self.model = joblib.load(model_path)
+            self.models[self.selected_model] = joblib.load(model_path)
             self.scaler = joblib.load(scaler_path)
             self.logger.info(f"Model loaded from {model_path}")
         except Exception as e:
             self.logger.error(f"Error loading model: {str(e)}")
     
-    def update_features(self, market_data):
-        """Update model features with new market data"""
+    def export_fast_model(self, path, model_name=None):
+        """Export a trained ensemble to a memory-mappable flat-array file"""
         try:
-            if not market_data or 'close' not in market_data:
+            model_name = model_name or self.selected_model
+            FlatForest.from_sklearn(self.models[model_name]).save(path)
+            self.logger.info(f"Fast model '{model_name}' exported to {path}")
+            return path
+        except Exception as e:
+            self.logger.error(f"Error exporting fast model: {str(e)}")
+            return None
+    
+    def load_fast_model(self, path, model_name='fast', select=True):
+        """Load an exported flat-array model and register it under model_name"""
+        try:
+            self.models[model_name] = FlatForest.load(path)
+            if select:
+                self.selected_model = model_name
+            self.logger.info(f"Fast model loaded from {path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error loading fast model: {str(e)}")
+            return False
+    
+    def swap_model(self, model, scaler, model_name='registry'):
+        """Replace the active model and scaler in place (used for hot-swapping versions)"""
+        self.models[model_name] = model
+        self.scaler = scaler
+        self.selected_model = model_name
+    
+    def enable_online_learning(self, mode='sgd', select=False, **kwargs):
+        """Switch to streaming updates
+        
+        mode='sgd' trains an SGDClassifier with partial_fit; mode='window'
+        periodically refits a copy of the selected ensemble on a bounded
+        replay buffer. With select=True the online model replaces the
+        served model once it is ready; otherwise it only trains.
+        """
+        from .online_learning import OnlineLearner
+        
+        if mode == 'window':
+            kwargs.setdefault('base_estimator', self.models[self.selected_model])
+        self.online_learner = OnlineLearner(len(self.FEATURE_NAMES), mode=mode, **kwargs)
+        self._pending_samples = {}
+        self._select_online = select
+        return self.online_learner
+    
+    def _latest_indicators(self, market_data):
+        """Accept indicator dicts, signal dicts with 'indicators', {'ohlcv': DataFrame} or raw OHLCV arrays"""
+        if 'indicators' in market_data:
+            return market_data['indicators']
+        if 'sma_20' in market_data:
+            return market_data
+        if 'ohlcv' in market_data:
+            market_data = market_data['ohlcv']
+        latest = calculate_indicators_batch(
+            market_data['high'], market_data['low'], market_data['close'], market_data['volume']
+        )
+        return {key: values[-1] for key, values in latest.items()}
+    
+    def update_features(self, market_data, symbol=None):
+        """Update the online model with the latest observation
+        
+        The features of the previous call for the same symbol are labelled
+        with the direction of the close-to-close move since then and fed to
+        the online learner.
+        """
+        try:
+            if not market_data:
                 return False
+            if self.online_learner is None:
+                self.enable_online_learning()
                 
-            # Extract new features
-            close_prices = market_data['close']
-            returns = np.diff(close_prices) / close_prices[:-1]
+            indicators = self._latest_indicators(market_data)
+            features = self._build_feature_matrix(indicators)
+            close = float(np.atleast_1d(indicators['close'])[-1])
             
-            # Calculate labels for training
-            future_returns = np.roll(returns, -1)
-            labels = (future_returns > 0).astype(int)[:-1]
-            
-            # Prepare features
-            features = self.prepare_features(market_data)
-            if features is not None and len(labels) > 0:
-                # Update model with new data
-                self.model.partial_fit(features, labels)
-                return True
+            pending = self._pending_samples.get(symbol)
+            self._pending_samples[symbol] = (features, close)
+            if pending is None:
+                return False
+                
+            # Label the previous observation now that its next close is known
+            prev_features, prev_close = pending
+            label = int(close > prev_close)
+            self.online_learner.partial_fit(prev_features, [label])
             
-            return False
+            learner = self.online_learner
+            if self._select_online and learner.is_ready:
+                if self.selected_model != 'online':
+                    self.logger.info(f"Serving online model instead of '{self.selected_model}'")
+                self.swap_model(learner.model, learner.model_scaler, 'online')
+            return True
         except Exception as e:
             self.logger.error(f"Error updating features: {str(e)}")
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,176 @@
+import os
+import json
+import threading
+from datetime import datetime
+import logging
+from .fast_forest import FlatForest
+from .lazy import lazy_import
+
+# Only needed once a version is written or its scaler/model unpickled
+joblib = lazy_import('joblib')
+
+ACTIVE_FILE = 'ACTIVE'
+MODEL_FILE = 'model.joblib'
+SCALER_FILE = 'scaler.joblib'
+FAST_MODEL_FILE = 'model.ffst'
+MANIFEST_FILE = 'manifest.json'
+
+
+class ModelRegistry:
+    """Versioned store for model artifacts with an atomically switchable active version
+
+    Each version is a directory holding the model, scaler, feature schema and
+    metrics together. Artifacts are written uncompressed so joblib can load
+    their arrays with ``mmap_mode``; tree ensembles are additionally exported
+    as a FlatForest file so every worker process maps the same tree arrays
+    from the page cache instead of unpickling a private copy. The scaler is
+    stored apart from the model, so loading a version with a fast export
+    never unpickles the sklearn ensemble.
+    """
+
+    def __init__(self, root_dir, name='default'):
+        self.root_dir = os.path.join(root_dir, name)
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _version_dir(self, version):
+        return os.path.join(self.root_dir, version)
+
+    def list_versions(self):
+        """Return registered versions, oldest first"""
+        return sorted(
+            entry for entry in os.listdir(self.root_dir)
+            if os.path.isfile(os.path.join(self.root_dir, entry, MANIFEST_FILE))
+        )
+
+    def register(self, model, scaler, feature_names, metrics=None, version=None, activate=False):
+        """Write a new version and return its name"""
+        versions = self.list_versions()
+        if version is None:
+            version = f"v{len(versions) + 1:04d}"
+        if version in versions:
+            raise ValueError(f"Version {version} already exists")
+
+        version_dir = self._version_dir(version)
+        tmp_dir = version_dir + '.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+        try:
+            FlatForest.from_sklearn(model).save(os.path.join(tmp_dir, FAST_MODEL_FILE))
+            has_fast_model = True
+        except (TypeError, ValueError):
+            has_fast_model = False
+
+        manifest = {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'model_type': type(model).__name__,
+            'feature_names': list(feature_names),
+            'metrics': _to_jsonable(metrics or {}),
+            'fast_model': has_fast_model
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # The manifest only becomes visible once the whole version is in place
+        os.replace(tmp_dir, version_dir)
+        self.logger.info(f"Registered model version {version}")
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def manifest(self, version):
+        with open(os.path.join(self._version_dir(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def activate(self, version):
+        """Point the registry at a version; running predictors pick it up on their next sync"""
+        if version not in self.list_versions():
+            raise ValueError(f"Unknown model version: {version}")
+        active_path = os.path.join(self.root_dir, ACTIVE_FILE)
+        tmp_path = active_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, active_path)
+        self.logger.info(f"Activated model version {version}")
+
+    def active_version(self):
+        try:
+            with open(os.path.join(self.root_dir, ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, version=None, mmap_mode='r', prefer_fast=True):
+        """Load a version (the active one by default)
+
+        Returns a dict with model, scaler, feature_names, metrics and version.
+        """
+        version = version or self.active_version()
+        if version is None:
+            raise ValueError("No active model version")
+
+        version_dir = self._version_dir(version)
+        manifest = self.manifest(version)
+        use_fast = prefer_fast and manifest.get('fast_model')
+
+        scaler = joblib.load(os.path.join(version_dir, SCALER_FILE))
+        if use_fast:
+            model = FlatForest.load(os.path.join(version_dir, FAST_MODEL_FILE), mmap=mmap_mode is not None)
+        else:
+            model = joblib.load(os.path.join(version_dir, MODEL_FILE), mmap_mode=mmap_mode)
+
+        return {
+            'version': version,
+            'model': model,
+            'scaler': scaler,
+            'feature_names': manifest['feature_names'],
+            'metrics': manifest['metrics']
+        }
+
+
+class RegistryWatcher:
+    """Keeps an MLPredictor in sync with a registry's active version"""
+
+    def __init__(self, registry, predictor, model_name='registry'):
+        self.registry = registry
+        self.predictor = predictor
+        self.model_name = model_name
+        self.loaded_version = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def sync(self):
+        """Hot-swap the predictor's model if the active version changed; returns True on swap"""
+        with self._lock:
+            try:
+                version = self.registry.active_version()
+                if version is None or version == self.loaded_version:
+                    return False
+
+                artifact = self.registry.load(version)
+                expected = list(self.predictor.FEATURE_NAMES)
+                if artifact['feature_names'] != expected:
+                    self.logger.error(f"Model version {version} has an incompatible feature schema")
+                    return False
+
+                self.predictor.swap_model(artifact['model'], artifact['scaler'], self.model_name)
+                self.loaded_version = version
+                self.logger.info(f"Switched to model version {version}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Error syncing model registry: {str(e)}")
+                return False
+
+
+def _to_jsonable(value):
+    if isinstance(value, dict):
+        return {key: _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return value
@@ -0,0 +1,124 @@
+import copy
+import numpy as np
+import logging
+from sklearn.base import clone
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of (features, label) pairs"""
+
+    def __init__(self, capacity, n_features):
+        self.capacity = capacity
+        self.features = np.zeros((capacity, n_features))
+        self.labels = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self._head = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, X, y):
+        X = np.atleast_2d(X)
+        y = np.atleast_1d(y)
+        # Only the newest `capacity` rows can survive a single add
+        X, y = X[-self.capacity:], y[-self.capacity:]
+        idx = (self._head + np.arange(len(y))) % self.capacity
+        self.features[idx] = X
+        self.labels[idx] = y
+        self._head = (self._head + len(y)) % self.capacity
+        self.size = min(self.size + len(y), self.capacity)
+
+    def arrays(self):
+        """Return buffered samples in insertion order"""
+        if self.size < self.capacity:
+            return self.features[:self.size], self.labels[:self.size]
+        order = (self._head + np.arange(self.capacity)) % self.capacity
+        return self.features[order], self.labels[order]
+
+    def sample(self, n, rng):
+        idx = rng.integers(0, self.size, size=min(n, self.size))
+        return self.features[idx], self.labels[idx]
+
+
+class OnlineLearner:
+    """Streaming learner that keeps a model current without offline retrains
+
+    Two modes are supported:
+
+    - ``'sgd'``: an SGDClassifier updated with ``partial_fit`` on every new
+      sample, plus a small replay batch drawn from the buffer so that
+      earlier samples are revisited as the scaler drifts.
+    - ``'window'``: a tree ensemble (which has no ``partial_fit``) is refit
+      on the buffered window every ``refit_every`` samples.
+
+    In both modes the StandardScaler is updated incrementally with
+    ``partial_fit`` and raw (unscaled) features are kept in the buffer.
+    """
+
+    def __init__(self, n_features, mode='sgd', capacity=5000, classes=(0, 1),
+                 replay_size=32, refit_every=500, min_samples=50, base_estimator=None, random_state=42):
+        if mode not in ('sgd', 'window'):
+            raise ValueError(f"Unknown online learning mode: {mode}")
+        if mode == 'window' and base_estimator is None:
+            raise ValueError("window mode requires a base_estimator")
+
+        self.mode = mode
+        self.classes = np.asarray(classes)
+        self.replay_size = replay_size
+        self.refit_every = refit_every
+        self.min_samples = min_samples
+        self.base_estimator = base_estimator
+        self.scaler = StandardScaler()
+        # Scaler paired with self.model: the live scaler in sgd mode, a frozen copy per refit in window mode
+        self.model_scaler = self.scaler if mode == 'sgd' else None
+        self.buffer = ReplayBuffer(capacity, n_features)
+        self.model = SGDClassifier(loss='log_loss', random_state=random_state) if mode == 'sgd' else None
+        self.n_seen = 0
+        self._since_refit = 0
+        self._rng = np.random.default_rng(random_state)
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def is_ready(self):
+        return self.model is not None and hasattr(self.model, 'classes_')
+
+    def partial_fit(self, X, y):
+        """Add labelled raw feature rows and update the scaler and model"""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.atleast_1d(y)
+
+        self.scaler.partial_fit(X)
+        self.buffer.add(X, y)
+        self.n_seen += len(y)
+        self._since_refit += len(y)
+
+        if self.mode == 'sgd':
+            if self.replay_size and len(self.buffer) > len(y):
+                replay_X, replay_y = self.buffer.sample(self.replay_size, self._rng)
+                X = np.vstack([X, replay_X])
+                y = np.concatenate([y, replay_y])
+            self.model.partial_fit(self.scaler.transform(X), y, classes=self.classes)
+        elif self._should_refit():
+            self.refit()
+        return self
+
+    def _should_refit(self):
+        if len(self.buffer) < self.min_samples:
+            return False
+        return self.model is None or self._since_refit >= self.refit_every
+
+    def refit(self):
+        """Retrain a fresh copy of the ensemble on the buffered window"""
+        X, y = self.buffer.arrays()
+        if len(np.unique(y)) < 2:
+            return False
+        model = clone(self.base_estimator)
+        scaler = copy.deepcopy(self.scaler)
+        model.fit(scaler.transform(X), y)
+        # Swap only after a successful fit so predictions never see a half-trained model
+        self.model, self.model_scaler = model, scaler
+        self._since_refit = 0
+        self.logger.info(f"Refit online ensemble on {len(y)} buffered samples")
+        return True
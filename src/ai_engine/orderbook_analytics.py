@@ -0,0 +1,117 @@
+import numpy as np
+from typing import Dict
+
+
+class BookSide:
+    """单侧深度的累计数量/累计成交额数组, 每份快照只计算一次"""
+
+    def __init__(self, levels):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 2)
+        self.prices = levels[:, 0]
+        self.amounts = levels[:, 1]
+        self.cum_amount = np.cumsum(self.amounts)
+        self.cum_notional = np.cumsum(self.prices * self.amounts)
+
+    @property
+    def total_amount(self):
+        return self.cum_amount[-1] if len(self.cum_amount) else 0.0
+
+    @property
+    def best(self):
+        return self.prices[0] if len(self.prices) else np.nan
+
+    def fill_cost(self, sizes) -> np.ndarray:
+        """吃掉sizes(基础币数量)所需的总成交额, 深度不足时为NaN"""
+        sizes = np.asarray(sizes, dtype=float)
+        if len(self.prices) == 0:
+            return np.full(sizes.shape, np.nan)
+        level = np.searchsorted(self.cum_amount, sizes, side='left')
+        inside = level < len(self.prices)
+        level = np.minimum(level, len(self.prices) - 1)
+        filled_before = np.where(level > 0, self.cum_amount[level - 1], 0.0)
+        cost_before = np.where(level > 0, self.cum_notional[level - 1], 0.0)
+        cost = cost_before + (sizes - filled_before) * self.prices[level]
+        return np.where(inside, cost, np.nan)
+
+    def fill_amount_for_notional(self, notionals) -> np.ndarray:
+        """用notionals(计价币金额)能成交的基础币数量, 深度不足时为NaN"""
+        notionals = np.asarray(notionals, dtype=float)
+        if len(self.prices) == 0:
+            return np.full(notionals.shape, np.nan)
+        level = np.searchsorted(self.cum_notional, notionals, side='left')
+        inside = level < len(self.prices)
+        level = np.minimum(level, len(self.prices) - 1)
+        amount_before = np.where(level > 0, self.cum_amount[level - 1], 0.0)
+        notional_before = np.where(level > 0, self.cum_notional[level - 1], 0.0)
+        amount = amount_before + (notionals - notional_before) / self.prices[level]
+        return np.where(inside, amount, np.nan)
+
+
+class OrderBookAnalytics:
+    """基于累计深度数组的向量化冲击成本/滑点/深度分析
+
+    所有查询都接受一组交易规模, 通过np.searchsorted一次性求出各自的成交均价,
+    适用于仓位规模扫描。
+    """
+
+    def __init__(self, orderbook: Dict):
+        # bids按价格从高到低, asks按价格从低到高 (与交易所返回顺序一致)
+        self.bids = BookSide(orderbook['bids'])
+        self.asks = BookSide(orderbook['asks'])
+        self.timestamp = orderbook.get('timestamp')
+
+    @property
+    def mid_price(self):
+        return (self.bids.best + self.asks.best) / 2
+
+    def _side(self, side):
+        return self.asks if side == 'buy' else self.bids
+
+    def fill_price(self, sizes, side='buy') -> np.ndarray:
+        """市价单成交均价; sizes为基础币数量, 深度不足时为NaN"""
+        sizes = np.asarray(sizes, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._side(side).fill_cost(sizes) / sizes
+
+    def fill_price_for_notional(self, notionals, side='buy') -> np.ndarray:
+        """按计价币金额下单时的成交均价"""
+        notionals = np.asarray(notionals, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return notionals / self._side(side).fill_amount_for_notional(notionals)
+
+    def slippage_bps(self, sizes, side='buy') -> np.ndarray:
+        """相对最优价的滑点(基点), 买卖方向都为正数"""
+        book = self._side(side)
+        direction = 1.0 if side == 'buy' else -1.0
+        return direction * (self.fill_price(sizes, side) / book.best - 1) * 1e4
+
+    def impact_bps(self, sizes, side='buy') -> np.ndarray:
+        """相对中间价的冲击成本(基点)"""
+        direction = 1.0 if side == 'buy' else -1.0
+        return direction * (self.fill_price(sizes, side) / self.mid_price - 1) * 1e4
+
+    def depth_at_bps(self, bps, side='buy') -> np.ndarray:
+        """距中间价bps基点以内可成交的基础币数量, 该侧为空或无法确定中间价时为0"""
+        bps = np.asarray(bps, dtype=float)
+        book = self._side(side)
+        if len(book.prices) == 0 or np.isnan(self.mid_price):
+            return np.zeros(bps.shape)
+        if side == 'buy':
+            limit = self.mid_price * (1 + bps / 1e4)
+            count = np.searchsorted(book.prices, limit, side='right')
+        else:
+            limit = self.mid_price * (1 - bps / 1e4)
+            # bids降序, 取反后为升序
+            count = np.searchsorted(-book.prices, -limit, side='right')
+        return np.where(count > 0, book.cum_amount[np.maximum(count - 1, 0)], 0.0)
+
+    def market_impact(self, trade_size) -> Dict:
+        """与MarketDataCollector.calculate_market_impact相同的返回格式"""
+        buy = self.fill_price(trade_size, 'buy')
+        sell = self.fill_price(trade_size, 'sell')
+        if np.ndim(buy) == 0:
+            return {
+                'buy_impact': None if np.isnan(buy) else float(buy),
+                'sell_impact': None if np.isnan(sell) else float(sell)
+            }
+        return {'buy_impact': buy, 'sell_impact': sell}
@@ -0,0 +1,168 @@
+import numpy as np
+import logging
+from scipy.stats import norm
+from typing import Dict, Iterable
+
+
+class PortfolioRiskEngine:
+    """Portfolio-level risk with an exponentially weighted covariance matrix
+
+    The covariance is updated incrementally from per-period returns
+    (RiskMetrics style, zero-mean), and VaR/CVaR plus marginal and component
+    risk contributions are computed for the whole book in one vectorized
+    pass. Candidate signals are sized together so the combined book stays
+    within a total VaR budget, instead of each trade being sized alone.
+    """
+
+    def __init__(self, decay=0.94, confidence=0.99, risk_budget=0.02, initial_variance=1e-4):
+        self.decay = decay
+        self.confidence = confidence
+        self.risk_budget = risk_budget
+        self.initial_variance = initial_variance
+        self.symbols = []
+        self._index = {}
+        self.covariance = np.zeros((0, 0))
+        self.positions = np.zeros(0)
+        self.n_updates = 0
+        self.logger = logging.getLogger(__name__)
+
+    def _ensure(self, symbols: Iterable[str]):
+        new = [symbol for symbol in symbols if symbol not in self._index]
+        if not new:
+            return
+        n_old, n_new = len(self.symbols), len(self.symbols) + len(new)
+        covariance = np.zeros((n_new, n_new))
+        covariance[:n_old, :n_old] = self.covariance
+        covariance[np.arange(n_old, n_new), np.arange(n_old, n_new)] = self.initial_variance
+        self.covariance = covariance
+        self.positions = np.concatenate([self.positions, np.zeros(len(new))])
+        for symbol in new:
+            self._index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+    def index_of(self, symbols):
+        self._ensure(symbols)
+        return np.array([self._index[symbol] for symbol in symbols], dtype=int)
+
+    def update_returns(self, returns: Dict[str, float]):
+        """Fold one period of returns into the EWMA covariance
+
+        The whole matrix is decayed every period and symbols missing from
+        ``returns`` count as a zero return, so each update is a convex
+        combination of PSD matrices and the covariance stays PSD.
+        """
+        try:
+            idx = self.index_of(list(returns))
+            r = np.zeros(len(self.symbols))
+            r[idx] = [returns[symbol] for symbol in returns]
+            self.covariance = self.decay * self.covariance + (1 - self.decay) * np.outer(r, r)
+            self.n_updates += 1
+        except Exception as e:
+            self.logger.error(f"Error updating covariance: {str(e)}")
+
+    def update_returns_batch(self, symbols, returns_matrix):
+        """Fold a (time x symbols) block of returns in, oldest row first
+
+        As in update_returns, symbols not in ``symbols`` count as zero returns.
+        """
+        idx = self.index_of(symbols)
+        returns_matrix = np.atleast_2d(np.asarray(returns_matrix, dtype=float))
+        n = len(returns_matrix)
+        # Closed form of n sequential EWMA steps
+        weights = (1 - self.decay) * self.decay ** np.arange(n - 1, -1, -1)
+        weighted = returns_matrix * weights[:, None]
+        self.covariance *= self.decay ** n
+        self.covariance[np.ix_(idx, idx)] += weighted.T @ returns_matrix
+        self.n_updates += n
+
+    def set_position(self, symbol, notional):
+        """Record the signed notional exposure (positive long, negative short)"""
+        self._ensure([symbol])
+        self.positions[self._index[symbol]] = notional
+
+    def set_positions(self, positions: Dict[str, float]):
+        self._ensure(list(positions))
+        self.positions[:] = 0.0
+        for symbol, notional in positions.items():
+            self.positions[self._index[symbol]] = notional
+
+    def _z(self):
+        return norm.ppf(self.confidence)
+
+    def portfolio_volatility(self, positions=None):
+        w = self.positions if positions is None else positions
+        return float(np.sqrt(max(w @ self.covariance @ w, 0.0)))
+
+    def risk_report(self, portfolio_value=None) -> Dict:
+        """VaR, CVaR and per-position risk contributions for the current book"""
+        w = self.positions
+        cov_w = self.covariance @ w
+        sigma = float(np.sqrt(max(w @ cov_w, 0.0)))
+        z = self._z()
+        var = z * sigma
+        cvar = sigma * norm.pdf(z) / (1 - self.confidence)
+
+        marginal = cov_w / sigma if sigma > 0 else np.zeros_like(w)
+        component = w * marginal
+        report = {
+            'volatility': sigma,
+            'var': var,
+            'cvar': cvar,
+            'marginal_var': dict(zip(self.symbols, z * marginal)),
+            'component_var': dict(zip(self.symbols, z * component)),
+            'risk_share': dict(zip(self.symbols, component / sigma if sigma > 0 else component))
+        }
+        if portfolio_value:
+            report['var_pct'] = var / portfolio_value
+            report['cvar_pct'] = cvar / portfolio_value
+        return report
+
+    def incremental_var(self, symbols, notionals) -> np.ndarray:
+        """VaR change from adding each candidate alone to the current book, for all candidates at once"""
+        idx = self.index_of(list(symbols))
+        c = np.asarray(notionals, dtype=float)
+        w = self.positions
+        cov_w = self.covariance @ w
+        base = w @ cov_w
+        variances = base + 2 * c * cov_w[idx] + c ** 2 * self.covariance[idx, idx]
+        return self._z() * (np.sqrt(np.maximum(variances, 0.0)) - np.sqrt(max(base, 0.0)))
+
+    def size_candidates(self, symbols, notionals, portfolio_value, risk_budget=None) -> np.ndarray:
+        """Scale a batch of candidate trades together to fit the total VaR budget
+
+        ``notionals`` are the signed sizes each signal would take on its own
+        (e.g. from RiskManager.calculate_position_size). All candidates are
+        added to the book and scaled by one common factor k in [0, 1] so
+        that VaR(book + k * candidates) <= budget * portfolio_value. Returns
+        the scaled notionals.
+        """
+        try:
+            budget = (risk_budget or self.risk_budget) * portfolio_value / self._z()
+            idx = self.index_of(list(symbols))
+            c = np.zeros(len(self.symbols))
+            np.add.at(c, idx, np.asarray(notionals, dtype=float))
+            w = self.positions
+
+            # sigma^2(k) = a k^2 + 2 b k + s0, solve sigma^2(k) = budget^2
+            a = c @ self.covariance @ c
+            b = w @ self.covariance @ c
+            s0 = w @ self.covariance @ w
+            target = budget ** 2
+            if a + 2 * b + s0 <= target:
+                k = 1.0
+            elif a <= 0:
+                k = 0.0
+            else:
+                disc = b ** 2 - a * (s0 - target)
+                k = (-b + np.sqrt(disc)) / a if disc >= 0 else 0.0
+                k = float(np.clip(k, 0.0, 1.0))
+            return np.asarray(notionals, dtype=float) * k
+        except Exception as e:
+            self.logger.error(f"Error sizing candidates: {str(e)}")
+            return np.zeros(len(notionals))
+
+    def correlation(self) -> np.ndarray:
+        std = np.sqrt(np.diag(self.covariance))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.covariance / np.outer(std, std)
+        return np.nan_to_num(corr)
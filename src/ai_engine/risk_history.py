@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+class RollingHistory:
+    """Fixed-capacity ring buffer of floats with O(1) running statistics
+
+    Values are written twice (at i and i + capacity) so the most recent n
+    values are always a contiguous, zero-copy view. Mean and variance over
+    the buffered window are maintained with a sliding Welford update, and
+    the all-time extremes are tracked separately so they survive eviction.
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity)
+        self._head = 0
+        self.size = 0
+        self.count = 0  # total values ever appended
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max_value = -np.inf
+        self.min_value = np.inf
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.values()[index]
+
+    def append(self, value):
+        value = float(value)
+        if self.size < self.capacity:
+            self.size += 1
+            delta = value - self.mean
+            self.mean += delta / self.size
+            self._m2 += delta * (value - self.mean)
+        else:
+            # Slide the window: the oldest value is overwritten by this write
+            old = float(self._data[self._head])
+            new_mean = self.mean + (value - old) / self.size
+            self._m2 += (value - old) * (value - new_mean + old - self.mean)
+            self.mean = new_mean
+        self._data[self._head] = value
+        self._data[self._head + self.capacity] = value
+        self._head = (self._head + 1) % self.capacity
+        self.count += 1
+        self.max_value = max(self.max_value, value)
+        self.min_value = min(self.min_value, value)
+
+    def values(self, n=None) -> np.ndarray:
+        """Zero-copy view of the last n values, oldest first"""
+        n = self.size if n is None else min(n, self.size)
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+    @property
+    def last(self) -> Optional[float]:
+        return float(self._data[self._head - 1 + self.capacity]) if self.size else None
+
+    @property
+    def variance(self) -> float:
+        return max(self._m2, 0.0) / self.size if self.size else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def trend(self, n=10) -> float:
+        """Mean step over the last n values, i.e. mean(diff(values(n))) in O(1)"""
+        n = min(n, self.size)
+        if n < 2:
+            return 0.0
+        end = self._head + self.capacity
+        return float((self._data[end - 1] - self._data[end - n]) / (n - 1))
+
+    def clear(self):
+        self.__init__(self.capacity)
+
+    def checkpoint(self) -> Dict:
+        """JSON-serializable state; running statistics are rebuilt from the values on restore"""
+        return {
+            'capacity': self.capacity,
+            'values': self.values().tolist(),
+            'count': self.count,
+            'max_value': None if self.count == 0 else self.max_value,
+            'min_value': None if self.count == 0 else self.min_value
+        }
+
+    def restore(self, state: Dict):
+        self.__init__(state['capacity'])
+        for value in state['values']:
+            self.append(value)
+        self.count = state.get('count', self.count)
+        if state.get('max_value') is not None:
+            self.max_value = state['max_value']
+            self.min_value = state['min_value']
+        return self
+
+    @classmethod
+    def from_checkpoint(cls, state: Dict) -> 'RollingHistory':
+        return cls(state['capacity']).restore(state)
+
+
+class RiskHistory:
+    """Position and drawdown histories kept separately per (symbol, strategy)
+
+    A key of (None, None) is the account-level history used when callers
+    do not say which symbol or strategy a value belongs to.
+    """
+
+    KINDS = ('position', 'drawdown')
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.buffers: Dict[Tuple[str, Optional[str], Optional[str]], RollingHistory] = {}
+
+    def get(self, kind, symbol=None, strategy=None) -> RollingHistory:
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown history kind: {kind}")
+        key = (kind, symbol, strategy)
+        if key not in self.buffers:
+            self.buffers[key] = RollingHistory(self.capacity)
+        return self.buffers[key]
+
+    def find(self, kind, symbol=None, strategy=None) -> Optional[RollingHistory]:
+        """Like get() but returns None instead of creating an empty buffer"""
+        return self.buffers.get((kind, symbol, strategy))
+
+    def keys(self, kind=None):
+        keys = [key[1:] for key in self.buffers if kind is None or key[0] == kind]
+        return list(dict.fromkeys(keys))
+
+    def checkpoint(self) -> Dict:
+        return {
+            'capacity': self.capacity,
+            'buffers': [{'kind': kind, 'symbol': symbol, 'strategy': strategy, 'state': buffer.checkpoint()}
+                        for (kind, symbol, strategy), buffer in self.buffers.items()]
+        }
+
+    def restore(self, state: Dict):
+        self.capacity = state['capacity']
+        self.buffers = {
+            (entry['kind'], entry['symbol'], entry['strategy']): RollingHistory.from_checkpoint(entry['state'])
+            for entry in state['buffers']
+        }
+        return self
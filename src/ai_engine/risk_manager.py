@@ -1,20 +1,41 @@
+import json
+import os
 import numpy as np
 import logging
 from datetime import datetime
+from .risk_history import RiskHistory
+from .metrics import timed
 
 class RiskManager:
-    def __init__(self, max_position_size=0.1, max_drawdown=0.02, stop_loss=0.01):
+    def __init__(self, max_position_size=0.1, max_drawdown=0.02, stop_loss=0.01, history_size=1000):
         self.max_position_size = max_position_size
         self.max_drawdown = max_drawdown
         self.stop_loss = stop_loss
         self.logger = logging.getLogger(__name__)
-        self.position_history = []
-        self.drawdown_history = []
+        # Bounded per-(symbol, strategy) ring buffers with running statistics
+        self.history = RiskHistory(history_size)
         self.last_update = datetime.now()
         self.market_state = 'neutral'
+
+    @property
+    def position_history(self):
+        """Account-level position history (fractions of portfolio value)"""
+        return self.history.get('position')
+
+    @property
+    def drawdown_history(self):
+        """Account-level drawdown history"""
+        return self.history.get('drawdown')
         
-    def calculate_position_size(self, portfolio_value, volatility, risk_score):
-        """Calculate optimal position size based on dynamic risk assessment"""
+    @timed('risk.position_size', symbol_arg='symbol')
+    def calculate_position_size(self, portfolio_value, volatility, risk_score, symbol=None, strategy=None,
+                                timestamp=None):
+        """Calculate optimal position size based on dynamic risk assessment
+
+        ``symbol``/``strategy`` select which history the sizing reads and
+        records into; without them the account-level history is used.
+        ``timestamp`` replaces the wall clock for the time decay (backtests).
+        """
         try:
             # Base position size
             base_size = portfolio_value * self.max_position_size
@@ -26,10 +47,10 @@ class RiskManager:
             risk_factor = np.exp(-2 * (1 - risk_score))
             
             # Market condition adjustment
-            market_factor = self._assess_market_conditions()
+            market_factor = self._assess_market_conditions(symbol, strategy)
             
             # Time decay factor
-            time_factor = self._calculate_time_decay()
+            time_factor = self._calculate_time_decay(timestamp)
             
             # Calculate final position size
             position_size = base_size * vol_factor * risk_factor * market_factor * time_factor
@@ -38,7 +59,7 @@ class RiskManager:
             max_allowed = portfolio_value * self.max_position_size
             position_size = min(position_size, max_allowed)
             
-            self.position_history.append(position_size / portfolio_value)
+            self.history.get('position', symbol, strategy).append(position_size / portfolio_value)
             return position_size
         except Exception as e:
             self.logger.error(f"Error calculating position size: {str(e)}")
@@ -66,42 +87,11 @@ class RiskManager:
             self.logger.error(f"Error calculating stop loss: {str(e)}")
             return None
     
-    def _assess_market_conditions(self):
-        """Assess current market conditions for risk adjustment"""
-        try:
-            # Analyze position history for trend
-            if len(self.position_history) > 0:
-                recent_positions = self.position_history[-10:]
-                trend = np.mean(np.diff(recent_positions))
-                
-                if trend > 0.01:
-                    self.market_state = 'bullish'
-                    return 1.2
-                elif trend < -0.01:
-                    self.market_state = 'bearish'
-                    return 0.8
-            
-            self.market_state = 'neutral'
-            return 1.0
-        except Exception as e:
-            self.logger.error(f"Error assessing market conditions: {str(e)}")
-            return 1.0
-    
-    def _calculate_time_decay(self):
-        """Calculate time-based decay factor for risk adjustment"""
-        try:
-            time_diff = (datetime.now() - self.last_update).total_seconds() / 3600
-            decay = np.exp(-0.1 * time_diff)
-            return max(0.5, decay)
-        except Exception as e:
-            self.logger.error(f"Error calculating time decay: {str(e)}")
-            return 1.0
-    
-    def update_drawdown(self, current_value, peak_value):
+    def update_drawdown(self, current_value, peak_value, symbol=None, strategy=None):
         """Update and monitor drawdown levels"""
         try:
             drawdown = (peak_value - current_value) / peak_value
-            self.drawdown_history.append(drawdown)
+            self.history.get('drawdown', symbol, strategy).append(drawdown)
             
             # Check if max drawdown exceeded
             if drawdown > self.max_drawdown:
@@ -112,46 +102,50 @@ class RiskManager:
             self.logger.error(f"Error updating drawdown: {str(e)}")
             return True
     
-    def get_risk_metrics(self):
+    def get_risk_metrics(self, symbol=None, strategy=None):
         """Get current risk metrics summary"""
+        drawdowns = self.history.get('drawdown', symbol, strategy)
+        positions = self.history.get('position', symbol, strategy)
         return {
             'market_state': self.market_state,
-            'current_drawdown': self.drawdown_history[-1] if self.drawdown_history else 0,
-            'max_historical_drawdown': max(self.drawdown_history) if self.drawdown_history else 0,
-            'position_utilization': np.mean(self.position_history[-10:]) if self.position_history else 0
+            'current_drawdown': drawdowns.last if len(drawdowns) else 0,
+            'max_historical_drawdown': drawdowns.max_value if len(drawdowns) else 0,
+            'position_utilization': float(np.mean(positions.values(10))) if len(positions) else 0,
+            'position_mean': positions.mean,
+            'position_std': positions.std,
+            'position_trend': positions.trend(10)
         }
     
-    def _calculate_atr(self, period=14):
+    def _calculate_atr(self, period=14, symbol=None, strategy=None):
         """Calculate Average True Range for dynamic stop loss"""
         try:
-            if len(self.position_history) < period:
+            history = self.history.get('position', symbol, strategy)
+            if len(history) < period:
                 return self.stop_loss
                 
-            # Calculate true range
-            true_ranges = []
-            for i in range(1, len(self.position_history)):
-                true_range = abs(self.position_history[i] - self.position_history[i-1])
-                true_ranges.append(true_range)
-            
-            return np.mean(true_ranges[-period:])
+            # Calculate true range over the last period steps only
+            true_ranges = np.abs(np.diff(history.values(period + 1)))
+            return np.mean(true_ranges)
         except Exception as e:
             self.logger.error(f"Error calculating ATR: {str(e)}")
             return self.stop_loss
     
-    def _assess_market_conditions(self):
+    def _assess_market_conditions(self, symbol=None, strategy=None):
         """Assess current market conditions for position sizing"""
         try:
-            if len(self.position_history) < 10:
+            history = self.history.get('position', symbol, strategy)
+            if len(history) < 10:
                 return 1.0
                 
-            recent_positions = self.position_history[-10:]
-            trend = np.mean(np.diff(recent_positions))
-            volatility = np.std(recent_positions)
+            # Running mean/std of the whole window and an O(1) trend; only
+            # the fixed 10-value tail is touched per call
+            trend = history.trend(10)
+            volatility = np.std(history.values(10))
             
             # Update market state
-            if volatility > np.mean(self.position_history) * 1.5:
+            if volatility > history.mean * 1.5:
                 self.market_state = 'volatile'
-            elif abs(trend) > np.std(self.position_history) * 2:
+            elif abs(trend) > history.std * 2:
                 self.market_state = 'trending'
             else:
                 self.market_state = 'neutral'
@@ -166,18 +160,21 @@ class RiskManager:
             self.logger.error(f"Error assessing market conditions: {str(e)}")
             return 1.0
     
-    def _calculate_time_decay(self):
+    def _calculate_time_decay(self, now=None):
         """Calculate time decay factor for position sizing"""
         try:
-            time_diff = (datetime.now() - self.last_update).total_seconds() / 3600
+            now = now or datetime.now()
+            time_diff = (now - self.last_update).total_seconds() / 3600
             decay_factor = np.exp(-0.1 * time_diff)  # Exponential decay
-            self.last_update = datetime.now()
+            self.last_update = now
             return max(0.5, decay_factor)
         except Exception as e:
             self.logger.error(f"Error calculating time decay: {str(e)}")
             return 1.0
     
-    def validate_trade(self, portfolio_value, position_size, stop_loss_price, entry_price):
+    @timed('risk.validate_trade', symbol_arg='symbol')
+    def validate_trade(self, portfolio_value, position_size, stop_loss_price, entry_price,
+                       symbol=None, strategy=None):
         """Comprehensive trade validation with multiple risk checks"""
         try:
             # Check position size limits
@@ -194,18 +191,25 @@ class RiskManager:
                 if position_size > portfolio_value * self.max_position_size * 0.7:
                     return False, "Position size too large for volatile market"
             
-            # Check recent performance
-            if len(self.drawdown_history) > 0:
-                recent_drawdown = np.mean(self.drawdown_history[-5:])
-                if recent_drawdown > self.max_drawdown * 0.8:
-                    return False, "Recent drawdown too high"
+            # Check recent performance: account-level drawdowns always count,
+            # per-symbol/strategy ones only make the check stricter
+            if self._recent_drawdown(symbol, strategy) > self.max_drawdown * 0.8:
+                return False, "Recent drawdown too high"
             
             return True, "Trade validated"
         except Exception as e:
             self.logger.error(f"Error validating trade: {str(e)}")
             return False, "Validation error"
     
-    def update_market_state(self, market_data):
+    def _recent_drawdown(self, symbol=None, strategy=None, lookback=5):
+        """Worst mean of the last lookback drawdowns over the account and (symbol, strategy) histories"""
+        keys = {(None, None), (symbol, strategy)}
+        recent = [float(np.mean(history.values(lookback)))
+                  for history in (self.history.find('drawdown', *key) for key in keys)
+                  if history is not None and len(history) > 0]
+        return max(recent, default=0.0)
+
+    def update_market_state(self, market_data, symbol=None, strategy=None):
         """Update market state with new data"""
         try:
             if not market_data or 'close' not in market_data:
@@ -218,30 +222,57 @@ class RiskManager:
             
             returns = np.diff(close_prices) / close_prices[:-1]
             
-            # Update drawdown history
+            # Update drawdown history (bounded by the ring buffer capacity)
             if len(returns) > 0:
                 drawdown = min(0, returns[-1])
-                self.drawdown_history.append(drawdown)
-                
-                # Keep history length manageable
-                if len(self.drawdown_history) > 100:
-                    self.drawdown_history = self.drawdown_history[-100:]
+                self.history.get('drawdown', symbol, strategy).append(drawdown)
             
             return True
         except Exception as e:
             self.logger.error(f"Error updating market state: {str(e)}")
             return False
     
-    def _check_cumulative_risk(self, potential_loss, portfolio_value, lookback=5):
+    def _check_cumulative_risk(self, potential_loss, portfolio_value, lookback=5, symbol=None, strategy=None):
         """Check if recent cumulative risk is too high"""
         try:
-            if len(self.drawdown_history) < lookback:
+            drawdowns = self.history.find('drawdown', symbol, strategy)
+            if drawdowns is None or len(drawdowns) < lookback:
                 return False
                 
-            recent_drawdowns = self.drawdown_history[-lookback:]
-            cumulative_risk = sum(recent_drawdowns) + (potential_loss / portfolio_value)
+            cumulative_risk = drawdowns.values(lookback).sum() + (potential_loss / portfolio_value)
             
             return cumulative_risk > self.max_drawdown * 2
         except Exception as e:
             self.logger.error(f"Error checking cumulative risk: {str(e)}")
-            return True  # Conservative approach: reject trade if error
\ No newline at end of file
+            return True  # Conservative approach: reject trade if error
+
+    def save_state(self, path):
+        """Persist risk histories and market state so they survive restarts"""
+        try:
+            state = {
+                'history': self.history.checkpoint(),
+                'market_state': self.market_state,
+                'last_update': self.last_update.isoformat()
+            }
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error saving risk state: {str(e)}")
+            return False
+
+    def load_state(self, path):
+        """Restore state written by save_state"""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            self.history = RiskHistory().restore(state['history'])
+            self.market_state = state.get('market_state', 'neutral')
+            if state.get('last_update'):
+                self.last_update = datetime.fromisoformat(state['last_update'])
+            return True
+        except Exception as e:
+            self.logger.error(f"Error loading risk state: {str(e)}")
+            return False
@@ -1,16 +1,24 @@
 import numpy as np
-import pandas as pd
-from typing import Dict, Optional
-import talib
+from typing import TYPE_CHECKING, Dict, List, Optional
 import logging
 from .ml_models import MLPredictor
+from .batch_indicators import calculate_indicators_for_frames
+from .metrics import timed
+from .lazy import lazy_import
+
+talib = lazy_import('talib')
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class SignalGenerator:
-    def __init__(self):
-        self.ml_predictor = MLPredictor()
+    def __init__(self, ml_predictor: Optional[MLPredictor] = None):
+        # 可以与TradingEngine共用同一个MLPredictor
+        self.ml_predictor = ml_predictor or MLPredictor()
         self.logger = logging.getLogger(__name__)
         
-    def calculate_technical_indicators(self, ohlcv_data: pd.DataFrame) -> Dict:
+    @timed('indicators.talib')
+    def calculate_technical_indicators(self, ohlcv_data: 'pd.DataFrame') -> Dict:
         """计算技术指标"""
         try:
             close = ohlcv_data['close'].values
@@ -45,20 +53,34 @@ class SignalGenerator:
                 'macd_signal': macd_signal,
                 'atr': atr,
                 'volatility': volatility,
-                'obv': obv
+                'obv': obv,
+                'close': close[-1]
             }
         except Exception as e:
             self.logger.error(f"Error calculating technical indicators: {str(e)}")
             return None
     
-    def generate_signal(self, market_data: Dict, portfolio_value: float) -> Optional[Dict]:
-        """生成交易信号"""
+    def calculate_technical_indicators_batch(self, ohlcv_frames: List['pd.DataFrame']) -> Optional[Dict]:
+        """批量计算多个交易对的技术指标, 返回列式结果 (每个指标一个数组, 按输入顺序排列)"""
+        try:
+            return calculate_indicators_for_frames(ohlcv_frames)
+        except Exception as e:
+            self.logger.error(f"Error calculating batch technical indicators: {str(e)}")
+            return None
+    
+    def generate_signal(self, market_data: Dict, portfolio_value: float,
+                        indicators: Optional[Dict] = None) -> Optional[Dict]:
+        """生成交易信号
+
+        indicators为调用方已算好的指标 (如TradingEngine流水线结果中的indicators), 传入时直接复用。
+        """
         try:
             if market_data is None or 'ohlcv' not in market_data:
                 return None
                 
-            # 计算技术指标
-            indicators = self.calculate_technical_indicators(market_data['ohlcv'])
+            # 计算技术指标 (调用方已计算过时直接复用)
+            indicators = (indicators or market_data.get('indicators')
+                          or self.calculate_technical_indicators(market_data['ohlcv']))
             if not indicators:
                 return None
             
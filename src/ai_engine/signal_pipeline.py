@@ -0,0 +1,325 @@
+import time
+import queue
+import numpy as np
+import pandas as pd
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+from .backtester import ta_signal_batch, combine_signals_batch
+
+# 共享内存中每根K线的字段顺序
+FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+# 共享内存块头部: 每个槽位一个int64序号 (seqlock), 其后为K线数据
+HEADER_BYTES = 64
+N_SLOTS = 2
+
+
+def _views(shm, n_symbols, window):
+    """共享内存块上的序号头和 (槽位, 交易对, K线, 字段) 数组视图"""
+    header = np.ndarray((N_SLOTS,), dtype=np.int64, buffer=shm.buf)
+    data = np.ndarray((N_SLOTS, n_symbols, window, len(FIELDS)), dtype=np.float64,
+                      buffer=shm.buf, offset=HEADER_BYTES)
+    return header, data
+
+
+def _load_predictor(config: Dict):
+    """在工作进程内构造并加载MLPredictor, 之后每个周期复用"""
+    from .ml_models import MLPredictor
+
+    predictor = MLPredictor()
+    watcher = None
+    if config.get('fast_model_path'):
+        predictor.load_fast_model(config['fast_model_path'])
+    elif config.get('model_path'):
+        predictor.load_model(config['model_path'])
+    if config.get('registry_root'):
+        from .model_registry import ModelRegistry, RegistryWatcher
+
+        registry = ModelRegistry(config['registry_root'], config.get('registry_name', 'default'))
+        watcher = RegistryWatcher(registry, predictor)
+        watcher.sync()
+    return predictor, watcher
+
+
+def _warm_up(predictor):
+    """用一段合成K线走一遍指标、特征和推理, 把首次调用时的延迟导入和初始化提前到就绪之前"""
+    from .streaming_indicators import StreamingIndicators
+
+    state = StreamingIndicators()
+    closes = 100.0 + np.cumsum(np.sin(np.arange(60)))
+    for close in closes:
+        state.update(close + 0.5, close - 0.5, close, 1.0)
+    columns = {key: np.array([value]) for key, value in state.values().items()}
+    predictor.predict_batch(predictor.prepare_features_batch(columns))
+    ta_signal_batch(columns)
+
+
+def _update_indicators(engine, symbol, rows, last_seen: Dict):
+    """增量更新某个交易对的指标状态, 返回含形成中K线的最新指标值
+
+    最后一行视为仍在形成中的K线, 只试算不提交; 其余K线中时间戳新于上次处理的
+    才送入增量引擎。与上次处理的K线之间出现缺口时用整个窗口重新预热。
+    """
+    closed, forming = rows[:-1], rows[-1]
+    last_ts = last_seen.get(symbol)
+    timestamps = closed[:, 0]
+    if last_ts is None or (len(timestamps) and timestamps[0] > last_ts):
+        new = closed
+        engine.states.pop(symbol, None)
+    else:
+        new = closed[timestamps > last_ts]
+
+    state = engine.get_state(symbol)
+    for _, _, high, low, close, volume in new:
+        state.update(high, low, close, volume)
+    if len(closed):
+        last_seen[symbol] = timestamps[-1]
+    return state.preview(forming[2], forming[3], forming[4], forming[5])
+
+
+def _worker_main(worker_id, symbols, shm_name, n_symbols, window, tasks, results, predictor_config, ready):
+    """工作进程: 常驻的MLPredictor和指标状态, 每个周期处理分配到的交易对
+
+    导入、模型加载和一次预热推理完成后设置ready, 主进程据此判断进程是否可以参与周期。
+    """
+    from .streaming_indicators import StreamingIndicatorEngine
+
+    logger = logging.getLogger(__name__)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    header, data = _views(shm, n_symbols, window)
+    predictor, watcher = _load_predictor(predictor_config)
+    engine = StreamingIndicatorEngine()
+    last_seen = {}
+    rows_of = {symbol: index for index, symbol in symbols}
+    try:
+        _warm_up(predictor)
+    except Exception as e:
+        logger.warning(f"Worker {worker_id} warm-up failed: {str(e)}")
+    ready.set()
+
+    try:
+        while True:
+            task = tasks.get()
+            # 落后时直接跳到最新的周期, 过期周期的结果反正会被主进程丢弃
+            while task is not None:
+                try:
+                    newer = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                task = newer
+            if task is None:
+                break
+            cycle, slot = task
+            started = time.perf_counter()
+            try:
+                if watcher is not None:
+                    watcher.sync()
+                # 先复制本分片的数据, 再核对序号, 期间主进程覆写过该槽位则放弃本周期
+                block = {symbol: data[slot, row].copy() for symbol, row in rows_of.items()}
+                if header[slot] != cycle:
+                    results.put((cycle, worker_id, {}, time.perf_counter() - started))
+                    continue
+
+                names, indicators, timestamps = [], [], []
+                for symbol, rows in block.items():
+                    rows = rows[~np.isnan(rows[:, 0])]
+                    if len(rows) == 0:
+                        continue
+                    names.append(symbol)
+                    indicators.append(_update_indicators(engine, symbol, rows, last_seen))
+                    timestamps.append(rows[-1, 0])
+
+                signals = {}
+                if names:
+                    columns = {key: np.array([values[key] for values in indicators]) for key in indicators[0]}
+                    ml_signal, confidence = predictor.predict_batch(predictor.prepare_features_batch(columns))
+                    ta_signal = ta_signal_batch(columns)
+                    final = combine_signals_batch(ml_signal, ta_signal, confidence)
+                    for i, symbol in enumerate(names):
+                        signals[symbol] = {
+                            'signal': int(final[i]),
+                            'confidence': float(confidence[i]),
+                            'indicators': indicators[i],
+                            'ml_signal': int(ml_signal[i]),
+                            'ta_signal': int(ta_signal[i]),
+                            'timestamp': int(timestamps[i])
+                        }
+                results.put((cycle, worker_id, signals, time.perf_counter() - started))
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed on cycle {cycle}: {str(e)}")
+                results.put((cycle, worker_id, {}, time.perf_counter() - started))
+    finally:
+        del header, data
+        shm.close()
+
+
+class ParallelSignalPipeline:
+    """按交易对分片到多个工作进程的信号流水线
+
+    指标计算、特征准备和模型推理都是CPU密集型, 受GIL限制无法靠线程并行。
+    每个工作进程常驻一个已加载的MLPredictor和所负责交易对的增量指标状态;
+    主进程把K线写入共享内存 (两个槽位轮换, 带序号校验), 只通过队列传递周期号,
+    不序列化DataFrame。run_cycle() 在截止时间内收集结果, 超时的交易对记为缺失。
+
+    进程启动 (尤其是spawn方式下的导入和模型加载) 可能远超单个周期的截止时间,
+    因此start() 会等待每个进程报告就绪 (最多ready_timeout秒); 周期中重启的进程
+    在就绪前不计入等待, 其交易对记为缺失。
+    """
+
+    def __init__(self, symbols: List[str], n_workers=None, window=200, deadline=1.0,
+                 model_path=None, fast_model_path=None, registry_root=None, registry_name='default',
+                 start_method=None, ready_timeout=60.0):
+        self.symbols = list(symbols)
+        self.n_workers = max(1, min(n_workers or mp.cpu_count(), len(self.symbols)))
+        self.window = window
+        self.deadline = deadline
+        self.ready_timeout = ready_timeout
+        self.predictor_config = {
+            'model_path': model_path,
+            'fast_model_path': fast_model_path,
+            'registry_root': registry_root,
+            'registry_name': registry_name
+        }
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # 固定分片, 同一交易对始终由同一进程处理, 其指标状态才能保持热
+        self.shards = [[(i, self.symbols[i]) for i in range(w, len(self.symbols), self.n_workers)]
+                       for w in range(self.n_workers)]
+        self._context = mp.get_context(start_method)
+        self._shm = None
+        self._workers = []
+        self._ready = []
+        self._tasks = []
+        self._results = None
+        self._cycle = 0
+        self.logger = logging.getLogger(__name__)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spawn(self, worker_id):
+        ready = self._context.Event()
+        self._ready[worker_id] = ready
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.shards[worker_id], self._shm.name, len(self.symbols), self.window,
+                  self._tasks[worker_id], self._results, self.predictor_config, ready),
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def wait_ready(self, timeout=None) -> bool:
+        """等待所有工作进程就绪, 返回是否全部就绪; 进程在就绪前退出时不再等待它"""
+        timeout = self.ready_timeout if timeout is None else timeout
+        give_up = time.perf_counter() + timeout
+        for w, ready in enumerate(self._ready):
+            while not ready.wait(timeout=0.05):
+                if not self._workers[w].is_alive():
+                    self.logger.error(f"Signal worker {w} exited before becoming ready")
+                    break
+                if time.perf_counter() >= give_up:
+                    self.logger.warning(f"Signal workers not ready after {timeout:.1f}s")
+                    return False
+        return all(ready.is_set() for ready in self._ready)
+
+    def start(self):
+        size = HEADER_BYTES + N_SLOTS * len(self.symbols) * self.window * len(FIELDS) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._header, self._data = _views(self._shm, len(self.symbols), self.window)
+        self._header[:] = -1
+        self._data[:] = np.nan
+        self._results = self._context.Queue()
+        self._tasks = [self._context.Queue() for _ in range(self.n_workers)]
+        self._ready = [None] * self.n_workers
+        self._workers = [self._spawn(w) for w in range(self.n_workers)]
+        self.wait_ready()
+        return self
+
+    def _write(self, slot, ohlcv_frames: Dict[str, pd.DataFrame]):
+        data = self._data[slot]
+        for symbol, df in ohlcv_frames.items():
+            row = self._index.get(symbol)
+            if row is None or df is None:
+                continue
+            df = df.iloc[-self.window:]
+            n = len(df)
+            target = data[row]
+            target[:self.window - n] = np.nan
+            timestamps = df['timestamp']
+            if pd.api.types.is_datetime64_any_dtype(timestamps):
+                timestamps = timestamps.astype('datetime64[ms]').astype('int64')
+            target[self.window - n:, 0] = timestamps.values
+            for j, field in enumerate(FIELDS[1:], start=1):
+                target[self.window - n:, j] = df[field].values
+
+    def run_cycle(self, ohlcv_frames: Dict[str, pd.DataFrame], deadline=None) -> Dict:
+        """执行一个周期: 写入共享内存, 通知各进程, 在截止时间内收集信号
+
+        ohlcv_frames为 {交易对: MarketDataCollector.fetch_historical_data格式的DataFrame},
+        缺少的交易对本周期不产生信号。返回 {'signals', 'missing', 'worker_seconds', 'elapsed'}。
+        """
+        started = time.perf_counter()
+        deadline = self.deadline if deadline is None else deadline
+        # 重启意外退出的工作进程, 其指标状态会在下一周期自动重新预热
+        for w, process in enumerate(self._workers):
+            if not process.is_alive():
+                self.logger.warning(f"Signal worker {w} exited, restarting")
+                self._workers[w] = self._spawn(w)
+
+        self._cycle += 1
+        cycle, slot = self._cycle, self._cycle % N_SLOTS
+        self._header[slot] = -1
+        self._data[slot] = np.nan
+        self._write(slot, ohlcv_frames)
+        self._header[slot] = cycle
+        for task_queue in self._tasks:
+            task_queue.put((cycle, slot))
+
+        signals, worker_seconds = {}, {}
+        warming = {w for w, ready in enumerate(self._ready) if not ready.is_set()}
+        if warming:
+            self.logger.warning(f"Cycle {cycle}: workers {sorted(warming)} still starting up")
+        pending = set(range(self.n_workers)) - warming
+        while pending:
+            remaining = deadline - (time.perf_counter() - started)
+            if remaining <= 0:
+                break
+            try:
+                result_cycle, worker_id, worker_signals, seconds = self._results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if result_cycle != cycle:
+                continue  # 上个周期超时后才到达的结果
+            pending.discard(worker_id)
+            signals.update(worker_signals)
+            worker_seconds[worker_id] = seconds
+
+        missing = [symbol for symbol in self.symbols if symbol in ohlcv_frames and symbol not in signals]
+        if pending:
+            self.logger.warning(f"Cycle {cycle} deadline missed by workers {sorted(pending)}")
+        return {
+            'signals': signals,
+            'missing': missing,
+            'worker_seconds': worker_seconds,
+            'elapsed': time.perf_counter() - started
+        }
+
+    def close(self):
+        for task_queue in self._tasks:
+            task_queue.put(None)
+        for process in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+        self._ready = []
+        if self._shm is not None:
+            del self._header, self._data
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
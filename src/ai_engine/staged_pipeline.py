@@ -0,0 +1,86 @@
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import metrics
+
+
+class StageHalt(Exception):
+    """Raised by a stage to stop the pipeline early without it being an error"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class StagedPipeline:
+    """Ordered, individually timed processing stages sharing one context dict
+
+    Each stage is a callable taking the context dict and updating it in
+    place. A stage stops the run by raising StageHalt (e.g. a neutral
+    signal or a rejected trade); any other exception is logged and also
+    stops the run. Stages can be replaced, inserted or removed by name.
+    """
+
+    def __init__(self, stages: Optional[List[Tuple[str, Callable[[Dict], None]]]] = None):
+        self.stages: List[Tuple[str, Callable[[Dict], None]]] = list(stages or [])
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.stages]
+
+    def _position(self, name) -> int:
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise KeyError(f"Unknown stage: {name}")
+
+    def add(self, name, stage):
+        self.stages.append((name, stage))
+        return self
+
+    def replace(self, name, stage):
+        self.stages[self._position(name)] = (name, stage)
+        return self
+
+    def insert_before(self, before, name, stage):
+        self.stages.insert(self._position(before), (name, stage))
+        return self
+
+    def insert_after(self, after, name, stage):
+        self.stages.insert(self._position(after) + 1, (name, stage))
+        return self
+
+    def remove(self, name):
+        del self.stages[self._position(name)]
+        return self
+
+    def run(self, context: Dict) -> Dict:
+        """Run the stages in order
+
+        Per-stage wall times (seconds) are recorded in context['timings'];
+        context['halted_at'] and context['reason'] are set when a stage stops
+        the run, and context['error'] when a stage fails.
+        """
+        timings = context.setdefault('timings', {})
+        context['halted_at'] = None
+        for name, stage in self.stages:
+            started = time.perf_counter()
+            try:
+                stage(context)
+            except StageHalt as halt:
+                context['halted_at'] = name
+                context['reason'] = halt.reason
+                metrics.increment('pipeline_halts', stage=name)
+                return context
+            except Exception as e:
+                self.logger.error(f"Error in stage {name}: {str(e)}")
+                context['halted_at'] = name
+                context['error'] = str(e)
+                metrics.increment('errors', stage=f"pipeline.{name}", error=type(e).__name__)
+                return context
+            finally:
+                timings[name] = time.perf_counter() - started
+                metrics.observe(f"pipeline.{name}", timings[name], context.get('symbol'))
+        return context
@@ -0,0 +1,331 @@
+import math
+import logging
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 与SignalGenerator.calculate_technical_indicators使用相同的参数
+SMA_FAST = 20
+SMA_SLOW = 50
+EMA_PERIOD = 12
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+ATR_PERIOD = 14
+STDDEV_PERIOD = 20
+
+WINDOW = max(SMA_SLOW, MACD_SLOW, STDDEV_PERIOD)
+
+INDICATOR_KEYS = ('sma_20', 'sma_50', 'ema_12', 'rsi', 'macd', 'macd_signal', 'atr', 'volatility', 'obv')
+
+
+class StreamingIndicators:
+    """单个交易对的增量技术指标状态
+
+    每根新K线以O(1)更新全部指标: SMA使用滚动和, EMA/MACD使用递推,
+    RSI/ATR使用Wilder平滑, 标准差使用滑动窗口Welford方差。
+    初始化方式与talib一致 (EMA以SMA为种子, MACD快慢线在同一位置起算),
+    因此输出与talib路径在浮点误差内一致。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._closes = np.zeros(WINDOW)
+        self._prev_close = None
+
+        self._sum_fast = 0.0
+        self._sum_slow = 0.0
+
+        # 滑动窗口Welford
+        self._var_mean = 0.0
+        self._var_m2 = 0.0
+        # 连续相同收盘价的根数
+        self._flat_run = 0
+
+        self._ema = None
+        self._ema_seed = 0.0
+
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+        self._macd_fast = None
+        self._macd_slow = None
+        self._macd_signal = None
+        self._macd_seed = 0.0
+        self._macd_count = 0
+
+        self._atr = None
+        self._atr_seed = 0.0
+
+        self._obv = 0.0
+
+        # 仍在形成中的K线 (由逐笔成交累积)
+        self._forming = None
+
+    def _close_at(self, age):
+        """返回age根K线之前的收盘价 (age=0为最新一根)"""
+        return self._closes[(self.count - 1 - age) % WINDOW]
+
+    def update(self, high, low, close, volume) -> Dict:
+        """用一根已收盘K线更新全部指标并返回最新指标值"""
+        self._forming = None
+        self._apply(float(high), float(low), float(close), float(volume))
+        return self.values()
+
+    def _apply(self, high, low, close, volume):
+        prev_close = self._prev_close
+        n = self.count + 1
+
+        # 滚动和: 先取出将要移出窗口的值, 再写入新值
+        old_fast = self._close_at(SMA_FAST - 1) if n > SMA_FAST else None
+        old_slow = self._close_at(SMA_SLOW - 1) if n > SMA_SLOW else None
+        self._closes[self.count % WINDOW] = close
+        self.count = n
+
+        self._sum_fast += close - (old_fast if old_fast is not None else 0.0)
+        self._sum_slow += close - (old_slow if old_slow is not None else 0.0)
+
+        # 滑动窗口Welford方差
+        if old_fast is None:
+            delta = close - self._var_mean
+            self._var_mean += delta / n
+            self._var_m2 += delta * (close - self._var_mean)
+        else:
+            old_mean = self._var_mean
+            self._var_mean += (close - old_fast) / STDDEV_PERIOD
+            self._var_m2 += (close - old_fast) * (close - self._var_mean + old_fast - old_mean)
+            self._var_m2 = max(self._var_m2, 0.0)
+        # 窗口内价格全部相同时方差精确为0, 同时清掉滑动更新累积的舍入误差
+        self._flat_run = self._flat_run + 1 if close == prev_close else 1
+        if self._flat_run >= STDDEV_PERIOD:
+            self._var_mean = close
+            self._var_m2 = 0.0
+
+        # EMA12, 以前12根的SMA为种子
+        if n < EMA_PERIOD:
+            self._ema_seed += close
+        elif n == EMA_PERIOD:
+            self._ema = (self._ema_seed + close) / EMA_PERIOD
+        else:
+            k = 2.0 / (EMA_PERIOD + 1)
+            self._ema += (close - self._ema) * k
+
+        # MACD: 快慢线都在第MACD_SLOW根处起算, 快线种子为最近MACD_FAST根的均值
+        if n == MACD_SLOW:
+            self._macd_slow = self._sum_window(MACD_SLOW)
+            self._macd_fast = self._sum_window(MACD_FAST)
+        elif n > MACD_SLOW:
+            self._macd_fast += (close - self._macd_fast) * (2.0 / (MACD_FAST + 1))
+            self._macd_slow += (close - self._macd_slow) * (2.0 / (MACD_SLOW + 1))
+        if n >= MACD_SLOW:
+            macd = self._macd_fast - self._macd_slow
+            self._macd_count += 1
+            if self._macd_count < MACD_SIGNAL:
+                self._macd_seed += macd
+            elif self._macd_count == MACD_SIGNAL:
+                self._macd_signal = (self._macd_seed + macd) / MACD_SIGNAL
+            else:
+                self._macd_signal += (macd - self._macd_signal) * (2.0 / (MACD_SIGNAL + 1))
+
+        if prev_close is not None:
+            # RSI, Wilder平滑
+            change = close - prev_close
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            if n <= RSI_PERIOD + 1:
+                self._avg_gain += gain / RSI_PERIOD
+                self._avg_loss += loss / RSI_PERIOD
+            else:
+                self._avg_gain = (self._avg_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+                self._avg_loss = (self._avg_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+
+            # ATR, Wilder平滑
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            if n <= ATR_PERIOD:
+                self._atr_seed += true_range
+            elif n == ATR_PERIOD + 1:
+                self._atr = (self._atr_seed + true_range) / ATR_PERIOD
+            else:
+                self._atr = (self._atr * (ATR_PERIOD - 1) + true_range) / ATR_PERIOD
+
+            # OBV
+            if close > prev_close:
+                self._obv += volume
+            elif close < prev_close:
+                self._obv -= volume
+        else:
+            self._obv = volume
+
+        self._prev_close = close
+
+    def _sum_window(self, period):
+        """窗口内最近period根收盘价的均值, 仅在初始化种子时调用一次"""
+        return sum(self._close_at(age) for age in range(period)) / period
+
+    def update_trade(self, price, amount) -> Dict:
+        """用一笔成交更新当前形成中的K线, 返回假设该K线此刻收盘时的指标值
+
+        已提交的状态不会被修改, 下一次update()传入正式收盘K线时丢弃形成中的K线。
+        """
+        price = float(price)
+        amount = float(amount)
+        if self._forming is None:
+            self._forming = [price, price, price, amount]
+        else:
+            forming = self._forming
+            forming[0] = max(forming[0], price)
+            forming[1] = min(forming[1], price)
+            forming[2] = price
+            forming[3] += amount
+
+        return self.preview(*self._forming)
+
+    def preview(self, high, low, close, volume) -> Dict:
+        """假设传入的K线此刻收盘时的指标值, 不修改已提交的状态"""
+        # 暂存标量状态和将被覆盖的收盘价槽位, 试算后原样恢复
+        saved = dict(self.__dict__)
+        slot = self.count % WINDOW
+        overwritten = self._closes[slot]
+        self._apply(float(high), float(low), float(close), float(volume))
+        values = self.values()
+        self._closes[slot] = overwritten
+        self.__dict__.update(saved)
+        return values
+
+    def values(self) -> Dict:
+        """当前指标值, 预热期内的指标为NaN (与talib一致)"""
+        n = self.count
+        nan = float('nan')
+
+        if n > RSI_PERIOD:
+            total = self._avg_gain + self._avg_loss
+            rsi = 100.0 * self._avg_gain / total if total != 0 else 0.0
+        else:
+            rsi = nan
+
+        macd = self._macd_fast - self._macd_slow if n >= MACD_SLOW else nan
+
+        return {
+            'sma_20': self._sum_fast / SMA_FAST if n >= SMA_FAST else nan,
+            'sma_50': self._sum_slow / SMA_SLOW if n >= SMA_SLOW else nan,
+            'ema_12': self._ema if self._ema is not None else nan,
+            'rsi': rsi,
+            'macd': macd if self._macd_signal is not None else nan,
+            'macd_signal': self._macd_signal if self._macd_signal is not None else nan,
+            'atr': self._atr if self._atr is not None else nan,
+            'volatility': math.sqrt(self._var_m2 / STDDEV_PERIOD) if n >= STDDEV_PERIOD else nan,
+            'obv': self._obv if n > 0 else nan,
+            'close': self._prev_close if n > 0 else nan
+        }
+
+    def checkpoint(self) -> Dict:
+        """导出可JSON序列化的完整状态, 重启后用restore()恢复即可免去预热"""
+        state = {k: v for k, v in self.__dict__.items() if k != '_closes'}
+        state['_closes'] = self._closes.tolist()
+        if self._forming is not None:
+            state['_forming'] = list(self._forming)
+        return state
+
+    def restore(self, state: Dict):
+        """从checkpoint()导出的状态恢复"""
+        for key, value in state.items():
+            setattr(self, key, value)
+        self._closes = np.asarray(state['_closes'], dtype=float)
+        if self._forming is not None:
+            self._forming = list(self._forming)
+        return self
+
+    @classmethod
+    def from_checkpoint(cls, state: Dict) -> 'StreamingIndicators':
+        return cls().restore(state)
+
+
+class StreamingIndicatorEngine:
+    """按交易对维护StreamingIndicators状态"""
+
+    def __init__(self):
+        self.states: Dict[str, StreamingIndicators] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def get_state(self, symbol) -> StreamingIndicators:
+        if symbol not in self.states:
+            self.states[symbol] = StreamingIndicators()
+        return self.states[symbol]
+
+    def update_candle(self, symbol, high, low, close, volume) -> Optional[Dict]:
+        """新K线收盘时调用"""
+        try:
+            return self.get_state(symbol).update(high, low, close, volume)
+        except Exception as e:
+            self.logger.error(f"Error updating indicators for {symbol}: {str(e)}")
+            return None
+
+    def update_trade(self, symbol, price, amount) -> Optional[Dict]:
+        """新成交到达时调用"""
+        try:
+            return self.get_state(symbol).update_trade(price, amount)
+        except Exception as e:
+            self.logger.error(f"Error updating indicators from trade for {symbol}: {str(e)}")
+            return None
+
+    def warm_up(self, symbol, ohlcv_data: 'pd.DataFrame') -> Optional[Dict]:
+        """用历史K线初始化某个交易对的状态"""
+        state = StreamingIndicators()
+        values = None
+        for high, low, close, volume in zip(ohlcv_data['high'].values, ohlcv_data['low'].values,
+                                            ohlcv_data['close'].values, ohlcv_data['volume'].values):
+            values = state.update(high, low, close, volume)
+        self.states[symbol] = state
+        return values
+
+    def checkpoint(self) -> Dict:
+        return {symbol: state.checkpoint() for symbol, state in self.states.items()}
+
+    def restore(self, checkpoint: Dict):
+        self.states = {symbol: StreamingIndicators.from_checkpoint(state)
+                       for symbol, state in checkpoint.items()}
+        return self
+
+
+def verify_against_talib(ohlcv_data: 'pd.DataFrame', rtol=1e-6, atol=1e-8) -> Dict[str, float]:
+    """逐根K线对比增量引擎与talib全量计算的结果
+
+    返回每个指标的最大绝对误差; 任一指标超出容差时抛出AssertionError。
+    """
+    import talib
+
+    close = ohlcv_data['close'].values.astype(float)
+    high = ohlcv_data['high'].values.astype(float)
+    low = ohlcv_data['low'].values.astype(float)
+    volume = ohlcv_data['volume'].values.astype(float)
+
+    macd, macd_signal, _ = talib.MACD(close)
+    expected = {
+        'sma_20': talib.SMA(close, timeperiod=SMA_FAST),
+        'sma_50': talib.SMA(close, timeperiod=SMA_SLOW),
+        'ema_12': talib.EMA(close, timeperiod=EMA_PERIOD),
+        'rsi': talib.RSI(close, timeperiod=RSI_PERIOD),
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'atr': talib.ATR(high, low, close, timeperiod=ATR_PERIOD),
+        'volatility': talib.STDDEV(close, timeperiod=STDDEV_PERIOD),
+        'obv': talib.OBV(close, volume)
+    }
+
+    state = StreamingIndicators()
+    actual = {key: np.empty(len(close)) for key in INDICATOR_KEYS}
+    for i in range(len(close)):
+        values = state.update(high[i], low[i], close[i], volume[i])
+        for key in INDICATOR_KEYS:
+            actual[key][i] = values[key]
+
+    errors = {}
+    for key in INDICATOR_KEYS:
+        np.testing.assert_allclose(actual[key], expected[key], rtol=rtol, atol=atol,
+                                   equal_nan=True, err_msg=key)
+        diff = np.abs(actual[key] - expected[key])
+        errors[key] = float(np.nanmax(diff)) if np.any(~np.isnan(diff)) else 0.0
+    return errors
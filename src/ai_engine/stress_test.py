@@ -0,0 +1,299 @@
+import numpy as np
+import pandas as pd
+import logging
+from joblib import Parallel, delayed
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+from scipy.special import gammaln
+from sklearn.model_selection import ParameterGrid
+from typing import Dict, List, Optional
+
+from .risk_manager import RiskManager
+
+# GARCH likelihoods are fitted on percent returns for numerical stability
+_GARCH_SCALE = 100.0
+
+
+def returns_from_store(store, symbol, start=None, end=None) -> np.ndarray:
+    """Simple close-to-close returns from candles in a MarketDataStore"""
+    close = store.read_candles(symbol, start, end, columns=['timestamp', 'close'], as_numpy=True)['close']
+    close = close[np.isfinite(close)]
+    return close[1:] / close[:-1] - 1
+
+
+def bootstrap_returns(history, n_paths, horizon, block_size=1, rng=None) -> np.ndarray:
+    """Block bootstrap of historical returns into an (n_paths, horizon) array
+
+    Contiguous blocks keep short-range autocorrelation and volatility
+    clustering; block_size=1 is the plain i.i.d. bootstrap.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    history = np.asarray(history, dtype=float)
+    block_size = max(1, min(block_size, len(history)))
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, len(history) - block_size + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :horizon]
+    return history[idx]
+
+
+def _garch_t_variance(eps, omega, alpha, beta, initial_variance):
+    """Conditional variances of a GARCH(1,1) as one linear filter over eps^2"""
+    drive = np.concatenate([[initial_variance], omega + alpha * eps[:-1] ** 2])
+    return lfilter([1.0], [1.0, -beta], drive)
+
+
+def _garch_t_nll(params, r):
+    mu, omega, alpha, beta, nu = params
+    if alpha + beta >= 0.9999:
+        return 1e10
+    eps = r - mu
+    variance = _garch_t_variance(eps, omega, alpha, beta, np.var(eps))
+    if np.any(variance <= 0):
+        return 1e10
+    ll = (gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(np.pi * (nu - 2))
+          - 0.5 * np.log(variance) - (nu + 1) / 2 * np.log1p(eps ** 2 / (variance * (nu - 2))))
+    return -np.sum(ll)
+
+
+def fit_garch_t(returns) -> Dict:
+    """Maximum-likelihood GARCH(1,1) with standardized Student-t innovations"""
+    r = np.asarray(returns, dtype=float) * _GARCH_SCALE
+    var = np.var(r)
+    x0 = [np.mean(r), var * 0.05, 0.05, 0.9, 8.0]
+    bounds = [(None, None), (1e-8, None), (0.0, 0.999), (0.0, 0.999), (2.1, 200.0)]
+    result = minimize(_garch_t_nll, x0, args=(r,), method='L-BFGS-B', bounds=bounds)
+    mu, omega, alpha, beta, nu = result.x
+    eps = r - mu
+    variance = _garch_t_variance(eps, omega, alpha, beta, np.var(eps))
+    return {
+        'mu': mu, 'omega': omega, 'alpha': alpha, 'beta': beta, 'nu': nu,
+        # one-step-ahead variance after the last observation, the simulation's starting point
+        'next_variance': omega + alpha * eps[-1] ** 2 + beta * variance[-1],
+        'converged': bool(result.success)
+    }
+
+
+def simulate_garch_t(params: Dict, n_paths, horizon, rng=None) -> np.ndarray:
+    """Simulate (n_paths, horizon) returns from fit_garch_t parameters, all paths stepped together"""
+    rng = rng if rng is not None else np.random.default_rng()
+    mu, omega, alpha, beta, nu = (params[k] for k in ('mu', 'omega', 'alpha', 'beta', 'nu'))
+    z = rng.standard_t(nu, size=(n_paths, horizon)) / np.sqrt(nu / (nu - 2))
+    variance = np.full(n_paths, params['next_variance'])
+    returns = np.empty((n_paths, horizon))
+    for t in range(horizon):
+        eps = np.sqrt(variance) * z[:, t]
+        returns[:, t] = mu + eps
+        variance = omega + alpha * eps ** 2 + beta * variance
+    return returns / _GARCH_SCALE
+
+
+def _ewma_volatility(returns, span, initial_variance):
+    """Per-path EWMA volatility known at the start of each period (no look-ahead)"""
+    lam = 1 - 2.0 / (span + 1)
+    squared = np.concatenate([np.full((len(returns), 1), initial_variance), returns[:, :-1] ** 2], axis=1)
+    variance = lfilter([1 - lam], [1.0, -lam], squared, axis=1,
+                       zi=np.full((len(returns), 1), lam * initial_variance))[0]
+    return np.sqrt(variance)
+
+
+def _simulate_chunk(spec: Dict, limits: Dict, seed, n_paths) -> Dict[str, np.ndarray]:
+    """Generate one chunk of paths and run the vectorized risk rules over them"""
+    rng = np.random.default_rng(seed)
+    horizon = spec['horizon']
+    if spec['model'] == 'garch':
+        returns = simulate_garch_t(spec['garch'], n_paths, horizon, rng)
+    else:
+        returns = bootstrap_returns(spec['history'], n_paths, horizon, spec['block_size'], rng)
+
+    # Trade direction: always long, or right with probability signal_accuracy
+    if spec['signal_accuracy'] is None:
+        direction = np.ones_like(returns)
+    else:
+        correct = rng.random(returns.shape) < spec['signal_accuracy']
+        direction = np.where(correct, 1.0, -1.0) * np.where(returns >= 0, 1.0, -1.0)
+
+    max_position_size = limits['max_position_size']
+    max_drawdown = limits['max_drawdown']
+    stop_loss = limits['stop_loss']
+
+    # RiskManager.calculate_position_size / calculate_stop_loss, with the
+    # stateful market and time-decay factors neutral as in the backtester
+    volatility = _ewma_volatility(returns, spec['vol_span'], spec['initial_variance'])
+    vol_factor = 1 / (1 + np.exp(volatility - 0.5))
+    risk_factor = np.exp(-2 * (1 - spec['risk_score']))
+    fraction = np.minimum(max_position_size * vol_factor * risk_factor, max_position_size)
+    stop_distance = stop_loss * np.clip(volatility / 0.02, 0.5, 2.0)
+    # validate_trade: loss at the stop must stay within max_drawdown
+    static_ok = fraction * stop_distance <= max_drawdown
+
+    trade_return = direction * returns
+    # Worst point inside the bar: minimum of a Brownian bridge from 0 to the
+    # close-to-close trade return with the period's volatility, so a bar that
+    # trades through the stop and closes back above it is still stopped out
+    intrabar_vol = spec['intrabar_vol_scale'] * volatility
+    log_u = np.log(rng.random(returns.shape))
+    excursion = 0.5 * (trade_return - np.sqrt(trade_return ** 2 - 2 * intrabar_vol ** 2 * log_u))
+    stopped = excursion < -stop_distance
+    # Gaps beyond the stop fill at the close, otherwise at the stop, both less slippage
+    trade_return = np.where(stopped, np.minimum(trade_return, -stop_distance) - spec['stop_slippage'], trade_return)
+
+    equity = np.ones(n_paths)
+    peak = np.ones(n_paths)
+    worst = np.zeros(n_paths)
+    ruined = np.zeros(n_paths, dtype=bool)
+    recent = np.zeros((5, n_paths))  # last five drawdowns, for validate_trade's recent check
+    n_recent = 0
+    taken = np.zeros(n_paths)
+    stops = np.zeros(n_paths)
+    for t in range(horizon):
+        ok = static_ok[:, t] & ~ruined
+        if n_recent:
+            ok &= recent[:min(n_recent, 5)].mean(axis=0) <= max_drawdown * 0.8
+        f = np.where(ok, fraction[:, t], 0.0)
+        equity = equity * (1 + f * (trade_return[:, t] - 2 * spec['fee_rate']))
+        peak = np.maximum(peak, equity)
+        drawdown = (peak - equity) / peak
+        worst = np.maximum(worst, drawdown)
+        ruined |= equity <= spec['ruin_level']
+        recent[t % 5] = drawdown
+        n_recent += 1
+        taken += ok
+        stops += ok & stopped[:, t]
+
+    return {'max_drawdown': worst, 'terminal': equity, 'ruined': ruined, 'taken': taken, 'stops': stops}
+
+
+class MonteCarloStressTester:
+    """Monte Carlo stress test and risk-of-ruin estimate for RiskManager limits
+
+    Thousands of return paths are drawn at once, either block-bootstrapped
+    from stored history or simulated from a fitted GARCH(1,1)/Student-t
+    model, and the RiskManager sizing, stop-loss and validate_trade rules
+    are applied to every path as array operations. Paths are split into
+    chunks that run in a process pool; every limit setting in a sweep sees
+    the same paths (common random numbers), so differences between settings
+    are not sampling noise.
+    """
+
+    def __init__(self, returns, model='bootstrap', n_paths=10000, horizon=252, block_size=5,
+                 ruin_level=0.5, risk_score=0.8, signal_accuracy=None, fee_rate=0.0004,
+                 stop_slippage=0.0005, intrabar_vol_scale=1.0, vol_span=20, n_jobs=-1, chunk_size=2000,
+                 random_state=None):
+        if model not in ('bootstrap', 'garch'):
+            raise ValueError(f"Unknown return model: {model}")
+        returns = np.asarray(returns, dtype=float)
+        self.returns = returns[np.isfinite(returns)]
+        self.model = model
+        self.n_paths = n_paths
+        self.horizon = horizon
+        self.block_size = block_size
+        self.ruin_level = ruin_level
+        self.risk_score = risk_score
+        self.signal_accuracy = signal_accuracy
+        self.fee_rate = fee_rate
+        self.stop_slippage = stop_slippage
+        self.intrabar_vol_scale = intrabar_vol_scale
+        self.vol_span = vol_span
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+        self.garch_params = fit_garch_t(self.returns) if model == 'garch' else None
+        self.logger = logging.getLogger(__name__)
+
+    def _spec(self) -> Dict:
+        return {
+            'model': self.model,
+            'history': self.returns,
+            'garch': self.garch_params,
+            'horizon': self.horizon,
+            'block_size': self.block_size,
+            'ruin_level': self.ruin_level,
+            'risk_score': self.risk_score,
+            'signal_accuracy': self.signal_accuracy,
+            'fee_rate': self.fee_rate,
+            'stop_slippage': self.stop_slippage,
+            'intrabar_vol_scale': self.intrabar_vol_scale,
+            'vol_span': self.vol_span,
+            'initial_variance': float(np.var(self.returns))
+        }
+
+    def _chunks(self):
+        sizes = [self.chunk_size] * (self.n_paths // self.chunk_size)
+        if self.n_paths % self.chunk_size:
+            sizes.append(self.n_paths % self.chunk_size)
+        seeds = np.random.SeedSequence(self.random_state).spawn(len(sizes))
+        return list(zip(seeds, sizes))
+
+    @staticmethod
+    def _limits(risk_manager: Optional[RiskManager], overrides: Dict) -> Dict:
+        risk_manager = risk_manager or RiskManager()
+        limits = {
+            'max_position_size': risk_manager.max_position_size,
+            'max_drawdown': risk_manager.max_drawdown,
+            'stop_loss': risk_manager.stop_loss
+        }
+        limits.update(overrides)
+        return limits
+
+    def _summarize(self, limits: Dict, parts: List[Dict]) -> Dict:
+        result = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        max_drawdown = result['max_drawdown']
+        terminal = result['terminal'] - 1
+        return {
+            'limits': limits,
+            'n_paths': len(max_drawdown),
+            'horizon': self.horizon,
+            'probability_of_ruin': float(result['ruined'].mean()),
+            'probability_drawdown_breach': float((max_drawdown > limits['max_drawdown']).mean()),
+            'max_drawdown': {
+                'mean': float(max_drawdown.mean()),
+                'median': float(np.median(max_drawdown)),
+                'p95': float(np.quantile(max_drawdown, 0.95)),
+                'p99': float(np.quantile(max_drawdown, 0.99)),
+                'worst': float(max_drawdown.max())
+            },
+            'terminal_return': {
+                'mean': float(terminal.mean()),
+                'median': float(np.median(terminal)),
+                'p05': float(np.quantile(terminal, 0.05)),
+                'p01': float(np.quantile(terminal, 0.01))
+            },
+            'trade_rate': float(result['taken'].sum() / (len(max_drawdown) * self.horizon)),
+            'stop_rate': float(result['stops'].sum() / max(result['taken'].sum(), 1)),
+            'max_drawdowns': max_drawdown
+        }
+
+    def run(self, risk_manager: Optional[RiskManager] = None, **limits) -> Dict:
+        """Simulate one limit setting; keyword arguments override the RiskManager's limits"""
+        return self.sweep([self._limits(risk_manager, limits)])[0]
+
+    def sweep(self, settings) -> List[Dict]:
+        """Simulate several limit settings on the same paths
+
+        ``settings`` is a list of limit dicts or a ParameterGrid-style dict
+        of lists over max_position_size, max_drawdown and stop_loss.
+        """
+        if isinstance(settings, dict):
+            settings = list(ParameterGrid(settings))
+        settings = [self._limits(None, limits) for limits in settings]
+        spec = self._spec()
+        chunks = self._chunks()
+        parts = Parallel(n_jobs=self.n_jobs, backend='loky')(
+            delayed(_simulate_chunk)(spec, limits, seed, n)
+            for limits in settings for seed, n in chunks
+        )
+        return [self._summarize(limits, parts[i * len(chunks):(i + 1) * len(chunks)])
+                for i, limits in enumerate(settings)]
+
+    def sweep_frame(self, settings) -> pd.DataFrame:
+        """sweep() flattened into one row per setting, for comparing limits side by side"""
+        rows = []
+        for report in self.sweep(settings):
+            row = dict(report['limits'])
+            row['probability_of_ruin'] = report['probability_of_ruin']
+            row['probability_drawdown_breach'] = report['probability_drawdown_breach']
+            row.update({f"max_drawdown_{k}": v for k, v in report['max_drawdown'].items()})
+            row.update({f"terminal_return_{k}": v for k, v in report['terminal_return'].items()})
+            row['trade_rate'] = report['trade_rate']
+            rows.append(row)
+        return pd.DataFrame(rows)
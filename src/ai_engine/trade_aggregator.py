@@ -0,0 +1,219 @@
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+DAY_MS = 86400000
+
+
+class RollingTimeVWAP:
+    """最近window_ms毫秒内的VWAP, 摊还O(1)"""
+
+    def __init__(self, window_ms):
+        self.window_ms = window_ms
+        self._trades = deque()
+        self.notional = 0.0
+        self.volume = 0.0
+
+    def update(self, timestamp, price, amount):
+        self._trades.append((timestamp, price * amount, amount))
+        self.notional += price * amount
+        self.volume += amount
+        cutoff = timestamp - self.window_ms
+        while self._trades and self._trades[0][0] <= cutoff:
+            _, notional, volume = self._trades.popleft()
+            self.notional -= notional
+            self.volume -= volume
+
+    @property
+    def value(self):
+        return self.notional / self.volume if self.volume > 0 else None
+
+
+class RollingVolumeVWAP:
+    """最近window_volume成交量内的VWAP; 最早的一笔成交可按比例部分计入"""
+
+    def __init__(self, window_volume):
+        self.window_volume = window_volume
+        self._trades = deque()
+        self.notional = 0.0
+        self.volume = 0.0
+
+    def update(self, timestamp, price, amount):
+        self._trades.append([price, amount])
+        self.notional += price * amount
+        self.volume += amount
+        while self.volume > self.window_volume:
+            oldest = self._trades[0]
+            excess = self.volume - self.window_volume
+            if oldest[1] <= excess:
+                self._trades.popleft()
+                self.notional -= oldest[0] * oldest[1]
+                self.volume -= oldest[1]
+            else:
+                oldest[1] -= excess
+                self.notional -= oldest[0] * excess
+                self.volume -= excess
+
+    @property
+    def value(self):
+        return self.notional / self.volume if self.volume > 0 else None
+
+
+class BarBuilder:
+    """从逐笔成交直接生成K线: 时间(time)、笔数(tick)、成交量(volume)、成交额(dollar)"""
+
+    KINDS = ('time', 'tick', 'volume', 'dollar')
+
+    def __init__(self, kind, threshold):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown bar type: {kind}")
+        self.kind = kind
+        self.threshold = threshold
+        self._bar = None
+
+    def _new_bar(self, timestamp, price):
+        start = timestamp - timestamp % self.threshold if self.kind == 'time' else timestamp
+        return {'start': start, 'end': timestamp, 'open': price, 'high': price, 'low': price,
+                'close': price, 'volume': 0.0, 'notional': 0.0, 'trades': 0}
+
+    @staticmethod
+    def _finish(bar):
+        bar['vwap'] = bar['notional'] / bar['volume'] if bar['volume'] > 0 else bar['close']
+        return bar
+
+    def update(self, timestamp, price, amount) -> Optional[Dict]:
+        """加入一笔成交, 有K线完成时返回该K线"""
+        completed = None
+        bar = self._bar
+        if bar is not None and self.kind == 'time' and timestamp >= bar['start'] + self.threshold:
+            completed = self._finish(bar)
+            bar = None
+        if bar is None:
+            bar = self._bar = self._new_bar(timestamp, price)
+
+        bar['end'] = timestamp
+        if price > bar['high']:
+            bar['high'] = price
+        if price < bar['low']:
+            bar['low'] = price
+        bar['close'] = price
+        bar['volume'] += amount
+        bar['notional'] += price * amount
+        bar['trades'] += 1
+
+        if self.kind == 'tick':
+            done = bar['trades'] >= self.threshold
+        elif self.kind == 'volume':
+            done = bar['volume'] >= self.threshold
+        elif self.kind == 'dollar':
+            done = bar['notional'] >= self.threshold
+        else:
+            done = False
+        if done:
+            self._bar = None
+            return self._finish(bar)
+        return completed
+
+    @property
+    def current(self) -> Optional[Dict]:
+        """尚未完成的K线"""
+        return self._bar
+
+
+class TradeAggregator:
+    """单个交易对的流式成交聚合: 每笔成交O(1)更新各类VWAP和成交K线, 热路径不使用pandas"""
+
+    def __init__(self, session_ms=DAY_MS, time_windows=(60000, 300000), volume_windows=(),
+                 bars=(('time', 60000),)):
+        self.session_ms = session_ms
+        self.session_start = None
+        self.session_notional = 0.0
+        self.session_volume = 0.0
+        self.time_vwaps = {window: RollingTimeVWAP(window) for window in time_windows}
+        self.volume_vwaps = {window: RollingVolumeVWAP(window) for window in volume_windows}
+        self.bar_builders = {(kind, threshold): BarBuilder(kind, threshold) for kind, threshold in bars}
+        self.completed_bars = {key: deque(maxlen=1000) for key in self.bar_builders}
+        self.last_timestamp = None
+        self.last_price = None
+
+    def update(self, timestamp, price, amount) -> List:
+        """加入一笔成交, 返回本次完成的K线列表 [(bar类型, 阈值), bar]"""
+        timestamp, price, amount = int(timestamp), float(price), float(amount)
+
+        # 按会话锚定的VWAP, 跨会话时重置
+        session_start = timestamp - timestamp % self.session_ms
+        if session_start != self.session_start:
+            self.session_start = session_start
+            self.session_notional = 0.0
+            self.session_volume = 0.0
+        self.session_notional += price * amount
+        self.session_volume += amount
+
+        for vwap in self.time_vwaps.values():
+            vwap.update(timestamp, price, amount)
+        for vwap in self.volume_vwaps.values():
+            vwap.update(timestamp, price, amount)
+
+        completed = []
+        for key, builder in self.bar_builders.items():
+            bar = builder.update(timestamp, price, amount)
+            if bar is not None:
+                self.completed_bars[key].append(bar)
+                completed.append((key, bar))
+
+        self.last_timestamp = timestamp
+        self.last_price = price
+        return completed
+
+    @property
+    def session_vwap(self):
+        return self.session_notional / self.session_volume if self.session_volume > 0 else None
+
+    def snapshot(self) -> Dict:
+        return {
+            'session_vwap': self.session_vwap,
+            'time_vwap': {window: vwap.value for window, vwap in self.time_vwaps.items()},
+            'volume_vwap': {window: vwap.value for window, vwap in self.volume_vwaps.items()},
+            'last_price': self.last_price,
+            'timestamp': self.last_timestamp
+        }
+
+
+class StreamingTradeAggregator:
+    """按交易对管理TradeAggregator"""
+
+    def __init__(self, **aggregator_kwargs):
+        self.aggregator_kwargs = aggregator_kwargs
+        self.aggregators: Dict[str, TradeAggregator] = {}
+        self._last_seen: Dict[str, tuple] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, symbol) -> TradeAggregator:
+        if symbol not in self.aggregators:
+            self.aggregators[symbol] = TradeAggregator(**self.aggregator_kwargs)
+        return self.aggregators[symbol]
+
+    def on_trade(self, symbol, timestamp, price, amount) -> List:
+        """WebSocket等逐笔推送的入口"""
+        return self.get(symbol).update(timestamp, price, amount)
+
+    def on_trades(self, symbol, trades) -> List:
+        """批量入口, 接受ccxt fetch_trades返回的列表; 已处理过的成交会被跳过"""
+        try:
+            aggregator = self.get(symbol)
+            # 最后处理的时间戳以及该时间戳上已处理的成交ID
+            last_ts, seen_ids = self._last_seen.get(symbol, (-1, set()))
+            completed = []
+            for trade in trades:
+                timestamp, trade_id = trade['timestamp'], trade.get('id')
+                if timestamp < last_ts or (timestamp == last_ts and trade_id in seen_ids):
+                    continue
+                completed.extend(aggregator.update(timestamp, trade['price'], trade['amount']))
+                if timestamp > last_ts:
+                    last_ts, seen_ids = timestamp, set()
+                seen_ids.add(trade_id)
+            self._last_seen[symbol] = (last_ts, seen_ids)
+            return completed
+        except Exception as e:
+            self.logger.error(f"Error aggregating trades for {symbol}: {str(e)}")
+            return []
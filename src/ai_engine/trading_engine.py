@@ -1,28 +1,40 @@
-import ccxt
-import numpy as np
 from datetime import datetime
 import logging
 from .ml_models import MLPredictor
 from .risk_manager import RiskManager
 from .market_data import MarketDataCollector
+from .signal_generator import SignalGenerator
+from .staged_pipeline import StagedPipeline, StageHalt
 
 class TradingEngine:
     def __init__(self, api_key=None, api_secret=None):
         # Initialize market data collector
         self.market_data = MarketDataCollector(api_key=api_key, api_secret=api_secret)
-        
-        # Initialize ML predictor and risk manager
+
+        # Initialize ML predictor and risk manager; the signal generator shares
+        # the predictor so both paths use the same model and indicators
         self.ml_predictor = MLPredictor()
         self.risk_manager = RiskManager()
-        
+        self.signal_generator = SignalGenerator(self.ml_predictor)
+
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
-        
+
         # Trading state
         self.active_positions = {}
         self.pending_orders = {}
-    
+
+        # Signal path: fetch -> indicators -> features -> predict -> size -> validate
+        self.pipeline = StagedPipeline([
+            ('fetch', self._stage_fetch),
+            ('indicators', self._stage_indicators),
+            ('features', self._stage_features),
+            ('predict', self._stage_predict),
+            ('size', self._stage_size),
+            ('validate', self._stage_validate)
+        ])
+
     def fetch_market_data(self, symbol, timeframe='1m', limit=100):
         """Fetch comprehensive market data"""
         try:
@@ -30,17 +42,18 @@ class TradingEngine:
             ohlcv_data = self.market_data.fetch_historical_data(symbol, timeframe, limit)
             if ohlcv_data is None:
                 return None
-                
+
             # Fetch orderbook
             orderbook = self.market_data.fetch_orderbook(symbol)
-            
+
             # Fetch recent trades
             trades = self.market_data.fetch_recent_trades(symbol)
-            
+
             # Calculate VWAP
             vwap = self.market_data.calculate_vwap(trades)
-            
+
             return {
+                'symbol': symbol,
                 'ohlcv': ohlcv_data,
                 'orderbook': orderbook,
                 'vwap': vwap,
@@ -49,335 +62,220 @@ class TradingEngine:
         except Exception as e:
             self.logger.error(f"Error fetching market data: {str(e)}")
             return None
-    
-    def generate_trading_signal(self, market_data, portfolio_value):
-        """Generate comprehensive trading signal"""
-        try:
-            if market_data is None:
-                return None
-            
-            # Calculate technical indicators
-            indicators = self.calculate_technical_indicators(market_data['ohlcv'])
-            if not indicators:
-                return None
-            
-            # Add market microstructure features
-            if market_data['orderbook']:
-                trade_size = portfolio_value * 0.01  # 1% of portfolio for impact calculation
-                impact = self.market_data.calculate_market_impact(market_data['orderbook'], trade_size)
-                indicators.update({
-                    'buy_impact': impact['buy_impact'] if impact else None,
-                    'sell_impact': impact['sell_impact'] if impact else None,
-                    'vwap': market_data['vwap']
-                })
-            
-            # Prepare features for ML model
-            features = self.ml_predictor.prepare_features(indicators)
-            
-            # Get prediction and confidence
-            signal, confidence = self.ml_predictor.predict(features)
-            
-            # Calculate position size based on risk management
-            position_size = self.risk_manager.calculate_position_size(
-                portfolio_value,
-                indicators['volatility'],
-                confidence
-            )
-            
-            # Calculate stop loss and take profit levels
-            current_price = market_data['ohlcv']['close'].iloc[-1]
-            stop_loss = self.risk_manager.calculate_stop_loss(
-                current_price,
-                'long' if signal > 0 else 'short'
-            )
-            
-            return {
-                'signal': signal,  # 1 for long, -1 for short, 0 for neutral
-                'confidence': confidence,
-                'position_size': position_size,
-                'stop_loss': stop_loss,
-                'indicators': indicators,
-                'timestamp': market_data['timestamp']
-            }
-        except Exception as e:
-            self.logger.error(f"Error generating trading signal: {str(e)}")
+
+    def calculate_technical_indicators(self, ohlcv_data):
+        """Calculate technical indicators (shared with SignalGenerator)"""
+        return self.signal_generator.calculate_technical_indicators(ohlcv_data)
+
+    def _stage_fetch(self, context):
+        if context.get('market_data') is None:
+            if context.get('symbol') is None:
+                raise StageHalt("No market data or symbol given")
+            context['market_data'] = self.fetch_market_data(context['symbol'])
+        if context['market_data'] is None:
+            raise StageHalt("Market data unavailable")
+        if context.get('symbol') is None:
+            context['symbol'] = context['market_data'].get('symbol')
+
+    def _stage_indicators(self, context):
+        market_data = context['market_data']
+        indicators = market_data.get('indicators') or self.calculate_technical_indicators(market_data['ohlcv'])
+        if not indicators:
+            raise StageHalt("Indicators unavailable")
+        indicators = dict(indicators)
+
+        # Add market microstructure features
+        if market_data.get('orderbook') is not None:
+            # Impact of trading 1% of the portfolio, converted to base currency
+            trade_size = context['portfolio_value'] * 0.01 / indicators['close']
+            impact = self.market_data.calculate_market_impact(market_data['orderbook'], trade_size)
+            indicators.update({
+                'buy_impact': impact['buy_impact'] if impact else None,
+                'sell_impact': impact['sell_impact'] if impact else None,
+                'vwap': market_data.get('vwap')
+            })
+        # Kept in the pipeline context only; the caller's market data is never mutated
+        context['indicators'] = indicators
+
+    def _stage_features(self, context):
+        context['features'] = self.ml_predictor.prepare_features(context['indicators'])
+        if context['features'] is None:
+            raise StageHalt("Feature preparation failed")
+
+    def _stage_predict(self, context):
+        indicators = context['indicators']
+        ml_signal, confidence = self.ml_predictor.predict(context['features'])
+        if ml_signal is None:
+            raise StageHalt("Prediction failed")
+        ta_signal = self.signal_generator._calculate_ta_signal(indicators)
+        signal = self.signal_generator._combine_signals(int(ml_signal), ta_signal, confidence)
+        context.update({
+            'signal': signal,
+            'ml_signal': int(ml_signal),
+            'ta_signal': ta_signal,
+            'confidence': float(confidence)
+        })
+        if signal == 0:
+            raise StageHalt("Neutral signal")
+
+    def _stage_size(self, context):
+        indicators = context['indicators']
+        portfolio_value = context['portfolio_value']
+        context['position_size'] = float(self.risk_manager.calculate_position_size(
+            portfolio_value,
+            indicators['volatility'],
+            context['confidence'],
+            symbol=context.get('symbol')
+        ))
+        if context['position_size'] <= 0:
+            raise StageHalt("Zero position size")
+
+        # Calculate stop loss level
+        context['entry_price'] = float(indicators['close'])
+        context['stop_loss'] = self.risk_manager.calculate_stop_loss(
+            context['entry_price'],
+            'long' if context['signal'] > 0 else 'short'
+        )
+
+    def _stage_validate(self, context):
+        is_valid, reason = self.risk_manager.validate_trade(
+            context['portfolio_value'],
+            context['position_size'],
+            context['stop_loss'],
+            context['entry_price'],
+            symbol=context.get('symbol')
+        )
+        if not is_valid:
+            self.logger.warning(f"Trade validation failed: {reason}")
+            raise StageHalt(reason)
+
+    def run_pipeline(self, symbol=None, market_data=None, portfolio_value=None):
+        """Run the staged signal pipeline and return its full context
+
+        The context holds every intermediate result, per-stage timings and,
+        when the run stopped early, the stage and reason it stopped at.
+        """
+        if portfolio_value is None:
+            portfolio_value = self.get_portfolio_value()
+        context = {'symbol': symbol, 'market_data': market_data, 'portfolio_value': portfolio_value}
+        if not portfolio_value or portfolio_value <= 0:
+            context['halted_at'] = 'start'
+            context['reason'] = "Portfolio value unavailable"
+            return context
+        return self.pipeline.run(context)
+
+    def generate_trading_signal(self, market_data=None, portfolio_value=None, symbol=None):
+        """Generate a sized and validated trading signal
+
+        Args:
+            market_data (dict): Output of fetch_market_data; fetched for
+                ``symbol`` when omitted
+            portfolio_value (float): Defaults to get_portfolio_value()
+            symbol (str): Symbol to fetch when no market data is given
+
+        Returns:
+            dict: Trading signal, or None for neutral or rejected signals
+        """
+        context = self.run_pipeline(symbol, market_data, portfolio_value)
+        if context.get('halted_at') is not None:
             return None
-    
+        return {
+            'symbol': context.get('symbol'),
+            'signal': context['signal'],  # 1 for long, -1 for short
+            'confidence': context['confidence'],
+            'ml_signal': context['ml_signal'],
+            'ta_signal': context['ta_signal'],
+            'position_size': context['position_size'],
+            'entry_price': context['entry_price'],
+            'stop_loss': context['stop_loss'],
+            'indicators': context['indicators'],
+            'timestamp': context['market_data']['timestamp'],
+            'timings': context['timings'],
+            'validated': True
+        }
+
     def execute_trade(self, symbol, signal):
         """Execute trade based on signal"""
         try:
             if not signal or signal['signal'] == 0:
                 return False
-                
-            # Validate trade with risk manager
-            trade_valid, reason = self.risk_manager.validate_trade(
-                portfolio_value=self.get_portfolio_value(),
-                position_size=signal['position_size'],
-                stop_loss_price=signal['stop_loss'],
-                entry_price=signal['indicators']['close'][-1]
-            )
-            
-            if not trade_valid:
-                self.logger.warning(f"Trade validation failed: {reason}")
+
+            # Signals from generate_trading_signal are already validated
+            if not signal.get('validated') and not self.validate_signal(signal):
                 return False
-            
+
             # Place order logic here
             order_type = 'market'
             side = 'buy' if signal['signal'] > 0 else 'sell'
-            
+
             self.logger.info(f"Executing {side} order for {symbol} with size {signal['position_size']}")
-            
+
             # Update position tracking
             self.active_positions[symbol] = {
                 'side': side,
                 'size': signal['position_size'],
-                'entry_price': signal['indicators']['close'][-1],
+                'entry_price': signal['entry_price'],
                 'stop_loss': signal['stop_loss'],
                 'timestamp': signal['timestamp']
             }
-            
+
             return True
         except Exception as e:
             self.logger.error(f"Error executing trade: {str(e)}")
             return False
-    
-    def get_portfolio_value(self):
-        """Get current portfolio value"""
-        # Implement portfolio value calculation
-        return 10000  # Placeholder value
 
-    def calculate_technical_indicators(self, market_data):
-        """Calculate technical indicators for trading decisions"""
-        if not market_data:
-            return None
-            
-        close_prices = market_data['close']
-        high_prices = market_data['high']
-        low_prices = market_data['low']
-        
-        # Calculate SMA
-        sma_20 = np.mean(close_prices[-20:]) if len(close_prices) >= 20 else None
-        sma_50 = np.mean(close_prices[-50:]) if len(close_prices) >= 50 else None
-        
-        # Calculate RSI
-        delta = np.diff(close_prices)
-        gain = (delta > 0) * delta
-        loss = (delta < 0) * -delta
-        avg_gain = np.mean(gain[-14:]) if len(gain) >= 14 else None
-        avg_loss = np.mean(loss[-14:]) if len(loss) >= 14 else None
-        
-        if avg_gain is not None and avg_loss is not None and avg_loss != 0:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        else:
-            rsi = None
-        
-        # Calculate volatility
-        volatility = np.std(np.diff(np.log(close_prices[-20:]))) if len(close_prices) >= 20 else None
-        
-        return {
-            'sma_20': sma_20,
-            'sma_50': sma_50,
-            'rsi': rsi,
-            'volatility': volatility
-        }
-    
-    def generate_trading_signal(self, market_data):
-        """Generate trading signal based on market data and ML predictions"""
-        try:
-            # Calculate technical indicators
-            indicators = self.calculate_technical_indicators(market_data)
-            if not indicators:
-                return None
-            
-            # Prepare features for ML model
-            features = self.ml_predictor.prepare_features(indicators)
-            
-            # Get prediction and confidence
-            signal, confidence = self.ml_predictor.predict(features)
-            
-            # Calculate position size based on risk management
-            position_size = self.risk_manager.calculate_position_size(
-                portfolio_value=100000,  # Default portfolio value
-                volatility=indicators['volatility'],
-                risk_score=confidence
-            )
-            
-            # Generate final trading signal
-            if signal != 0 and position_size > 0:
-                stop_loss = self.risk_manager.calculate_stop_loss(
-                    entry_price=market_data['close'][-1],
-                    position_type='long' if signal > 0 else 'short'
-                )
-                
-                return {
-                    'symbol': market_data.get('symbol'),
-                    'signal': signal,  # 1 for long, -1 for short, 0 for neutral
-                    'confidence': confidence,
-                    'position_size': position_size,
-                    'stop_loss': stop_loss,
-                    'indicators': indicators,
-                    'timestamp': datetime.now().timestamp()
-                }
-            
-            return None
-        except Exception as e:
-            self.logger.error(f"Error generating trading signal: {str(e)}")
-            return None
-    
     def validate_signal(self, signal_data):
         """Validate trading signal with risk management rules"""
         if not signal_data:
             return False
-            
+
         try:
             # Validate trade with risk manager
             is_valid, reason = self.risk_manager.validate_trade(
-                portfolio_value=100000,  # Default portfolio value
+                portfolio_value=self.get_portfolio_value(),
                 position_size=signal_data['position_size'],
                 stop_loss_price=signal_data['stop_loss'],
-                entry_price=signal_data['indicators']['close'][-1]
+                entry_price=signal_data['entry_price'],
+                symbol=signal_data.get('symbol')
             )
-            
+
             if not is_valid:
                 self.logger.warning(f"Trade validation failed: {reason}")
                 return False
-            
+
             return True
         except Exception as e:
             self.logger.error(f"Error validating signal: {str(e)}")
             return False
-    
-    def update_market_state(self, market_data):
+
+    def update_market_state(self, market_data, symbol=None):
         """Update internal market state with new data"""
         try:
+            symbol = symbol or market_data.get('symbol')
+
             # Update risk manager with new market data
-            self.risk_manager.update_market_state(market_data)
-            
+            if 'ohlcv' in market_data:
+                self.risk_manager.update_market_state({'close': market_data['ohlcv']['close'].values}, symbol=symbol)
+            else:
+                self.risk_manager.update_market_state(market_data, symbol=symbol)
+
             # Update ML model features
-            self.ml_predictor.update_features(market_data)
-            
+            self.ml_predictor.update_features(market_data, symbol=symbol)
+
             return True
         except Exception as e:
             self.logger.error(f"Error updating market state: {str(e)}")
             return False
-            
-            return {
-                'sma_20': sma_20,
-                'sma_50': sma_50,
-                'rsi': rsi
-            }
-        return None
-        
-    def generate_trading_signal(self, market_data):
-        """Generate trading signals based on market data and technical analysis
-        
-        Args:
-            market_data (dict): Processed market data
-            
-        Returns:
-            dict: Trading signal with direction and confidence
-        """
-        if not market_data:
-            return None
-            
-        # Calculate technical indicators
-        indicators = self.calculate_technical_indicators(market_data)
-        if not indicators:
-            return None
-            
-        # Get ML prediction
-        features = self.ml_predictor.prepare_features(indicators)
-        prediction = self.ml_predictor.predict(features)
-        
-        # Calculate volatility
-        close_prices = market_data['close']
-        returns = np.diff(close_prices) / close_prices[:-1]
-        volatility = np.std(returns)
-        
-        # Generate signal
-        signal = {
-            'timestamp': datetime.now().timestamp(),
-            'symbol': market_data.get('symbol'),
-            'direction': 'buy' if prediction == 1 else 'sell' if prediction == -1 else None,
-            'confidence': abs(prediction),
-            'volatility': volatility,
-            'indicators': indicators
-        }
-        
-        # Validate signal with risk management
-        if signal['direction']:
-            portfolio_value = self.get_portfolio_value()
-            position_size = self.risk_manager.calculate_position_size(
-                portfolio_value,
-                volatility,
-                signal['confidence']
-            )
-            
-            current_price = close_prices[-1]
-            stop_loss = self.risk_manager.calculate_stop_loss(
-                current_price,
-                'long' if signal['direction'] == 'buy' else 'short'
-            )
-            
-            is_valid, reason = self.risk_manager.validate_trade(
-                portfolio_value,
-                position_size,
-                stop_loss,
-                current_price
-            )
-            
-            if not is_valid:
-                self.logger.warning(f"Trade validation failed: {reason}")
-                return None
-                
-            signal['position_size'] = position_size
-            signal['stop_loss'] = stop_loss
-        
-        return signal if signal['direction'] else None
 
     def get_portfolio_value(self):
         """Get current portfolio value
-        
+
         Returns:
             float: Total portfolio value in USDT
         """
         try:
-            balance = self.exchange.fetch_balance()
+            balance = self.market_data.exchange.fetch_balance()
             return float(balance['total']['USDT'])
         except Exception as e:
             self.logger.error(f"Error fetching portfolio value: {str(e)}")
             return 0.0
-        # Trading logic based on multiple indicators
-        close_prices = market_data['close']
-        current_price = close_prices[-1]
-        
-        # Trend following strategy
-        trend_signal = 'long' if indicators['sma_20'] > indicators['sma_50'] else 'short'
-        
-        # RSI strategy
-        rsi_signal = None
-        if indicators['rsi'] is not None:
-            if indicators['rsi'] < 30:
-                rsi_signal = 'long'  # Oversold
-            elif indicators['rsi'] > 70:
-                rsi_signal = 'short'  # Overbought
-        
-        # Combine signals
-        final_direction = trend_signal
-        if rsi_signal and rsi_signal != trend_signal:
-            # If RSI contradicts trend, reduce confidence
-            confidence = 0.5
-        else:
-            confidence = 0.8
-        
-        signal = {
-            'timestamp': datetime.now().timestamp(),
-            'direction': final_direction,
-            'confidence': confidence,
-            'price': current_price,
-            'indicators': indicators
-        }
-        
-        self.logger.info(f"Generated trading signal: {signal}")
-        return signal
\ No newline at end of file
@@ -0,0 +1,174 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import joblib
+import logging
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.preprocessing import StandardScaler
+
+DEFAULT_CANDIDATES = {
+    'rf': (
+        RandomForestClassifier(random_state=42),
+        {'n_estimators': [100, 200], 'max_depth': [5, 10, None], 'min_samples_leaf': [1, 5]}
+    ),
+    'gb': (
+        GradientBoostingClassifier(random_state=42),
+        {'n_estimators': [100, 200], 'learning_rate': [0.05, 0.1], 'max_depth': [3, 5]}
+    )
+}
+
+
+def walk_forward_splits(n_samples, n_splits=5, test_size=None, train_size=None, gap=0):
+    """Yield (train_idx, test_idx) for consecutive out-of-sample windows
+
+    The training window expands from the start of the series unless
+    ``train_size`` is given, in which case it rolls forward with a fixed
+    length. ``gap`` samples between train and test guard against label
+    leakage from overlapping horizons. The arguments are validated when
+    the function is called, not when the first split is drawn.
+    """
+    test_size = test_size or n_samples // (n_splits + 1)
+    if test_size < 1:
+        raise ValueError(f"{n_samples} samples are too few for {n_splits} walk-forward splits")
+    first_test = n_samples - n_splits * test_size
+    if first_test - gap <= 0:
+        raise ValueError("Not enough samples for the requested walk-forward splits")
+
+    def splits():
+        for i in range(n_splits):
+            test_start = first_test + i * test_size
+            train_end = test_start - gap
+            train_start = max(0, train_end - train_size) if train_size else 0
+            yield np.arange(train_start, train_end), np.arange(test_start, test_start + test_size)
+    return splits()
+
+
+def _evaluate_fold(estimator, params, X, y, train_idx, test_idx):
+    """Fit one candidate on one fold; runs inside a worker process"""
+    started = time.perf_counter()
+    scaler = StandardScaler().fit(X[train_idx])
+    model = clone(estimator).set_params(**params)
+    model.fit(scaler.transform(X[train_idx]), y[train_idx])
+    y_pred = model.predict(scaler.transform(X[test_idx]))
+    y_true = y[test_idx]
+    return {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision': precision_score(y_true, y_pred, average='weighted', zero_division=0),
+        'recall': recall_score(y_true, y_pred, average='weighted', zero_division=0),
+        'f1_score': f1_score(y_true, y_pred, average='weighted', zero_division=0),
+        'fit_seconds': time.perf_counter() - started
+    }
+
+
+class WalkForwardTrainer:
+    """Grid search over models and hyperparameters with walk-forward validation
+
+    Every (candidate, fold) pair is an independent task executed in a loky
+    process pool. The feature matrix and labels are dumped once to a
+    temporary file and reopened with ``mmap_mode='r'``, so workers share the
+    same pages instead of receiving pickled copies.
+    """
+
+    def __init__(self, candidates=None, n_splits=5, test_size=None, train_size=None, gap=0,
+                 scoring='f1_score', n_jobs=-1, temp_dir=None):
+        self.candidates = candidates or DEFAULT_CANDIDATES
+        self.n_splits = n_splits
+        self.test_size = test_size
+        self.train_size = train_size
+        self.gap = gap
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.temp_dir = temp_dir
+        self.results = []
+        self.logger = logging.getLogger(__name__)
+
+    def _candidate_list(self):
+        return [
+            (name, estimator, params)
+            for name, (estimator, grid) in self.candidates.items()
+            for params in ParameterGrid(grid)
+        ]
+
+    def _memmap(self, X, y, work_dir):
+        path = os.path.join(work_dir, 'training_data.joblib')
+        joblib.dump({'X': np.ascontiguousarray(X, dtype=float), 'y': np.asarray(y)}, path)
+        data = joblib.load(path, mmap_mode='r')
+        return data['X'], data['y']
+
+    def search(self, X, y):
+        """Evaluate every candidate on every fold and return results sorted best first"""
+        work_dir = tempfile.mkdtemp(prefix='walk_forward_', dir=self.temp_dir)
+        try:
+            X_shared, y_shared = self._memmap(X, y, work_dir)
+            folds = list(walk_forward_splits(len(y_shared), self.n_splits, self.test_size, self.train_size, self.gap))
+            candidates = self._candidate_list()
+            self.logger.info(f"Walk-forward search: {len(candidates)} candidates x {len(folds)} folds")
+
+            fold_scores = Parallel(n_jobs=self.n_jobs, backend='loky')(
+                delayed(_evaluate_fold)(estimator, params, X_shared, y_shared, train_idx, test_idx)
+                for _, estimator, params in candidates
+                for train_idx, test_idx in folds
+            )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        results = []
+        for i, (name, estimator, params) in enumerate(candidates):
+            scores = fold_scores[i * len(folds):(i + 1) * len(folds)]
+            summary = {
+                metric: float(np.mean([score[metric] for score in scores]))
+                for metric in scores[0]
+            }
+            summary[f'{self.scoring}_std'] = float(np.std([score[self.scoring] for score in scores]))
+            results.append({'name': name, 'estimator': estimator, 'params': params,
+                            'metrics': summary, 'folds': scores})
+
+        results.sort(key=lambda result: result['metrics'][self.scoring], reverse=True)
+        self.results = results
+        return results
+
+    def fit_best(self, X, y):
+        """Refit the best candidate on the most recent training window"""
+        if not self.results:
+            raise ValueError("search() must be run before fit_best()")
+        best = self.results[0]
+        X, y = np.asarray(X, dtype=float), np.asarray(y)
+        if self.train_size:
+            X, y = X[-self.train_size:], y[-self.train_size:]
+        scaler = StandardScaler().fit(X)
+        model = clone(best['estimator']).set_params(**best['params'])
+        model.fit(scaler.transform(X), y)
+        return model, scaler, best
+
+    def run(self, X, y, feature_names, registry=None, output_path=None, activate=True):
+        """Search, refit the winner and persist it
+
+        The model is registered as a new version when a ModelRegistry is
+        given; otherwise it is written with joblib to ``output_path``.
+        Invalid split settings raise ValueError instead of returning None.
+        """
+        walk_forward_splits(len(y), self.n_splits, self.test_size, self.train_size, self.gap)
+        try:
+            self.search(X, y)
+            model, scaler, best = self.fit_best(X, y)
+            self.logger.info(f"Best candidate {best['name']} {best['params']}: "
+                             f"{self.scoring}={best['metrics'][self.scoring]:.3f}")
+
+            metrics = dict(best['metrics'], model_name=best['name'], params=best['params'])
+            report = {'model': model, 'scaler': scaler, 'best': best, 'results': self.results}
+            if registry is not None:
+                report['version'] = registry.register(model, scaler, feature_names, metrics, activate=activate)
+            elif output_path is not None:
+                joblib.dump({'model': model, 'scaler': scaler, 'feature_names': list(feature_names),
+                             'metrics': metrics}, output_path)
+                report['path'] = output_path
+            return report
+        except Exception as e:
+            self.logger.error(f"Error running training pipeline: {str(e)}")
+            return None
@@ -1,14 +1,30 @@
 import os
-import torch
+import glob
+import random
+import shutil
 import logging
-from transformers import pipeline
-from TTS.api import TTS
+from .lazy import lazy_import, pipeline_handle, shared_model
+from .audio_cache import AudioCache, audio_digest
+
+torch = lazy_import('torch')
+
+VOICES_DIR = os.path.join(os.path.dirname(__file__), 'generated_voices')
+
+
+def _tts_handle(model_name):
+    """按模型名共享的TTS模型句柄"""
+    def factory():
+        from TTS.api import TTS
+        return TTS(model_name, gpu=torch.cuda.is_available())
+    return shared_model(f"tts:{model_name}", factory)
+
 
 class VoiceGenerator:
-    def __init__(self, config):
+    def __init__(self, config, cache_dir=None, cache_max_bytes=512 * 1024 * 1024):
         self.config = config
-        self.text_generator = pipeline('text-generation')
-        self.tts = TTS(config.voice.tts.model, gpu=torch.cuda.is_available())
+        # 模型句柄在进程内共享, 第一次使用时才加载
+        self._text_model = pipeline_handle('text-generation')
+        self._tts_model = _tts_handle(config.voice.tts.model)
         self.languages = {
             'en': 'English',
             'zh': 'Chinese',
@@ -21,6 +37,41 @@ class VoiceGenerator:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
+        # 按内容寻址的语音缓存, 相同的认罪语音只合成一次
+        if cache_dir is None:
+            cache_dir = os.path.join(VOICES_DIR, 'cache')
+            self._remove_legacy_voices(VOICES_DIR)
+        self.audio_cache = AudioCache(cache_dir, max_bytes=cache_max_bytes)
+    
+    def _remove_legacy_voices(self, directory):
+        """删除旧版本按hash(text)命名的语音文件
+
+        hash()每个进程随机, 这些文件永远不会再被命中, 也不受缓存大小限制。
+        """
+        removed = 0
+        for path in glob.glob(os.path.join(directory, 'confession_*.wav')):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            self.logger.info(f"Removed {removed} legacy voice files from {directory}")
+    
+    @property
+    def text_generator(self):
+        return self._text_model.get()
+    
+    @property
+    def tts(self):
+        return self._tts_model.get()
+    
+    def warmup(self):
+        """预先加载TTS和文本生成模型, 供服务启动时调用"""
+        self._tts_model.get()
+        self._text_model.get()
+        return self
+        
     def generate_confession_text(self, trade_data, language='en'):
         """根据交易数据生成认罪文本"""
         templates = {
@@ -47,7 +98,8 @@ class VoiceGenerator:
             ]
         }
         
-        template = torch.randint(0, len(templates[language]), (1,)).item()
+        # 只生成文本时不需要加载torch
+        template = random.randrange(len(templates[language]))
         text = templates[language][template].format(
             symbol=trade_data['symbol'],
             price=trade_data.get('price', '0'),
@@ -61,7 +113,7 @@ class VoiceGenerator:
             text: 要转换的文本
             language: 语言代码 ('en', 'zh', 'ja', 'ko', 'ru')
             speaker_name: 说话人名称
-            output_path: 输出文件路径
+            output_path: 输出文件路径, 不指定时直接返回缓存中的文件
             emotion: 情感类型 ('neutral', 'sad', 'happy', 'angry', 'excited', 'depressed')
         Returns:
             生成的语音文件路径
@@ -79,28 +131,32 @@ class VoiceGenerator:
             
             params = emotion_params.get(emotion, emotion_params['neutral'])
             
-            # 如果没有指定输出路径，使用临时文件
-            if not output_path:
-                output_path = os.path.join(
-                    os.path.dirname(__file__),
-                    'generated_voices',
-                    f'confession_{language}_{emotion}_{speaker_name}_{hash(text)}.wav'
-                )
-            
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            key = audio_digest(text, language, speaker_name, emotion, self.config.voice.tts.model)
+            cached_path = self.audio_cache.get(key)
+            if cached_path is None:
+                # 先写临时文件再移入缓存, 避免留下不完整的文件
+                tmp_path = self.audio_cache.temp_path(key)
+                try:
+                    self.tts.tts_to_file(
+                        text=text,
+                        file_path=tmp_path,
+                        speaker_name=speaker_name,
+                        language=self.languages[language],
+                        speed=params['speed'],
+                        pitch=params['pitch'],
+                        energy=params['energy']
+                    )
+                    cached_path = self.audio_cache.put(key, tmp_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                self.logger.info(f"Successfully generated voice file: {cached_path}")
             
-            # 生成语音
-            self.tts.tts_to_file(
-                text=text,
-                file_path=output_path,
-                speaker_name=speaker_name,
-                language=self.languages[language],
-                speed=params['speed'],
-                pitch=params['pitch'],
-                energy=params['energy']
-            )
+            if not output_path:
+                return cached_path
             
-            self.logger.info(f"Successfully generated voice file: {output_path}")
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            shutil.copyfile(cached_path, output_path)
             return output_path
             
         except Exception as e:
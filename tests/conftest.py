@@ -0,0 +1,28 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+def make_ohlcv(n, seed=0, start='2024-01-01'):
+    """Random-walk OHLCV frame with a minute DatetimeIndex"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    high = close + rng.random(n)
+    low = close - rng.random(n)
+    return pd.DataFrame({
+        'open': close + rng.normal(0, 0.1, n),
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': rng.random(n) * 100
+    }, index=pd.date_range(start, periods=n, freq='min'))
+
+
+@pytest.fixture
+def ohlcv():
+    return make_ohlcv(300)
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('pandas')
+from ai_engine.async_market_data import AsyncMarketDataCollector, AsyncRateLimiter
+
+
+class FakeExchange:
+    """Local async exchange: fixed latency, records peak in-flight requests"""
+
+    rateLimit = 1
+
+    def __init__(self, latency=0.02, failing=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = []
+        self.closed = False
+
+    async def _request(self, name, symbol):
+        self.calls.append((name, symbol))
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if symbol in self.failing:
+                raise RuntimeError(f'{symbol} unavailable')
+        finally:
+            self.in_flight -= 1
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', limit=100):
+        await self._request('fetch_ohlcv', symbol)
+        return [[1700000000000 + i * 60000, 100.0, 101.0, 99.0, 100.5, 10.0] for i in range(limit)]
+
+    async def fetch_order_book(self, symbol, limit=20):
+        await self._request('fetch_order_book', symbol)
+        return {'bids': [[100.0, 1.0], [99.5, 2.0]], 'asks': [[100.5, 1.5], [101.0, 3.0]],
+                'timestamp': 1700000000000}
+
+    async def fetch_trades(self, symbol, limit=100):
+        await self._request('fetch_trades', symbol)
+        return [{'price': 100.0, 'amount': 1.0}, {'price': 102.0, 'amount': 3.0}]
+
+    async def close(self):
+        self.closed = True
+
+
+SYMBOLS = [f'SYM{i}/USDT' for i in range(30)]
+
+
+def test_collect_returns_engine_shape_for_every_symbol():
+    exchange = FakeExchange(failing={'SYM3/USDT'})
+    collector = AsyncMarketDataCollector(exchange=exchange, max_concurrency=10, rate_limit=10000)
+
+    results = collector.collect(SYMBOLS, limit=50)
+
+    assert set(results) == set(SYMBOLS)
+    assert results['SYM3/USDT'] is None
+    data = results['SYM0/USDT']
+    assert set(data) == {'ohlcv', 'orderbook', 'vwap', 'timestamp'}
+    assert len(data['ohlcv']) == 50
+    assert data['orderbook']['bids'].shape == (2, 2)
+    assert data['vwap'] == pytest.approx(101.5)
+    assert exchange.closed
+
+
+def test_concurrency_is_bounded_and_faster_than_serial():
+    exchange = FakeExchange(latency=0.02)
+    collector = AsyncMarketDataCollector(exchange=exchange, max_concurrency=8, rate_limit=10000)
+
+    started = time.perf_counter()
+    collector.collect(SYMBOLS)
+    elapsed = time.perf_counter() - started
+
+    assert len(exchange.calls) == 3 * len(SYMBOLS)
+    assert exchange.peak_in_flight == 8
+    serial = len(exchange.calls) * exchange.latency
+    assert elapsed < serial / 3
+
+
+def test_rate_limit_budget_is_shared_across_symbols():
+    exchange = FakeExchange(latency=0.0)
+    rate = 200.0
+    collector = AsyncMarketDataCollector(exchange=exchange, max_concurrency=50)
+    collector.rate_limiter = AsyncRateLimiter(rate, capacity=5)
+
+    started = time.perf_counter()
+    collector.collect(SYMBOLS[:20])
+    elapsed = time.perf_counter() - started
+
+    # 60 requests: a burst of 5, then one token every 1/rate seconds
+    assert len(exchange.calls) == 60
+    assert elapsed >= (60 - 5) / rate * 0.9
@@ -0,0 +1,124 @@
+import os
+import types
+
+import pytest
+
+from ai_engine import voice_generator
+from ai_engine.audio_cache import AudioCache, INDEX_FILE, audio_digest
+
+
+def _put(cache, key, size):
+    tmp_path = cache.temp_path(key)
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * size)
+    return cache.put(key, tmp_path)
+
+
+def _key(n):
+    return audio_digest(f'text {n}', 'en', 'default', 'sad', 'tts-model')
+
+
+def test_digest_is_stable_and_covers_every_field():
+    key = audio_digest('I bought the top', 'en', 'default', 'sad', 'tts-model')
+    assert key == audio_digest('I bought the top', 'en', 'default', 'sad', 'tts-model')
+    assert len(key) == 64
+    variants = [('I bought the top', 'zh', 'default', 'sad', 'tts-model'),
+                ('I bought the top', 'en', 'other', 'sad', 'tts-model'),
+                ('I bought the top', 'en', 'default', 'happy', 'tts-model'),
+                ('I bought the top', 'en', 'default', 'sad', 'other-model'),
+                ('I bought the top!', 'en', 'default', 'sad', 'tts-model')]
+    assert len({audio_digest(*variant) for variant in variants} | {key}) == len(variants) + 1
+
+
+def test_hits_and_misses(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    assert cache.get(_key(0)) is None
+
+    path = _put(cache, _key(0), 10)
+    assert path == os.path.join(str(tmp_path), _key(0)[:2], _key(0) + '.wav')
+    assert cache.get(_key(0)) == path
+    assert cache.stats() == {'entries': 1, 'bytes': 10, 'hits': 1, 'misses': 1}
+
+    os.remove(path)
+    assert cache.get(_key(0)) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_under_max_bytes(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=300)
+    for n in range(3):
+        _put(cache, _key(n), 100)
+    cache.get(_key(0))  # key 1 is now the least recently used
+
+    _put(cache, _key(3), 100)
+
+    assert cache.total_bytes == 300
+    assert cache.get(_key(1)) is None and not os.path.exists(cache.path(_key(1)))
+    assert all(cache.get(_key(n)) for n in (0, 2, 3))
+
+
+@pytest.mark.parametrize('index', [None, '{not json'])
+def test_index_is_rebuilt_from_cache_files_only(tmp_path, index):
+    cache = AudioCache(str(tmp_path))
+    for n in range(2):
+        _put(cache, _key(n), 50)
+    index_path = os.path.join(str(tmp_path), INDEX_FILE)
+    if index is None:
+        os.remove(index_path)
+    else:
+        with open(index_path, 'w') as f:
+            f.write(index)
+    # Files that are not cache entries must not be indexed
+    (tmp_path / 'confession_en_sad_default_123.wav').write_bytes(b'\0' * 500)
+    (tmp_path / _key(0)[:2] / (_key(0) + '.wav.1.2.tmp.wav')).write_bytes(b'\0' * 500)
+    (tmp_path / 'zz').mkdir()
+    (tmp_path / 'zz' / 'notes.wav').write_bytes(b'\0' * 500)
+
+    rebuilt = AudioCache(str(tmp_path))
+    assert set(rebuilt.entries) == {_key(0), _key(1)}
+    assert rebuilt.total_bytes == 100
+
+
+class StubTTS:
+    def __init__(self):
+        self.calls = []
+
+    def tts_to_file(self, text, file_path, **kwargs):
+        self.calls.append(text)
+        with open(file_path, 'wb') as f:
+            f.write(text.encode())
+
+
+def _generator(monkeypatch, tmp_path, cache_dir=None):
+    config = types.SimpleNamespace(voice=types.SimpleNamespace(tts=types.SimpleNamespace(model='stub')))
+    monkeypatch.setattr(voice_generator, 'VOICES_DIR', str(tmp_path / 'generated_voices'))
+    generator = voice_generator.VoiceGenerator(config, cache_dir=cache_dir)
+    stub = StubTTS()
+    generator._tts_model = types.SimpleNamespace(get=lambda: stub)
+    return generator, stub
+
+
+def test_generate_voice_synthesizes_repeated_text_once(monkeypatch, tmp_path):
+    generator, stub = _generator(monkeypatch, tmp_path, cache_dir=str(tmp_path / 'cache'))
+
+    first = generator.generate_voice('rekt again', 'en', emotion='sad')
+    second = generator.generate_voice('rekt again', 'en', emotion='sad')
+    copied = generator.generate_voice('rekt again', 'en', emotion='sad', output_path=str(tmp_path / 'out.wav'))
+    generator.generate_voice('rekt again', 'en', emotion='happy')
+
+    assert first == second
+    assert stub.calls == ['rekt again', 'rekt again']
+    with open(copied, 'rb') as f:
+        assert f.read() == b'rekt again'
+
+
+def test_default_cache_removes_legacy_voice_files(monkeypatch, tmp_path):
+    voices = tmp_path / 'generated_voices'
+    voices.mkdir()
+    (voices / 'confession_en_sad_default_-42.wav').write_bytes(b'\0' * 100)
+    (voices / 'keep.txt').write_text('not ours')
+
+    generator, _ = _generator(monkeypatch, tmp_path)
+
+    assert sorted(os.listdir(str(voices))) == ['cache', 'keep.txt']
+    assert generator.audio_cache.cache_dir == str(voices / 'cache')
@@ -0,0 +1,35 @@
+import numpy as np
+
+from conftest import make_ohlcv
+from ai_engine.backtester import Backtester
+from ai_engine.risk_manager import RiskManager
+
+
+def _frames():
+    long = make_ohlcv(600).rename_axis('timestamp').reset_index()
+    short = make_ohlcv(200, seed=2, start='2024-01-01 06:40').rename_axis('timestamp').reset_index()
+    # A few missing candles inside the short history
+    short = short.drop(index=range(50, 55)).reset_index(drop=True)
+    return {'BTC/USDT': long, 'ETH/USDT': short}
+
+
+def test_short_history_symbol_is_tradable():
+    prepared = Backtester().prepare(_frames())
+    assert prepared['ohlcv']['close'].shape == (2, 600)
+    assert np.all((prepared['signal'] != 0).sum(axis=1) > 0)
+    # Missing candles are filled, so indicators keep running through the gap
+    assert not np.isnan(prepared['indicators']['ema_12'][1, -1])
+
+
+def test_event_driven_is_reproducible_and_leaves_risk_manager_untouched():
+    risk_manager = RiskManager()
+    backtester = Backtester(risk_manager=risk_manager)
+    last_update = risk_manager.last_update
+
+    first = backtester.run_event_driven(_frames())
+    second = backtester.run_event_driven(_frames())
+
+    assert first['n_trades'] > 0
+    np.testing.assert_array_equal(first['equity_curve'], second['equity_curve'])
+    assert risk_manager.history.keys() == []
+    assert risk_manager.last_update == last_update
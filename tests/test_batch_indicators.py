@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from conftest import make_ohlcv
+from ai_engine.batch_indicators import calculate_indicators_for_frames, stack_ohlcv
+
+talib = pytest.importorskip('talib')
+
+
+def _talib_indicators(df):
+    close, high, low, volume = (df[key].values.astype(float) for key in ('close', 'high', 'low', 'volume'))
+    macd, macd_signal, _ = talib.MACD(close)
+    return {
+        'sma_20': talib.SMA(close, 20),
+        'sma_50': talib.SMA(close, 50),
+        'ema_12': talib.EMA(close, 12),
+        'rsi': talib.RSI(close, 14),
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'atr': talib.ATR(high, low, close, 14),
+        'volatility': talib.STDDEV(close, 20),
+        'obv': talib.OBV(close, volume),
+    }
+
+
+def test_ragged_histories_match_talib_per_symbol():
+    frames = [make_ohlcv(n, seed=i) for i, n in enumerate((300, 120, 60, 300, 10))]
+    result = calculate_indicators_for_frames(frames, full=True)
+
+    for row, df in enumerate(frames):
+        for key, expected in _talib_indicators(df).items():
+            np.testing.assert_allclose(result[key][row, -len(df):], expected, rtol=1e-6, atol=1e-8,
+                                       equal_nan=True, err_msg=f'{key} row {row}')
+            assert np.isnan(result[key][row, :-len(df)]).all()
+
+
+def test_default_length_keeps_longest_history():
+    frames = [make_ohlcv(200), make_ohlcv(50, seed=1)]
+    matrix = stack_ohlcv(frames)
+    assert matrix['close'].shape == (2, 200)
+    assert np.isnan(matrix['close'][1, :150]).all()
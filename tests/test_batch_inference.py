@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from ai_engine.batch_inference import MicroBatcher, normalize_text
+
+
+class Recorder:
+    """Batch function that records every batch and can block until released"""
+
+    def __init__(self, fn=lambda item: item * 2):
+        self.fn = fn
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, items):
+        self.release.wait(5)
+        self.batches.append(list(items))
+        return [self.fn(item) for item in items]
+
+
+def test_items_queued_together_are_split_by_max_batch():
+    recorder = Recorder()
+    recorder.release.clear()
+    batcher = MicroBatcher(recorder, max_batch=4, max_wait_ms=10, cache_size=0)
+    # The first item's batch closes after max_wait and then blocks until released
+    first = batcher.submit(-1)
+    time.sleep(0.1)
+    futures = [batcher.submit(i) for i in range(10)]
+    recorder.release.set()
+
+    assert first.result(5) == -2
+    assert [future.result(5) for future in futures] == [i * 2 for i in range(10)]
+    assert recorder.batches == [[-1], [0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    batcher.close()
+
+
+def test_batch_is_cut_off_after_max_wait():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch=100, max_wait_ms=20, cache_size=0)
+    early = batcher.submit(1)
+    time.sleep(0.2)
+    late = batcher.submit(2)
+
+    assert (early.result(5), late.result(5)) == (2, 4)
+    assert recorder.batches == [[1], [2]]
+    batcher.close()
+
+
+def test_identical_in_flight_requests_share_a_future_and_results_are_cached():
+    recorder = Recorder()
+    recorder.release.clear()
+    batcher = MicroBatcher(recorder, max_batch=8, max_wait_ms=20, cache_size=2, key=normalize_text,
+                           name='sentiment')
+    recorder.fn = str.upper
+    first = batcher.submit('to the moon')
+    again = batcher.submit('  to   the moon ')
+    recorder.release.set()
+
+    assert again is first and first.result(5) == 'TO THE MOON'
+    assert batcher.stats['coalesced'] == 1
+
+    assert batcher('to the moon', timeout=5) == 'TO THE MOON'
+    assert batcher.stats['cache_hits'] == 1
+    assert sum(len(batch) for batch in recorder.batches) == 1
+    batcher.close()
+
+
+def test_lru_cache_evicts_the_least_recently_used_key():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch=1, max_wait_ms=0, cache_size=2)
+    batcher.map([1, 2], timeout=5)
+    batcher(1, timeout=5)     # 2 is now the least recently used
+    batcher(3, timeout=5)     # evicts 2
+
+    calls_before = len(recorder.batches)
+    batcher(1, timeout=5)
+    assert len(recorder.batches) == calls_before
+    batcher(2, timeout=5)
+    assert len(recorder.batches) == calls_before + 1
+    batcher.close()
+
+
+def test_without_cache_identical_requests_are_not_coalesced():
+    counter = itertools.count()
+    recorder = Recorder(fn=lambda prompt: f'{prompt} #{next(counter)}')
+    recorder.release.clear()
+    batcher = MicroBatcher(recorder, max_batch=8, max_wait_ms=20, cache_size=0)
+    futures = [batcher.submit('write a meme') for _ in range(3)]
+    recorder.release.set()
+
+    results = [future.result(5) for future in futures]
+    # Every caller gets its own sample
+    assert len(set(results)) == 3
+    assert batcher.stats['coalesced'] == 0
+    batcher.close()
+
+
+def test_exception_reaches_every_future_in_the_batch():
+    def failing(items):
+        raise RuntimeError('model crashed')
+
+    batcher = MicroBatcher(failing, max_batch=8, max_wait_ms=50, cache_size=16)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model crashed'):
+            future.result(5)
+
+    # Failed keys are not left pending or cached
+    batcher.fn = Recorder()
+    assert batcher(0, timeout=5) == 0
+    batcher.close()
+
+
+def test_result_count_mismatch_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch=8, max_wait_ms=50, cache_size=0)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+    batcher.close()
+
+
+def test_close_drains_queued_requests_then_rejects_new_ones():
+    recorder = Recorder()
+    recorder.release.clear()
+    batcher = MicroBatcher(recorder, max_batch=2, max_wait_ms=0, cache_size=0)
+    futures = [batcher.submit(i) for i in range(5)]
+    closer = threading.Thread(target=batcher.close, args=(5,))
+    closer.start()
+    recorder.release.set()
+    closer.join(5)
+
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == [0, 2, 4, 6, 8]
+    assert not batcher._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        batcher.submit(99)
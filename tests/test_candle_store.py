@@ -0,0 +1,87 @@
+import numpy as np
+
+from ai_engine.candle_store import CandleRingBuffer, CandleStore
+
+MINUTE = 60000
+
+
+def _candle(i, close=None):
+    close = float(i) if close is None else close
+    return [i * MINUTE, close, close + 1, close - 1, close, 1.0]
+
+
+class PagedExchange:
+    """Serves one-minute candles up to `now`, at most `max_page` per request"""
+
+    def __init__(self, now, max_page=500):
+        self.now = now
+        self.max_page = max_page
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append((since, limit))
+        limit = min(limit or self.max_page, self.max_page)
+        if since is None:
+            first = self.now - limit + 1
+        else:
+            first = since // MINUTE
+        return [_candle(i) for i in range(max(first, 0), min(first + limit, self.now + 1))]
+
+
+class Collector:
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+
+def test_window_stays_contiguous_across_wraparound():
+    buffer = CandleRingBuffer(capacity=5)
+    for i in range(12):
+        buffer.append(_candle(i))
+
+    window = buffer.window()
+    assert len(buffer) == 5
+    assert window['timestamp'].tolist() == [i * MINUTE for i in range(7, 12)]
+    # Zero-copy view into the double-written backing array
+    assert np.shares_memory(window, buffer._data)
+    assert buffer.column('close', 2).tolist() == [10.0, 11.0]
+
+
+def test_extend_replaces_forming_candle_and_drops_older_rows():
+    buffer = CandleRingBuffer(capacity=4)
+    assert buffer.extend([_candle(i) for i in range(6)]) == 6
+
+    added = buffer.extend([_candle(3, close=-1.0), _candle(5, close=55.0), _candle(6)])
+    assert added == 1
+    assert buffer.column('timestamp').tolist() == [i * MINUTE for i in range(3, 7)]
+    # Row 3 was older than the last candle and is ignored; row 5 replaced the forming candle
+    assert buffer.column('close').tolist() == [3.0, 4.0, 55.0, 6.0]
+
+    buffer.replace_last(_candle(6, close=66.0))
+    assert buffer.window(1)['close'][0] == 66.0
+    assert buffer.last_timestamp == 6 * MINUTE
+
+
+def test_update_catches_up_after_a_multi_page_gap():
+    exchange = PagedExchange(now=999, max_page=500)
+    store = CandleStore(Collector(exchange), capacity=300, page_limit=500)
+    store.update('BTC/USDT', '1m')
+    assert store.get_buffer('BTC/USDT', '1m').last_timestamp == 999 * MINUTE
+
+    exchange.now = 2300  # about 1300 candles missed
+    buffer = store.update('BTC/USDT', '1m')
+
+    assert buffer.last_timestamp == 2300 * MINUTE
+    assert buffer.column('timestamp').tolist() == [i * MINUTE for i in range(2001, 2301)]
+    assert len(exchange.calls) == 1 + 3
+
+
+def test_update_in_steady_state_is_one_request():
+    exchange = PagedExchange(now=100)
+    store = CandleStore(Collector(exchange), capacity=50)
+    store.update('BTC/USDT', '1m')
+    exchange.now = 102
+    store.update('BTC/USDT', '1m')
+
+    assert exchange.calls[-1] == (100 * MINUTE, 500)
+    assert len(exchange.calls) == 2
+    assert store.window('BTC/USDT', '1m', 1)['timestamp'][0] == 102 * MINUTE
@@ -0,0 +1,120 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+from ai_engine import data_store
+from ai_engine.data_store import DAY_MS, MarketDataStore
+
+MINUTE = 60000
+# 2024-01-01 22:00 UTC, so a few hours of minute bars cross midnight
+START = 1704146400000
+
+
+def _candles(first, n, close=100.0):
+    timestamps = START + MINUTE * np.arange(first, first + n)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(timestamps, unit='ms'),
+        'open': close, 'high': close + 1, 'low': close - 1,
+        'close': close + np.arange(first, first + n, dtype=float), 'volume': 1.0
+    })
+
+
+def _parts(store, kind='candles', symbol='BTC_USDT'):
+    return sorted(glob.glob(os.path.join(store.root_dir, kind, symbol, '*', '*.parquet')))
+
+
+def test_candles_round_trip_across_day_partitions(tmp_path):
+    store = MarketDataStore(str(tmp_path))
+    candles = _candles(0, 240)
+    assert store.append_candles('BTC/USDT', candles) == 240
+
+    days = sorted(os.listdir(os.path.join(str(tmp_path), 'candles', 'BTC_USDT')))
+    assert days == ['2024-01-01', '2024-01-02']
+    pd.testing.assert_frame_equal(store.read_candles('BTC/USDT'), candles.astype({'timestamp': 'datetime64[ms]'}),
+                                  check_dtype=False)
+
+
+def test_tz_aware_timestamps_are_stored_as_utc(tmp_path):
+    store = MarketDataStore(str(tmp_path))
+    candles = _candles(0, 10)
+    aware = candles.assign(timestamp=candles['timestamp'].dt.tz_localize('UTC').dt.tz_convert('Asia/Shanghai'))
+
+    assert store.append_candles('BTC/USDT', aware) == 10
+    stored = store.read_candles('BTC/USDT', as_numpy=True)['timestamp']
+    np.testing.assert_array_equal(stored, START + MINUTE * np.arange(10))
+
+
+def test_overlapping_appends_keep_the_last_write(tmp_path):
+    store = MarketDataStore(str(tmp_path))
+    store.append_candles('BTC/USDT', _candles(0, 60))
+    store.append_candles('BTC/USDT', _candles(30, 60, close=500.0))
+
+    df = store.read_candles('BTC/USDT')
+    assert len(df) == 90 and df['timestamp'].is_monotonic_increasing
+    np.testing.assert_array_equal(df['close'].values[:30], 100.0 + np.arange(30))
+    np.testing.assert_array_equal(df['close'].values[30:], 500.0 + np.arange(30, 90))
+
+
+def test_read_filters_half_open_range(tmp_path):
+    store = MarketDataStore(str(tmp_path))
+    store.append_candles('BTC/USDT', _candles(0, 240))
+
+    start, end = START + 100 * MINUTE, START + 150 * MINUTE
+    columns = store.read_candles('BTC/USDT', start=start, end=end, columns=['timestamp', 'close'], as_numpy=True)
+    assert set(columns) == {'timestamp', 'close'}
+    assert isinstance(columns['close'], np.ndarray)
+    np.testing.assert_array_equal(columns['timestamp'], START + MINUTE * np.arange(100, 150))
+
+    by_datetime = store.read_candles('BTC/USDT', start=pd.Timestamp(start, unit='ms'), end=pd.Timestamp(end, unit='ms'))
+    assert len(by_datetime) == 50
+    assert store.read_candles('BTC/USDT', start=START + DAY_MS * 5).empty
+
+
+def test_orderbook_snapshots_keep_their_levels(tmp_path):
+    store = MarketDataStore(str(tmp_path))
+    for i in range(3):
+        store.append_orderbook('BTC/USDT', {
+            'bids': np.array([[100.0 - i, 1.0], [99.0 - i, 2.0]]),
+            'asks': np.array([[101.0 + i, 1.5]]),
+            'timestamp': START + i * 1000
+        })
+
+    df = store.read_orderbooks('BTC/USDT')
+    assert df['timestamp'].tolist() == [START, START + 1000, START + 2000]
+    np.testing.assert_array_equal(df['bid_price'].iloc[2], [98.0, 97.0])
+    np.testing.assert_array_equal(df['ask_amount'].iloc[1], [1.5])
+
+
+def test_compact_merges_and_removes_only_the_parts_it_read(tmp_path, monkeypatch):
+    store = MarketDataStore(str(tmp_path))
+    store.append_candles('BTC/USDT', _candles(0, 30))
+    store.append_candles('BTC/USDT', _candles(10, 30, close=500.0))
+    before = _parts(store)
+    assert len(before) == 2
+
+    # A writer appends to the partition while the compaction is reading it
+    real_read_table = data_store.pq.read_table
+    late = []
+
+    def read_table(path, *args, **kwargs):
+        if not late:
+            late.append(store.append_candles('BTC/USDT', _candles(40, 5, close=900.0)))
+        return real_read_table(path, *args, **kwargs)
+
+    monkeypatch.setattr(data_store.pq, 'read_table', read_table)
+    assert store.compact('candles') == 1
+    monkeypatch.undo()
+
+    after = _parts(store)
+    assert not set(before) & set(after)
+    assert len(after) == 2 and any(os.path.basename(path).startswith('compacted-') for path in after)
+
+    df = store.read_candles('BTC/USDT')
+    assert len(df) == 45
+    np.testing.assert_array_equal(df['close'].values[:10], 100.0 + np.arange(10))
+    np.testing.assert_array_equal(df['close'].values[10:40], 500.0 + np.arange(10, 40))
+    np.testing.assert_array_equal(df['close'].values[40:], 900.0 + np.arange(40, 45))
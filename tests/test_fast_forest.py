@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from ai_engine.fast_forest import FlatForest, verify_parity
+
+
+def _data(n_classes=2, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(400, 6))
+    score = X[:, 0] + 0.5 * X[:, 1] - X[:, 2] * X[:, 3]
+    y = np.digitize(score, np.quantile(score, np.linspace(0, 1, n_classes + 1)[1:-1]))
+    return X, y
+
+
+@pytest.mark.parametrize('n_classes', [2, 3])
+@pytest.mark.parametrize('make_model', [
+    lambda: RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0),
+    lambda: GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0),
+], ids=['random_forest', 'gradient_boosting'])
+def test_export_matches_sklearn(make_model, n_classes):
+    X, y = _data(n_classes)
+    model = make_model().fit(X[:300], y[:300])
+
+    assert verify_parity(model, X[300:]) <= 1e-9
+    np.testing.assert_array_equal(FlatForest.from_sklearn(model).predict(X[300:]), model.predict(X[300:]))
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_round_trip(tmp_path, mmap):
+    X, y = _data()
+    model = GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0).fit(X, y)
+    path = str(tmp_path / 'model.ffst')
+    FlatForest.from_sklearn(model).save(path)
+
+    loaded = FlatForest.load(path, mmap=mmap)
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9)
+
+
+def test_rejects_unsupported_models():
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = _data()
+    with pytest.raises((TypeError, ValueError)):
+        FlatForest.from_sklearn(LogisticRegression().fit(X, y))
@@ -0,0 +1,7 @@
+from ai_engine.lazy import IMPORT_BUDGETS, check_import_times
+
+
+def test_cold_imports_stay_within_budget():
+    # Raises AssertionError naming every module over its budget
+    timings = check_import_times(runs=3)
+    assert set(timings) == set(IMPORT_BUDGETS)
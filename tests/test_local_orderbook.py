@@ -0,0 +1,137 @@
+import json
+
+import numpy as np
+
+from ai_engine.local_orderbook import LocalOrderBook, ReplayFeed
+
+
+class ReferenceBook:
+    """Exchange-side book: emits diff-depth events and serves snapshots of its current state"""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.bids = {round(99.0 - 0.1 * i, 1): 1.0 + i for i in range(10)}
+        self.asks = {round(100.0 + 0.1 * i, 1): 1.0 + i for i in range(10)}
+        self.update_id = 1000
+        self.snapshots = 0
+
+    def _side_diff(self, book, low, high):
+        levels = []
+        for price in np.round(self.rng.uniform(low, high, size=self.rng.integers(1, 5)), 1):
+            price = float(price)
+            # Deletes of existing levels and of unknown levels both happen on real feeds
+            amount = 0.0 if self.rng.random() < 0.3 else float(np.round(self.rng.uniform(0.1, 5.0), 3))
+            levels.append([price, amount])
+            if amount == 0:
+                book.pop(price, None)
+            else:
+                book[price] = amount
+        return levels
+
+    def next_event(self):
+        first = self.update_id + 1
+        self.update_id += int(self.rng.integers(1, 4))
+        return {
+            'e': 'depthUpdate', 'E': self.update_id, 'U': first, 'u': self.update_id,
+            'b': self._side_diff(self.bids, 98.0, 99.4),
+            'a': self._side_diff(self.asks, 99.6, 101.0)
+        }
+
+    def snapshot(self, symbol):
+        self.snapshots += 1
+        return {
+            'bids': [[p, a] for p, a in self.bids.items()],
+            'asks': [[p, a] for p, a in self.asks.items()],
+            'lastUpdateId': self.update_id
+        }
+
+
+def _assert_matches(book, reference):
+    bids, asks = book.depth(limit=1000)
+    expected_bids = sorted(reference.bids.items(), reverse=True)
+    expected_asks = sorted(reference.asks.items())
+    np.testing.assert_array_equal(bids, np.array(expected_bids).reshape(-1, 2))
+    np.testing.assert_array_equal(asks, np.array(expected_asks).reshape(-1, 2))
+    assert book.last_update_id == reference.update_id
+
+
+def test_replay_stays_in_sync_with_the_exchange():
+    reference = ReferenceBook()
+    book = LocalOrderBook('BTC/USDT', reference.snapshot)
+
+    states = [book.process(reference.next_event()) for _ in range(300)]
+
+    # The first event is covered by the snapshot; from the second one on the book is live
+    assert states[0] is False and all(states[1:])
+    assert reference.snapshots == 1 and book.resync_count == 0
+    _assert_matches(book, reference)
+
+
+def test_sequence_gap_forces_resync():
+    reference = ReferenceBook(seed=1)
+    book = LocalOrderBook('BTC/USDT', reference.snapshot)
+
+    states = {}
+    for i in range(200):
+        event = reference.next_event()
+        if i == 120:
+            # Lost in transit; the exchange book still moves on
+            continue
+        states[i] = book.process(event)
+        if i == 119:
+            _assert_matches(book, reference)
+
+    # The gap is detected on the next event, which the fresh snapshot already covers
+    assert states[121] is False and states[122] is True
+    assert all(states[i] for i in range(122, 200))
+    assert book.resync_count == 1 and reference.snapshots == 2
+    _assert_matches(book, reference)
+
+
+def test_recorded_replay_matches_live_processing(tmp_path):
+    reference = ReferenceBook(seed=4)
+    live = LocalOrderBook('BTC/USDT', reference.snapshot)
+    events = []
+    for _ in range(100):
+        events.append(reference.next_event())
+        live.process(events[-1])
+
+    path = tmp_path / 'depth.jsonl'
+    path.write_text('\n'.join(json.dumps(event) for event in events) + '\n')
+    # Replaying from the start needs the snapshot the live book was seeded with
+    seed = ReferenceBook(seed=4)
+    first = seed.next_event()
+    snapshot = seed.snapshot('BTC/USDT')
+    assert snapshot['lastUpdateId'] == first['u']
+    replayed = LocalOrderBook('BTC/USDT', lambda symbol: snapshot).run(ReplayFeed(str(path)))
+
+    assert replayed.synced
+    for side in ('bids', 'asks'):
+        np.testing.assert_array_equal(getattr(replayed, side).prices, getattr(live, side).prices)
+        np.testing.assert_array_equal(getattr(replayed, side).amounts, getattr(live, side).amounts)
+
+
+def test_stale_snapshot_is_refetched():
+    reference = ReferenceBook(seed=2)
+    stale = reference.snapshot('BTC/USDT')
+    for _ in range(5):
+        reference.next_event()
+    responses = [stale]
+    book = LocalOrderBook('BTC/USDT', lambda symbol: responses.pop() if responses else reference.snapshot(symbol))
+
+    # The stale snapshot predates the first buffered event, so it cannot be bridged
+    assert book.process(reference.next_event()) is False
+    assert book.process(reference.next_event()) is True
+    _assert_matches(book, reference)
+
+
+def test_to_orderbook_only_when_synced():
+    reference = ReferenceBook(seed=3)
+    book = LocalOrderBook('BTC/USDT', reference.snapshot)
+    assert book.to_orderbook() is None
+
+    book.process(reference.next_event())
+    book.process(reference.next_event())
+    snapshot = book.to_orderbook(limit=5)
+    assert snapshot['bids'].shape == (5, 2) and snapshot['asks'].shape == (5, 2)
+    assert snapshot['bids'][0, 0] < snapshot['asks'][0, 0]
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+from PIL import Image, ImageFont
+
+from ai_engine.meme_renderer import MemeBatchRenderer, MemeRenderer, STYLE_CONFIGS, encode_image
+
+
+@pytest.fixture
+def assets(tmp_path):
+    try:
+        # Pillow >= 10.1 embeds a scalable font; its bytes stand in for every style's font
+        font_bytes = ImageFont.load_default(size=20).path.getvalue()
+    except (TypeError, AttributeError):
+        pytest.skip('Pillow without an embedded TrueType font')
+    templates_dir = tmp_path / 'templates'
+    fonts_dir = tmp_path / 'fonts'
+    templates_dir.mkdir()
+    fonts_dir.mkdir()
+    for config in STYLE_CONFIGS.values():
+        (fonts_dir / config['font']).write_bytes(font_bytes)
+    Image.new('RGB', (320, 240), 'gray').save(templates_dir / 'default.jpg')
+    return str(templates_dir), str(fonts_dir)
+
+
+def test_batch_renderer_does_not_fork_by_default(assets):
+    renderer = MemeBatchRenderer(*assets, n_workers=1)
+    assert renderer.start_method in ('forkserver', 'spawn')
+
+
+def test_render_many_matches_in_process_rendering(assets):
+    with MemeBatchRenderer(*assets, n_workers=2) as renderer:
+        jobs = [('to the moon', 'default.jpg', 'classic'), ('hodl', 'default.jpg', 'modern'),
+                ('x', 'missing.jpg', 'classic')]
+        results = renderer.render_many(jobs)
+
+    expected = encode_image(MemeRenderer(*assets).render('to the moon', 'default.jpg', 'classic'))
+    assert results[0] == expected
+    assert Image.open(io.BytesIO(results[1])).size == (320, 240)
+    assert results[2] is None
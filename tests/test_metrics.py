@@ -0,0 +1,61 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ai_engine.metrics import metrics
+from ai_engine.market_data import MarketDataCollector
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def _handlers_after_import(env_value):
+    env = {key: value for key, value in os.environ.items() if key != 'AI_ENGINE_METRICS'}
+    if env_value is not None:
+        env['AI_ENGINE_METRICS'] = env_value
+    env['PYTHONPATH'] = SRC
+    code = "import logging, ai_engine.metrics; print(len(logging.getLogger('ai_engine').handlers))"
+    return int(subprocess.check_output([sys.executable, '-c', code], env=env).decode())
+
+
+def test_import_does_not_touch_logging():
+    assert _handlers_after_import(None) == 0
+    assert _handlers_after_import('0') == 0
+    assert _handlers_after_import('1') == 1
+
+
+class SlowStore:
+    def append_candles(self, symbol, df):
+        time.sleep(0.05)
+
+
+class FakeExchange:
+    def fetch_ohlcv(self, symbol, timeframe, limit=100):
+        return [[1700000000000 + i * 60000, 100.0, 101.0, 99.0, 100.5, 10.0] for i in range(limit)]
+
+
+@pytest.fixture
+def collector():
+    collector = MarketDataCollector.__new__(MarketDataCollector)
+    collector.exchange = FakeExchange()
+    collector.store = SlowStore()
+    collector.logger = logging.getLogger(__name__)
+    return collector
+
+
+def test_fetch_timing_covers_only_the_exchange_call(collector):
+    if not metrics.enabled:
+        pytest.skip('metrics disabled via AI_ENGINE_METRICS')
+    metrics.reset()
+    try:
+        assert len(collector.fetch_historical_data('BTC/USDT', limit=10)) == 10
+        summary = metrics.stage_summary('exchange.fetch_ohlcv', 'BTC/USDT')
+    finally:
+        metrics.reset()
+
+    assert summary['count'] == 1
+    # The store write sleeps 50 ms; it must not show up in the exchange latency
+    assert summary['max'] < 0.02
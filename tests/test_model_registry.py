@@ -0,0 +1,45 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from ai_engine import model_registry
+from ai_engine.fast_forest import FlatForest
+from ai_engine.model_registry import ModelRegistry, SCALER_FILE
+
+FEATURES = ['a', 'b', 'c']
+
+
+def _fit():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 3))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+
+def test_fast_load_does_not_unpickle_the_sklearn_model(tmp_path, monkeypatch):
+    model, scaler, X = _fit()
+    registry = ModelRegistry(str(tmp_path))
+    registry.register(model, scaler, FEATURES, activate=True)
+
+    loaded_files = []
+    real_load = joblib.load
+    monkeypatch.setattr(model_registry.joblib, 'load',
+                        lambda path, *args, **kwargs: loaded_files.append(os.path.basename(path)) or
+                        real_load(path, *args, **kwargs))
+
+    artifact = registry.load()
+    assert isinstance(artifact['model'], FlatForest)
+    assert loaded_files == [SCALER_FILE]
+    features = artifact['scaler'].transform(X)
+    np.testing.assert_allclose(artifact['model'].predict_proba(features), model.predict_proba(features), atol=1e-9)
+
+    assert type(registry.load(prefer_fast=False)['model']) is RandomForestClassifier
+
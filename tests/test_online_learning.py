@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import make_ohlcv
+
+pytest.importorskip('sklearn')
+from ai_engine.ml_models import MLPredictor
+
+
+def test_update_features_accepts_ohlcv_frame_and_keys_by_symbol():
+    predictor = MLPredictor()
+    btc, eth = make_ohlcv(120), make_ohlcv(120, seed=1) * 1000
+
+    assert predictor.update_features({'ohlcv': btc.iloc[:100]}, symbol='BTC/USDT') is False
+    # A different symbol has no pending sample of its own yet
+    assert predictor.update_features({'ohlcv': eth.iloc[:100]}, symbol='ETH/USDT') is False
+    assert predictor.update_features({'ohlcv': btc.iloc[:101]}, symbol='BTC/USDT') is True
+    assert set(predictor._pending_samples) == {'BTC/USDT', 'ETH/USDT'}
+
+
+def test_online_model_is_not_served_unless_selected():
+    predictor = MLPredictor()
+    frame = make_ohlcv(200)
+    for end in range(100, 200):
+        predictor.update_features({'ohlcv': frame.iloc[:end]}, symbol='BTC/USDT')
+    assert predictor.selected_model == 'rf'
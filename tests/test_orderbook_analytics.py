@@ -0,0 +1,19 @@
+import numpy as np
+
+from ai_engine.orderbook_analytics import OrderBookAnalytics
+
+BOOK = {'bids': [[99.0, 1.0], [98.0, 2.0]], 'asks': [[101.0, 1.0], [102.0, 2.0]]}
+
+
+def test_depth_at_bps_accumulates_levels_inside_the_band():
+    analytics = OrderBookAnalytics(BOOK)
+    np.testing.assert_array_equal(analytics.depth_at_bps([0, 100, 500], 'buy'), [0.0, 1.0, 3.0])
+    np.testing.assert_array_equal(analytics.depth_at_bps([0, 100, 500], 'sell'), [0.0, 1.0, 3.0])
+
+
+def test_depth_at_bps_is_zero_for_an_empty_side():
+    for side in ('buy', 'sell'):
+        one_sided = dict(BOOK, **{'asks' if side == 'buy' else 'bids': []})
+        depth = OrderBookAnalytics(one_sided).depth_at_bps([10, 1000], side)
+        np.testing.assert_array_equal(depth, [0.0, 0.0])
+    assert OrderBookAnalytics({'bids': [], 'asks': []}).depth_at_bps(50) == 0.0
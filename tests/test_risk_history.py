@@ -0,0 +1,92 @@
+import json
+
+import numpy as np
+import pytest
+
+from ai_engine.risk_history import RiskHistory, RollingHistory
+from ai_engine.risk_manager import RiskManager
+
+
+def test_running_stats_match_numpy_after_wraparound():
+    rng = np.random.default_rng(0)
+    values = rng.normal(loc=5.0, scale=2.0, size=1000)
+    history = RollingHistory(capacity=64)
+
+    for i, value in enumerate(values, start=1):
+        history.append(value)
+        window = values[max(0, i - 64):i]
+        assert len(history) == len(window)
+        np.testing.assert_array_equal(history.values(), window)
+        assert history.mean == pytest.approx(np.mean(window), rel=1e-12, abs=1e-12)
+        assert history.variance == pytest.approx(np.var(window), rel=1e-9, abs=1e-12)
+
+    assert history.std == pytest.approx(np.std(values[-64:]), rel=1e-9)
+    assert history.count == 1000
+    assert history.last == values[-1] and history[-1] == values[-1]
+
+
+def test_extremes_survive_eviction():
+    history = RollingHistory(capacity=3)
+    for value in [10.0, -7.0, 1.0, 2.0, 3.0, 4.0]:
+        history.append(value)
+
+    assert history.values().tolist() == [2.0, 3.0, 4.0]
+    assert history.max_value == 10.0 and history.min_value == -7.0
+
+
+def test_trend_is_the_mean_step():
+    history = RollingHistory(capacity=8)
+    values = np.array([1.0, 4.0, 2.0, 8.0, 5.0, 9.0, 3.0, 7.0, 6.0, 10.0, 12.0])
+    for value in values:
+        history.append(value)
+
+    for n in (2, 5, 8, 20):
+        expected = np.mean(np.diff(values[-min(n, 8):]))
+        assert history.trend(n) == pytest.approx(expected)
+    assert RollingHistory(4).trend() == 0.0
+
+
+def test_histories_are_isolated_per_symbol_and_strategy():
+    history = RiskHistory(capacity=10)
+    history.get('drawdown', 'BTC/USDT', 'momentum').append(-0.01)
+    history.get('drawdown', 'BTC/USDT', 'mean_reversion').append(-0.05)
+    history.get('position').append(0.02)
+
+    assert history.get('drawdown', 'BTC/USDT', 'momentum').values().tolist() == [-0.01]
+    assert history.get('drawdown', 'BTC/USDT', 'mean_reversion').values().tolist() == [-0.05]
+    assert history.find('drawdown') is None
+    assert history.find('drawdown', 'ETH/USDT') is None
+    assert set(history.keys('drawdown')) == {('BTC/USDT', 'momentum'), ('BTC/USDT', 'mean_reversion')}
+    with pytest.raises(ValueError):
+        history.get('volatility')
+
+
+def test_save_and_load_state_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    manager = RiskManager(history_size=16)
+    for value in rng.normal(size=40):
+        manager.history.get('position').append(abs(value) / 10)
+        manager.history.get('drawdown', 'BTC/USDT').append(min(0.0, value / 100))
+    manager.market_state = 'volatile'
+
+    path = str(tmp_path / 'risk.json')
+    assert manager.save_state(path)
+    with open(path) as f:
+        assert json.load(f)['market_state'] == 'volatile'
+
+    restored = RiskManager()
+    assert restored.load_state(path)
+    assert restored.market_state == 'volatile'
+    assert restored.last_update == manager.last_update
+    assert set(restored.history.buffers) == set(manager.history.buffers)
+    for key, original in manager.history.buffers.items():
+        copy = restored.history.buffers[key]
+        np.testing.assert_array_equal(copy.values(), original.values())
+        assert copy.capacity == 16 and copy.count == original.count == 40
+        assert copy.mean == pytest.approx(original.mean) and copy.variance == pytest.approx(original.variance)
+        assert (copy.max_value, copy.min_value) == (original.max_value, original.min_value)
+
+    # Restored buffers keep sliding like the originals
+    for history in (manager.history, restored.history):
+        history.get('position').append(0.5)
+    assert restored.position_history.mean == pytest.approx(manager.position_history.mean)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+
+from conftest import make_ohlcv
+from ai_engine.ml_models import MLPredictor
+from ai_engine.signal_pipeline import ParallelSignalPipeline
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    predictor = MLPredictor()
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, len(predictor.FEATURE_NAMES)))
+    y = (X[:, 0] > 0).astype(int)
+    predictor.scaler.fit(X)
+    predictor.models[predictor.selected_model].fit(predictor.scaler.transform(X), y)
+    path = str(tmp_path / 'model')
+    predictor.save_model(path)
+    return path
+
+
+def _frames(symbols):
+    return {symbol: make_ohlcv(250, seed=i).reset_index().rename(columns={'index': 'timestamp'})
+            for i, symbol in enumerate(symbols)}
+
+
+def test_first_spawned_cycle_meets_the_deadline(model_path):
+    frames = _frames(['BTC/USDT', 'ETH/USDT', 'SOL/USDT'])
+    with ParallelSignalPipeline(list(frames), n_workers=2, deadline=1.0, start_method='spawn',
+                                model_path=model_path) as pipeline:
+        # start() returns only once every worker has imported, loaded and warmed up
+        assert all(ready.is_set() for ready in pipeline._ready)
+        result = pipeline.run_cycle(frames)
+
+    assert result['missing'] == []
+    assert set(result['signals']) == set(frames)
+    assert set(result['worker_seconds']) == {0, 1}
@@ -0,0 +1,21 @@
+import numpy as np
+
+from ai_engine.stress_test import MonteCarloStressTester
+
+
+def test_stops_are_not_a_free_option_on_zero_mean_returns():
+    returns = np.random.default_rng(1).standard_t(4, 5000) * 0.01
+    returns -= returns.mean()
+    tester = MonteCarloStressTester(returns, n_paths=1000, horizon=100, n_jobs=1, random_state=0)
+    report = tester.run(stop_loss=0.01, max_position_size=0.5, max_drawdown=0.2)
+    # An always-long strategy on driftless returns must not look profitable
+    # just because close-to-close stops ignore intrabar excursions
+    assert report['terminal_return']['mean'] < 0
+    assert report['terminal_return']['p01'] < 0
+
+
+def test_same_seed_same_result():
+    returns = np.random.default_rng(2).normal(0, 0.01, 2000)
+    runs = [MonteCarloStressTester(returns, n_paths=500, horizon=50, n_jobs=1, random_state=7).run()
+            for _ in range(2)]
+    assert runs[0]['terminal_return'] == runs[1]['terminal_return']
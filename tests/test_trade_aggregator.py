@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_engine.trade_aggregator import DAY_MS, BarBuilder, StreamingTradeAggregator, TradeAggregator
+
+
+@pytest.fixture
+def trades():
+    rng = np.random.default_rng(0)
+    n = 3000
+    # Irregular arrivals with some same-millisecond trades, crossing a UTC midnight
+    gaps = rng.choice([0, 5, 50, 400, 3000], size=n, p=[0.1, 0.3, 0.3, 0.2, 0.1])
+    timestamps = DAY_MS * 19723 - 600000 + np.cumsum(gaps)
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'price': 100.0 + np.cumsum(rng.normal(scale=0.05, size=n)),
+        'amount': rng.exponential(scale=0.5, size=n)
+    })
+
+
+def _feed(aggregator, trades):
+    snapshots = []
+    for row in trades.itertuples(index=False):
+        aggregator.update(row.timestamp, row.price, row.amount)
+        snapshots.append(aggregator.snapshot())
+    return snapshots
+
+
+def test_vwaps_match_pandas_reference(trades):
+    aggregator = TradeAggregator(time_windows=(1000, 60000), volume_windows=(5.0, 50.0), bars=())
+    snapshots = _feed(aggregator, trades)
+
+    notional = trades['price'] * trades['amount']
+    session = trades['timestamp'] // DAY_MS
+    session_vwap = notional.groupby(session).cumsum() / trades['amount'].groupby(session).cumsum()
+    np.testing.assert_allclose([s['session_vwap'] for s in snapshots], session_vwap, rtol=1e-9)
+
+    indexed = pd.DataFrame({'notional': notional.values, 'amount': trades['amount'].values},
+                           index=pd.to_datetime(trades['timestamp'], unit='ms'))
+    for window in (1000, 60000):
+        # Both sides use the half-open window (t - window, t]
+        rolling = indexed.rolling(f'{window}ms').sum()
+        expected = (rolling['notional'] / rolling['amount']).values
+        np.testing.assert_allclose([s['time_vwap'][window] for s in snapshots], expected, rtol=1e-8)
+
+    prices, amounts = trades['price'].values, trades['amount'].values
+    for window in (5.0, 50.0):
+        expected = []
+        for i in range(len(trades)):
+            # Newest trades first; the oldest one inside the window counts only partly
+            taken = np.diff(np.minimum(np.concatenate([[0.0], np.cumsum(amounts[i::-1])]), window))
+            expected.append(np.dot(prices[i::-1], taken) / taken.sum())
+        np.testing.assert_allclose([s['volume_vwap'][window] for s in snapshots], expected, rtol=1e-8)
+
+
+def test_time_bars_align_to_the_clock():
+    builder = BarBuilder('time', 60000)
+    assert builder.update(120500, 10.0, 1.0) is None
+    assert builder.update(179999, 12.0, 2.0) is None
+    bar = builder.update(180000, 11.0, 1.0)
+
+    assert (bar['start'], bar['end'], bar['trades']) == (120000, 179999, 2)
+    assert (bar['open'], bar['high'], bar['low'], bar['close']) == (10.0, 12.0, 10.0, 12.0)
+    assert bar['vwap'] == pytest.approx((10.0 + 24.0) / 3.0)
+    assert builder.current['start'] == 180000
+
+
+def test_tick_bars_close_on_the_nth_trade():
+    builder = BarBuilder('tick', 3)
+    results = [builder.update(i, 100.0 + i, 1.0) for i in range(7)]
+
+    assert [r is not None for r in results] == [False, False, True, False, False, True, False]
+    assert (results[5]['open'], results[5]['close'], results[5]['start']) == (103.0, 105.0, 3)
+
+
+@pytest.mark.parametrize('kind, threshold, price', [('volume', 10.0, 1.0), ('dollar', 1000.0, 100.0)])
+def test_straddling_trade_closes_the_bar_whole(kind, threshold, price):
+    builder = BarBuilder(kind, threshold)
+    assert builder.update(1, price, 4.0) is None
+    assert builder.update(2, price, 5.0) is None
+    # Crosses the threshold by 3 units: the whole trade belongs to the closing bar, nothing carries over
+    bar = builder.update(3, price, 4.0)
+
+    assert bar['volume'] == 13.0 and bar['trades'] == 3
+    assert bar['notional'] == pytest.approx(13.0 * price)
+    assert builder.current is None
+
+    # A trade exactly at the threshold closes its bar too
+    assert builder.update(4, price, 10.0)['volume'] == 10.0
+
+
+def test_volume_bar_boundaries_on_a_stream(trades):
+    threshold = 25.0
+    aggregator = TradeAggregator(time_windows=(), bars=(('volume', threshold),))
+    for row in trades.itertuples(index=False):
+        aggregator.update(row.timestamp, row.price, row.amount)
+    bars = list(aggregator.completed_bars[('volume', threshold)])
+
+    # Reference: a bar ends at the first trade where the volume since the last close reaches the threshold
+    ends, running = [], 0.0
+    for i, amount in enumerate(trades['amount']):
+        running += amount
+        if running >= threshold:
+            ends.append(i)
+            running = 0.0
+    assert [bar['end'] for bar in bars] == trades['timestamp'].values[ends].tolist()
+    starts = [0] + [end + 1 for end in ends[:-1]]
+    for bar, first, last in zip(bars, starts, ends):
+        assert bar['volume'] == pytest.approx(trades['amount'].values[first:last + 1].sum())
+        assert bar['volume'] - trades['amount'].values[last] < threshold <= bar['volume']
+
+
+def test_batch_entry_skips_trades_already_seen():
+    streaming = StreamingTradeAggregator(bars=(('tick', 2),))
+    batch = [{'timestamp': 1, 'id': 'a', 'price': 10.0, 'amount': 1.0},
+             {'timestamp': 2, 'id': 'b', 'price': 11.0, 'amount': 1.0}]
+    assert len(streaming.on_trades('BTC/USDT', batch)) == 1
+    # The next poll overlaps the previous one
+    overlap = batch[1:] + [{'timestamp': 2, 'id': 'c', 'price': 12.0, 'amount': 1.0},
+                           {'timestamp': 3, 'id': 'd', 'price': 13.0, 'amount': 1.0}]
+    completed = streaming.on_trades('BTC/USDT', overlap)
+
+    assert [bar['close'] for _, bar in completed] == [13.0]
+    assert streaming.get('BTC/USDT').session_volume == 4.0
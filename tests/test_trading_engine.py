@@ -0,0 +1,21 @@
+from conftest import make_ohlcv
+from ai_engine.trading_engine import TradingEngine
+
+
+def test_pipeline_does_not_mutate_market_data():
+    engine = TradingEngine()
+    market_data = {'symbol': 'BTC/USDT', 'ohlcv': make_ohlcv(200), 'timestamp': 0}
+
+    context = engine.run_pipeline(market_data=market_data, portfolio_value=10000)
+
+    assert context['indicators']
+    assert set(market_data) == {'symbol', 'ohlcv', 'timestamp'}
+
+
+def test_update_market_state_is_keyed_by_symbol():
+    engine = TradingEngine()
+    engine.update_market_state({'ohlcv': make_ohlcv(50)}, symbol='ETH/USDT')
+    engine.update_market_state({'symbol': 'BTC/USDT', 'ohlcv': make_ohlcv(50, seed=1)})
+
+    keys = set(engine.risk_manager.history.buffers)
+    assert keys == {('drawdown', 'ETH/USDT', None), ('drawdown', 'BTC/USDT', None)}
@@ -0,0 +1,114 @@
+import joblib
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from ai_engine.model_registry import ModelRegistry
+from ai_engine.training_pipeline import WalkForwardTrainer, walk_forward_splits
+
+FEATURES = ['a', 'b', 'c']
+
+
+def _data(n=300):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 3))
+    y = (X[:, 0] - X[:, 2] + rng.normal(scale=0.3, size=n) > 0).astype(int)
+    return X, y
+
+
+def _candidates():
+    return {
+        'rf': (RandomForestClassifier(n_estimators=5, random_state=0), {'max_depth': [1, 4]}),
+        'lr': (LogisticRegression(), {'C': [0.01, 1.0]})
+    }
+
+
+def test_expanding_window_splits():
+    folds = list(walk_forward_splits(60, n_splits=5))
+
+    assert len(folds) == 5
+    for i, (train_idx, test_idx) in enumerate(folds):
+        assert train_idx.tolist() == list(range(10 + i * 10))
+        assert test_idx.tolist() == list(range(10 + i * 10, 20 + i * 10))
+
+
+def test_rolling_window_splits_with_gap():
+    folds = list(walk_forward_splits(100, n_splits=4, test_size=10, train_size=30, gap=5))
+
+    assert [test_idx[0] for _, test_idx in folds] == [60, 70, 80, 90]
+    for train_idx, test_idx in folds:
+        assert len(train_idx) == 30 and len(test_idx) == 10
+        # Nothing from the gap leaks into training
+        assert test_idx[0] - train_idx[-1] == 6
+    assert folds[-1][1][-1] == 99
+
+
+def test_train_window_is_clipped_at_the_start():
+    train_idx, _ = next(walk_forward_splits(50, n_splits=4, test_size=10, train_size=30, gap=2))
+    assert train_idx.tolist() == list(range(8))
+
+
+@pytest.mark.parametrize('n_samples, kwargs', [
+    (4, {'n_splits': 5}),
+    (5, {'n_splits': 5}),
+    (50, {'n_splits': 4, 'test_size': 10, 'gap': 10}),
+])
+def test_too_few_samples_raise_immediately(n_samples, kwargs):
+    with pytest.raises(ValueError):
+        walk_forward_splits(n_samples, **kwargs)
+
+
+def test_search_ranks_every_candidate_over_every_fold():
+    X, y = _data()
+    trainer = WalkForwardTrainer(candidates=_candidates(), n_splits=3, gap=2, n_jobs=2)
+    results = trainer.search(X, y)
+
+    assert len(results) == 4
+    assert {(r['name'], tuple(r['params'].items())) for r in results} == {
+        ('rf', (('max_depth', 1),)), ('rf', (('max_depth', 4),)), ('lr', (('C', 0.01),)), ('lr', (('C', 1.0),))
+    }
+    scores = [r['metrics']['f1_score'] for r in results]
+    assert scores == sorted(scores, reverse=True)
+    for result in results:
+        assert len(result['folds']) == 3
+        assert result['metrics']['f1_score'] == pytest.approx(np.mean([f['f1_score'] for f in result['folds']]))
+        assert 'f1_score_std' in result['metrics']
+    # The signal is linear, so the best candidate should clearly beat chance
+    assert scores[0] > 0.8
+
+
+def test_run_writes_the_best_model(tmp_path):
+    X, y = _data()
+    trainer = WalkForwardTrainer(candidates=_candidates(), n_splits=3, train_size=150, n_jobs=2)
+    path = str(tmp_path / 'model.joblib')
+    report = trainer.run(X, y, FEATURES, output_path=path)
+
+    assert report['path'] == path
+    saved = joblib.load(path)
+    assert saved['feature_names'] == FEATURES
+    assert saved['metrics']['model_name'] == report['best']['name']
+    assert saved['metrics']['params'] == report['best']['params']
+    np.testing.assert_array_equal(saved['model'].predict(saved['scaler'].transform(X)),
+                                  report['model'].predict(report['scaler'].transform(X)))
+
+
+def test_run_registers_and_activates_a_version(tmp_path):
+    X, y = _data()
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    trainer = WalkForwardTrainer(candidates=_candidates(), n_splits=3, n_jobs=2)
+    report = trainer.run(X, y, FEATURES, registry=registry)
+
+    assert registry.active_version() == report['version']
+    loaded = registry.load(prefer_fast=False)
+    assert loaded['feature_names'] == FEATURES
+    assert loaded['metrics']['model_name'] == report['best']['name']
+
+
+def test_run_raises_on_invalid_split_settings():
+    X, y = _data(n=4)
+    trainer = WalkForwardTrainer(candidates=_candidates(), n_splits=5, n_jobs=2)
+    with pytest.raises(ValueError):
+        trainer.run(X, y, FEATURES)